@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 """Example usage of MSTR Bitcoin Tracker."""
 
+from concurrent.futures import ThreadPoolExecutor
 from src.scraper import HoldingsScraper, PriceScraper
 from src.calculator import MetricsCalculator
 from src.simulator import MonteCarloSimulator
@@ -17,14 +18,19 @@ def example_basic_usage():
     price_scraper = PriceScraper()
     
     try:
-        # Fetch data
-        print("\n1. Fetching holdings data...")
-        holdings_data = holdings_scraper.fetch_latest()
+        # Fetch data (holdings and prices are independent, so fetch them together)
+        print("\nFetching holdings and price data...")
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            holdings_future = executor.submit(holdings_scraper.fetch_latest)
+            price_future = executor.submit(price_scraper.fetch_latest_prices)
+            holdings_data = holdings_future.result()
+            price_data = price_future.result()
+        
+        print("\n1. Holdings data:")
         print(f"   BTC Holdings: {holdings_data['btc_holdings']:,.2f} BTC")
         print(f"   Avg Cost Basis: ${holdings_data['avg_cost_basis']:,.2f}")
         
-        print("\n2. Fetching price data...")
-        price_data = price_scraper.fetch_latest_prices()
+        print("\n2. Price data:")
         print(f"   BTC Price: ${price_data['btc_price_usd']:,.2f}")
         print(f"   MSTR Price: ${price_data['mstr_price_usd']:,.2f}")
         
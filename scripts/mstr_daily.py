@@ -5,8 +5,9 @@ MSTR Bitcoin Tracker - Daily Data Collection Script
 This script runs daily to:
 1. Initialize the database if needed
 2. Fetch and ingest current BTC and MSTR prices
-3. Update holdings data
-4. Store snapshot in the database
+3. Backfill any missed daily BTC closes in one range request
+4. Update holdings data
+5. Store snapshot in the database
 
 Environment Variables:
 - DATABASE_PATH: Path to SQLite database (default: ./data/mstr_tracker.db)
@@ -17,12 +18,14 @@ Environment Variables:
 
 import os
 import sys
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
 from pathlib import Path
 
-# Add the project root to the Python path
-project_root = Path(__file__).parent.parent
-sys.path.insert(0, str(project_root))
+# Add the project root to the Python path when run as a plain script
+project_root = str(Path(__file__).resolve().parent.parent)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
 
 from src.database.models import init_database
 from src.database.operations import DatabaseOperations
@@ -30,6 +33,25 @@ from src.scraper.price_scraper import PriceScraper
 from src.scraper.holdings_scraper import HoldingsScraper
 
 
+def backfill_btc_prices(db_ops: DatabaseOperations, price_scraper: PriceScraper) -> int:
+    """
+    Fill missing daily BTC closes since the last stored date.
+    
+    Uses a single range request instead of one call per missing day.
+    Only runs once at least one BTC close has been stored.
+    
+    Returns:
+        Number of days inserted
+    """
+    last_date = db_ops.get_latest_market_price_date('BTC')
+    yesterday = date.today() - timedelta(days=1)
+    if last_date is None or last_date >= yesterday:
+        return 0
+    
+    prices = price_scraper.fetch_btc_range(last_date + timedelta(days=1), yesterday)
+    return db_ops.add_market_prices('BTC', prices)
+
+
 def main():
     """Main function to run daily data collection."""
     print(f"[{datetime.now().isoformat()}] Starting MSTR Bitcoin Tracker daily run...")
@@ -45,20 +67,27 @@ def main():
         
         try:
             # Fetch and store current prices
-            print("Fetching current BTC and MSTR prices...")
+            print("Fetching current BTC and MSTR prices and MicroStrategy BTC holdings...")
             
             price_scraper = PriceScraper()
             holdings_scraper = HoldingsScraper()
             
+            # The three fetches are independent network calls, so run them together
+            with ThreadPoolExecutor(max_workers=3) as executor:
+                btc_future = executor.submit(price_scraper.fetch_btc_price)
+                mstr_future = executor.submit(price_scraper.fetch_mstr_data)
+                holdings_future = executor.submit(holdings_scraper.fetch_latest)
+                btc_price = btc_future.result()
+                mstr_data = mstr_future.result()
+                holdings = holdings_future.result()
+            
             # Get BTC price
-            btc_price = price_scraper.fetch_btc_price()
             if btc_price:
                 print(f"✓ BTC Price: ${btc_price:,.2f}")
             else:
                 print("⚠ Could not fetch BTC price")
             
             # Get MSTR price
-            mstr_data = price_scraper.fetch_mstr_data()
             mstr_price = mstr_data.get('price') if mstr_data else None
             if mstr_price:
                 print(f"✓ MSTR Price: ${mstr_price:.2f}")
@@ -66,8 +95,6 @@ def main():
                 print("⚠ Could not fetch MSTR price")
             
             # Get holdings data
-            print("Fetching MicroStrategy BTC holdings...")
-            holdings = holdings_scraper.fetch_latest()
             if holdings and holdings.get('btc_holdings', 0) > 0:
                 print(f"✓ BTC Holdings: {holdings.get('btc_holdings', 0):,.0f} BTC")
                 print(f"  Total Cost: ${holdings.get('total_cost', 0):,.0f}")
@@ -75,24 +102,31 @@ def main():
             else:
                 print("⚠ Could not fetch holdings data")
             
-            # Store data in database using DatabaseOperations methods
-            if btc_price and mstr_price:
-                print("Storing price data in database...")
-                db_ops.add_price_record(
-                    btc_price_usd=btc_price,
-                    mstr_price_usd=mstr_price
-                )
-                print("✓ Price data stored successfully")
+            # Backfill any days missed since the last run
+            backfilled = backfill_btc_prices(db_ops, price_scraper)
+            if backfilled:
+                print(f"✓ Backfilled {backfilled} days of BTC prices")
             
-            if holdings and holdings.get('btc_holdings', 0) > 0:
-                print("Storing holdings data in database...")
-                db_ops.add_holdings_record(
-                    btc_holdings=holdings.get('btc_holdings', 0),
-                    avg_cost_basis=holdings.get('avg_cost_basis', 0),
-                    total_cost=holdings.get('total_cost', 0),
-                    source='daily_scrape'
-                )
-                print("✓ Holdings data stored successfully")
+            # Store data in database using DatabaseOperations methods,
+            # committing both records in one transaction
+            with db_ops.batch():
+                if btc_price and mstr_price:
+                    print("Storing price data in database...")
+                    db_ops.add_price_record(
+                        btc_price_usd=btc_price,
+                        mstr_price_usd=mstr_price
+                    )
+                    print("✓ Price data stored successfully")
+                
+                if holdings and holdings.get('btc_holdings', 0) > 0:
+                    print("Storing holdings data in database...")
+                    db_ops.add_holdings_record(
+                        btc_holdings=holdings.get('btc_holdings', 0),
+                        avg_cost_basis=holdings.get('avg_cost_basis', 0),
+                        total_cost=holdings.get('total_cost', 0),
+                        source='daily_scrape'
+                    )
+                    print("✓ Holdings data stored successfully")
         finally:
             db_ops.close()
         
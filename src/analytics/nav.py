@@ -1,16 +1,53 @@
 """NAV (Net Asset Value) calculations and metrics."""
 
+import weakref
 from dataclasses import dataclass
 from datetime import date
-from typing import Optional
+from typing import Dict, Optional
 from sqlalchemy.orm import Session
-from sqlalchemy import desc, and_
+from sqlalchemy import desc, event, func, select, text, bindparam
 
 from ..database.models import (
-    HoldingsTranche, CompanyStats, MarketPrice, DailySnapshot
+    HoldingsTranche, CompanyStats, MarketPrice, DailySnapshot, OrdinalDate
 )
 
 
+# Latest prices and company stats as of :as_of_date, shared by every
+# statement that needs the NAV inputs
+NAV_INPUTS_CTES = """
+    WITH latest_btc AS (
+        SELECT close_price FROM market_price
+        WHERE asset = 'BTC' AND as_of_date <= :as_of_date
+        ORDER BY as_of_date DESC LIMIT 1
+    ),
+    latest_mstr AS (
+        SELECT close_price FROM market_price
+        WHERE asset = 'MSTR' AND as_of_date <= :as_of_date
+        ORDER BY as_of_date DESC LIMIT 1
+    ),
+    latest_stats AS (
+        SELECT shares_outstanding, cash_usd, debt_usd_market FROM company_stats
+        WHERE as_of_date <= :as_of_date
+        ORDER BY as_of_date DESC LIMIT 1
+    )
+"""
+
+NAV_INPUTS_COLUMNS = """
+        (SELECT SUM(btc_acquired) FROM holdings_tranche
+         WHERE as_of_date <= :as_of_date) AS total_btc,
+        (SELECT close_price FROM latest_btc) AS btc_spot_price,
+        (SELECT close_price FROM latest_mstr) AS mstr_share_price,
+        (SELECT shares_outstanding FROM latest_stats) AS shares_outstanding,
+        (SELECT cash_usd FROM latest_stats) AS cash_usd,
+        (SELECT debt_usd_market FROM latest_stats) AS debt_usd_market
+"""
+
+# All inputs for compute_nav_metrics, fetched in one round-trip
+_NAV_INPUTS_SQL = text(
+    NAV_INPUTS_CTES + "    SELECT" + NAV_INPUTS_COLUMNS
+).bindparams(bindparam("as_of_date", type_=OrdinalDate))
+
+
 @dataclass
 class NAVMetrics:
     """NAV metrics data class."""
@@ -29,6 +66,91 @@ class NAVMetrics:
     debt_usd_market: Optional[float]
 
 
+# Per-session cache of computed NAV metrics, keyed by as_of_date.
+# Dropped for a session whenever it flushes rows that feed the NAV.
+_nav_cache: "weakref.WeakKeyDictionary[Session, Dict[date, Optional[NAVMetrics]]]" = \
+    weakref.WeakKeyDictionary()
+
+_NAV_INPUT_MODELS = (HoldingsTranche, MarketPrice, CompanyStats)
+
+# Bumped whenever NAV inputs are written in this process, so caches that
+# outlive a session can key on it
+_nav_data_version = 0
+
+
+def get_nav_data_version() -> int:
+    """Return the in-process NAV input version counter."""
+    return _nav_data_version
+
+
+# Latest BTC close per as_of_date, kept in session.info for reuse within a
+# request; sessions holding one are tracked so they can all be invalidated
+_BTC_PRICE_INFO_KEY = "latest_btc_price"
+_btc_price_sessions: "weakref.WeakSet[Session]" = weakref.WeakSet()
+
+
+def invalidate_nav_cache(session: Optional[Session] = None) -> None:
+    """
+    Drop cached NAV metrics and latest BTC prices.
+    
+    Args:
+        session: Only drop entries for this session (defaults to all)
+    """
+    global _nav_data_version
+    _nav_data_version += 1
+    
+    if session is None:
+        _nav_cache.clear()
+        for cached_session in list(_btc_price_sessions):
+            cached_session.info.pop(_BTC_PRICE_INFO_KEY, None)
+    else:
+        _nav_cache.pop(session, None)
+        session.info.pop(_BTC_PRICE_INFO_KEY, None)
+
+
+def _btc_price_cache(session: Session) -> Dict[date, Optional[float]]:
+    """Get the session's latest-BTC-price cache, creating it if needed."""
+    _btc_price_sessions.add(session)
+    return session.info.setdefault(_BTC_PRICE_INFO_KEY, {})
+
+
+def remember_btc_price(session: Session, as_of_date: date, price: Optional[float]) -> None:
+    """Record a latest BTC price fetched by another query for reuse."""
+    _btc_price_cache(session)[as_of_date] = price
+
+
+def get_latest_btc_price(session: Session, as_of_date: Optional[date] = None) -> Optional[float]:
+    """
+    Get the latest BTC close on or before a date, cached per session.
+    
+    Args:
+        session: Database session
+        as_of_date: Date to query (defaults to today)
+        
+    Returns:
+        BTC close price or None if no price is available
+    """
+    if as_of_date is None:
+        as_of_date = date.today()
+    
+    prices = _btc_price_cache(session)
+    if as_of_date not in prices:
+        prices[as_of_date] = session.query(MarketPrice.close_price).filter(
+            MarketPrice.asset == 'BTC',
+            MarketPrice.as_of_date <= as_of_date
+        ).order_by(desc(MarketPrice.as_of_date)).limit(1).scalar()
+    
+    return prices[as_of_date]
+
+
+@event.listens_for(Session, "after_flush")
+def _invalidate_on_nav_input_write(session, flush_context):
+    """Invalidate the session's NAV cache when NAV input rows change."""
+    changed = list(session.new) + list(session.dirty) + list(session.deleted)
+    if any(isinstance(obj, _NAV_INPUT_MODELS) for obj in changed):
+        invalidate_nav_cache(session)
+
+
 def get_total_btc(session: Session, as_of_date: Optional[date] = None) -> float:
     """
     Get total BTC holdings as of a specific date.
@@ -43,15 +165,12 @@ def get_total_btc(session: Session, as_of_date: Optional[date] = None) -> float:
     if as_of_date is None:
         as_of_date = date.today()
     
-    # Sum all tranches up to and including the as_of_date
-    tranches = session.query(HoldingsTranche).filter(
+    # Sum all tranches up to and including the as_of_date in SQL
+    total = session.query(func.sum(HoldingsTranche.btc_acquired)).filter(
         HoldingsTranche.as_of_date <= as_of_date
-    ).all()
-    
-    if not tranches:
-        return 0.0
+    ).scalar()
     
-    return sum(t.btc_acquired for t in tranches)
+    return float(total or 0.0)
 
 
 def get_btc_per_share(
@@ -73,27 +192,32 @@ def get_btc_per_share(
     
     total_btc = get_total_btc(session, as_of_date)
     
-    # Get shares outstanding
-    company_stat = session.query(CompanyStats).filter(
+    # Get shares outstanding (only the one column is needed)
+    shares_outstanding = session.query(CompanyStats.shares_outstanding).filter(
         CompanyStats.as_of_date <= as_of_date
-    ).order_by(desc(CompanyStats.as_of_date)).first()
+    ).order_by(desc(CompanyStats.as_of_date)).limit(1).scalar()
     
-    if not company_stat or not company_stat.shares_outstanding:
+    if not shares_outstanding:
         return None
     
-    return total_btc / company_stat.shares_outstanding
+    return total_btc / shares_outstanding
 
 
 def compute_nav_metrics(
     session: Session,
-    as_of_date: Optional[date] = None
+    as_of_date: Optional[date] = None,
+    use_snapshot: bool = True
 ) -> Optional[NAVMetrics]:
     """
     Compute comprehensive NAV metrics.
     
+    A stored DailySnapshot for the exact date is used when available;
+    otherwise the metrics are computed from the underlying tables.
+    
     Args:
         session: Database session
         as_of_date: Date to query (defaults to latest)
+        use_snapshot: Read a matching DailySnapshot instead of recomputing
         
     Returns:
         NAVMetrics dataclass or None if data is incomplete
@@ -101,45 +225,230 @@ def compute_nav_metrics(
     if as_of_date is None:
         as_of_date = date.today()
     
-    # Get total BTC
-    total_btc = get_total_btc(session, as_of_date)
-    if total_btc == 0:
-        return None
+    if not use_snapshot:
+        return _compute_nav_metrics(session, as_of_date)
     
-    # Get BTC price
-    btc_price_rec = session.query(MarketPrice).filter(
-        and_(
-            MarketPrice.as_of_date <= as_of_date,
-            MarketPrice.asset == 'BTC'
-        )
-    ).order_by(desc(MarketPrice.as_of_date)).first()
+    session_cache = _nav_cache.setdefault(session, {})
+    if as_of_date not in session_cache:
+        metrics = _nav_metrics_from_snapshot(session, as_of_date)
+        if metrics is None:
+            metrics = _compute_nav_metrics(session, as_of_date)
+        session_cache[as_of_date] = metrics
     
-    if not btc_price_rec:
+    return session_cache[as_of_date]
+
+
+def _nav_metrics_from_snapshot(session: Session, as_of_date: date) -> Optional[NAVMetrics]:
+    """
+    Build NAV metrics from the DailySnapshot for as_of_date.
+    
+    Returns None when there is no snapshot for that date, or when it predates
+    the company stats columns and so cannot reproduce every field.
+    """
+    snap = session.query(DailySnapshot).filter(
+        DailySnapshot.as_of_date == as_of_date
+    ).first()
+    
+    if snap is None:
         return None
     
-    btc_spot_price = btc_price_rec.close_price
+    remember_btc_price(session, as_of_date, snap.btc_spot_price)
+    if snap.market_cap_usd and snap.shares_outstanding is None:
+        return None
+    if snap.bs_nav_usd is not None and (snap.cash_usd is None or snap.debt_usd_market is None):
+        return None
     
-    # Get MSTR price
-    mstr_price_rec = session.query(MarketPrice).filter(
-        and_(
-            MarketPrice.as_of_date <= as_of_date,
-            MarketPrice.asset == 'MSTR'
-        )
-    ).order_by(desc(MarketPrice.as_of_date)).first()
+    return NAVMetrics(
+        total_btc=snap.total_btc,
+        btc_nav_usd=snap.btc_nav_usd,
+        bs_nav_usd=snap.bs_nav_usd,
+        btc_per_share=snap.btc_per_share,
+        bs_nav_per_share=snap.bs_nav_per_share,
+        premium_to_btc_nav=snap.premium_to_btc_nav,
+        premium_to_bs_nav=snap.premium_to_bs_nav,
+        btc_spot_price=snap.btc_spot_price,
+        mstr_share_price=snap.mstr_share_price,
+        market_cap_usd=snap.market_cap_usd,
+        shares_outstanding=snap.shares_outstanding,
+        cash_usd=snap.cash_usd,
+        debt_usd_market=snap.debt_usd_market
+    )
+
+
+# Snapshot columns written by rebuild_daily_snapshots, in SELECT order
+_SNAPSHOT_COLUMNS = (
+    "as_of_date", "total_btc", "btc_spot_price", "mstr_share_price", "market_cap_usd",
+    "btc_nav_usd", "bs_nav_usd", "btc_per_share", "bs_nav_per_share",
+    "premium_to_btc_nav", "premium_to_bs_nav",
+    "shares_outstanding", "cash_usd", "debt_usd_market",
+)
+
+# Every day's snapshot from :start_date to :end_date in one statement; the
+# CASE expressions mirror nav_metrics_from_row, and dates are ordinal days
+_REBUILD_SNAPSHOTS_SQL = text("""
+    INSERT INTO daily_snapshot (""" + ", ".join(_SNAPSHOT_COLUMNS) + """)
+    WITH RECURSIVE days(as_of_date) AS (
+        SELECT :start_date
+        UNION ALL
+        SELECT as_of_date + 1 FROM days WHERE as_of_date < :end_date
+    ),
+    tranche_totals AS MATERIALIZED (
+        SELECT as_of_date, SUM(SUM(btc_acquired)) OVER (
+            ORDER BY as_of_date ROWS UNBOUNDED PRECEDING
+        ) AS total_btc
+        FROM holdings_tranche GROUP BY as_of_date
+    ),
+    inputs AS (
+        SELECT
+            d.as_of_date,
+            (SELECT total_btc FROM tranche_totals t WHERE t.as_of_date <= d.as_of_date
+             ORDER BY t.as_of_date DESC LIMIT 1) AS total_btc,
+            (SELECT close_price FROM market_price
+             WHERE asset = 'BTC' AND as_of_date <= d.as_of_date
+             ORDER BY as_of_date DESC LIMIT 1) AS btc_spot_price,
+            (SELECT close_price FROM market_price
+             WHERE asset = 'MSTR' AND as_of_date <= d.as_of_date
+             ORDER BY as_of_date DESC LIMIT 1) AS mstr_share_price,
+            (SELECT id FROM company_stats WHERE as_of_date <= d.as_of_date
+             ORDER BY as_of_date DESC LIMIT 1) AS stats_id
+        FROM days d
+    ),
+    nav AS (
+        SELECT
+            i.as_of_date, i.total_btc, i.btc_spot_price, i.mstr_share_price,
+            s.shares_outstanding, s.cash_usd, s.debt_usd_market,
+            i.total_btc * i.btc_spot_price AS btc_nav_usd,
+            CASE WHEN s.cash_usd IS NOT NULL AND s.debt_usd_market IS NOT NULL
+                 THEN i.total_btc * i.btc_spot_price + s.cash_usd - s.debt_usd_market
+            END AS bs_nav_usd,
+            CASE WHEN COALESCE(s.shares_outstanding, 0) != 0
+                 THEN s.shares_outstanding * i.mstr_share_price
+            END AS market_cap_usd
+        FROM inputs i LEFT JOIN company_stats s ON s.id = i.stats_id
+        WHERE COALESCE(i.total_btc, 0) != 0
+          AND i.btc_spot_price IS NOT NULL
+          AND i.mstr_share_price IS NOT NULL
+    )
+    SELECT
+        as_of_date, total_btc, btc_spot_price, mstr_share_price,
+        COALESCE(market_cap_usd, 0),
+        btc_nav_usd, bs_nav_usd,
+        CASE WHEN COALESCE(shares_outstanding, 0) != 0
+             THEN total_btc / shares_outstanding END,
+        CASE WHEN COALESCE(shares_outstanding, 0) != 0 AND bs_nav_usd IS NOT NULL
+             THEN bs_nav_usd / shares_outstanding END,
+        CASE WHEN COALESCE(market_cap_usd, 0) != 0 AND btc_nav_usd > 0
+             THEN market_cap_usd / btc_nav_usd - 1.0 END,
+        CASE WHEN COALESCE(market_cap_usd, 0) != 0 AND bs_nav_usd > 0
+             THEN market_cap_usd / bs_nav_usd - 1.0 END,
+        shares_outstanding, cash_usd, debt_usd_market
+    FROM nav WHERE true
+    ON CONFLICT (as_of_date) DO UPDATE SET """ + ", ".join(
+        f"{column} = excluded.{column}" for column in _SNAPSHOT_COLUMNS[1:]
+    )
+).bindparams(
+    bindparam("start_date", type_=OrdinalDate),
+    bindparam("end_date", type_=OrdinalDate)
+)
+
+
+def rebuild_daily_snapshots(session: Session, start_date: date, end_date: date) -> int:
+    """
+    Recompute and store the DailySnapshot of every day in a date range.
+    
+    The whole range is computed and upserted by a single INSERT ... SELECT,
+    with the same values compute_nav_metrics would give for each day. Days
+    without holdings or prices get no snapshot.
+    
+    Args:
+        session: Database session
+        start_date: First date (inclusive)
+        end_date: Last date (inclusive)
+        
+    Returns:
+        Number of snapshots written
+    """
+    result = session.execute(
+        _REBUILD_SNAPSHOTS_SQL, {"start_date": start_date, "end_date": end_date}
+    )
+    return result.rowcount
+
+
+def refresh_daily_snapshots(session: Session, from_date: date) -> int:
+    """
+    Recompute the stored snapshots dated on or after a date.
+    
+    Called after NAV input rows dated from_date are written. Only the span
+    already covered by snapshots is rebuilt (filling any gaps inside it),
+    so history is never dropped and no new history is created.
+    
+    Args:
+        session: Database session
+        from_date: Earliest as_of_date among the changed input rows
+        
+    Returns:
+        Number of snapshots written
+    """
+    first, last = session.execute(
+        select(func.min(DailySnapshot.as_of_date), func.max(DailySnapshot.as_of_date))
+        .where(DailySnapshot.as_of_date >= from_date)
+    ).one()
+    if first is None:
+        return 0
+    return rebuild_daily_snapshots(session, first, last)
+
+
+def invalidate_nav_inputs(session: Session, from_date: date) -> None:
+    """
+    Bring snapshots and cached NAV values up to date after a Core write.
+    
+    Core inserts into the NAV input tables bypass the ORM flush hooks, so
+    callers writing that way must call this themselves.
+    
+    Args:
+        session: Session that wrote the rows
+        from_date: Earliest as_of_date among the written rows
+    """
+    refresh_daily_snapshots(session, from_date)
+    invalidate_nav_cache(session)
+
+
+def _compute_nav_metrics(session: Session, as_of_date: date) -> Optional[NAVMetrics]:
+    """Compute NAV metrics from the database, bypassing the cache."""
+    # Fetch holdings, latest prices and company stats in a single statement
+    row = session.execute(
+        _NAV_INPUTS_SQL, {"as_of_date": as_of_date}
+    ).one()
     
-    if not mstr_price_rec:
+    # The BTC price came back with the other inputs; keep it for reuse
+    remember_btc_price(session, as_of_date, row.btc_spot_price)
+    
+    return nav_metrics_from_row(row)
+
+
+def nav_metrics_from_row(row) -> Optional[NAVMetrics]:
+    """
+    Build NAV metrics from a row carrying the NAV_INPUTS_COLUMNS fields.
+    
+    Args:
+        row: Result row with total_btc, prices and company stats columns
+        
+    Returns:
+        NAVMetrics dataclass or None if data is incomplete
+    """
+    total_btc = float(row.total_btc or 0.0)
+    if total_btc == 0:
         return None
     
-    mstr_share_price = mstr_price_rec.close_price
+    if row.btc_spot_price is None or row.mstr_share_price is None:
+        return None
     
-    # Get company stats
-    company_stat = session.query(CompanyStats).filter(
-        CompanyStats.as_of_date <= as_of_date
-    ).order_by(desc(CompanyStats.as_of_date)).first()
+    btc_spot_price = row.btc_spot_price
+    mstr_share_price = row.mstr_share_price
     
-    shares_outstanding = company_stat.shares_outstanding if company_stat else None
-    cash_usd = company_stat.cash_usd if company_stat else None
-    debt_usd_market = company_stat.debt_usd_market if company_stat else None
+    shares_outstanding = row.shares_outstanding
+    cash_usd = row.cash_usd
+    debt_usd_market = row.debt_usd_market
     
     # Calculate NAV values
     btc_nav_usd = total_btc * btc_spot_price
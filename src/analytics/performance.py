@@ -6,12 +6,14 @@ from typing import Optional, List, Tuple
 import pandas as pd
 import numpy as np
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import and_, select
 
 from ..database.models import MarketPrice
 
 # Constants
 MIN_DRAWDOWN_THRESHOLD = 0.05  # Only report drawdowns > 5%
+TRADING_DAYS_PER_YEAR = 252
+SQRT_TRADING_DAYS_PER_YEAR = np.sqrt(TRADING_DAYS_PER_YEAR)
 
 
 @dataclass
@@ -46,6 +48,83 @@ class DrawdownMetrics:
     top_drawdowns: List[Tuple[date, date, float, int]]
 
 
+def _load_price_series(
+    session: Session,
+    asset: str,
+    start_date: date,
+    end_date: date
+) -> pd.Series:
+    """
+    Load close prices for an asset as a date-indexed Series.
+    
+    Streams the two columns over a Core connection into NumPy rather than
+    hydrating MarketPrice objects.
+    
+    Args:
+        session: Database session
+        asset: Asset symbol ('BTC', 'MSTR', etc.)
+        start_date: First date (inclusive)
+        end_date: Last date (inclusive)
+        
+    Returns:
+        Close prices ordered by date
+    """
+    stmt = select(MarketPrice.as_of_date, MarketPrice.close_price).where(
+        and_(
+            MarketPrice.asset == asset,
+            MarketPrice.as_of_date >= start_date,
+            MarketPrice.as_of_date <= end_date
+        )
+    ).order_by(MarketPrice.as_of_date)
+    
+    conn = session.connection().execution_options(stream_results=True, yield_per=10000)
+    result = conn.execute(stmt)
+    
+    # Collect dates while NumPy consumes the closes, without a Row list
+    dates: List[date] = []
+    
+    def closes_from_rows():
+        for as_of_date, close_price in result:
+            dates.append(as_of_date)
+            yield close_price
+    
+    closes = np.fromiter(closes_from_rows(), dtype=np.float64)
+    
+    return pd.Series(closes, index=pd.Index(dates, name='as_of_date'), name='close_price')
+
+
+def _load_price_frame(
+    session: Session,
+    assets: List[str],
+    start_date: date,
+    end_date: date
+) -> pd.DataFrame:
+    """
+    Load close prices for several assets as a date x asset frame.
+    
+    Args:
+        session: Database session
+        assets: Asset symbols to load
+        start_date: First date (inclusive)
+        end_date: Last date (inclusive)
+        
+    Returns:
+        DataFrame indexed by date with one column per asset found
+    """
+    stmt = select(
+        MarketPrice.as_of_date, MarketPrice.asset, MarketPrice.close_price
+    ).where(
+        and_(
+            MarketPrice.asset.in_(assets),
+            MarketPrice.as_of_date >= start_date,
+            MarketPrice.as_of_date <= end_date
+        )
+    ).order_by(MarketPrice.as_of_date)
+    
+    df = pd.read_sql_query(stmt, session.connection())
+    return df.pivot(index='as_of_date', columns='asset', values='close_price')
+
+
 def compute_returns(
     session: Session,
     asset: str,
@@ -72,22 +151,11 @@ def compute_returns(
         start_date = end_date - timedelta(days=90)
     
     # Get price data
-    prices = session.query(MarketPrice).filter(
-        and_(
-            MarketPrice.asset == asset,
-            MarketPrice.as_of_date >= start_date,
-            MarketPrice.as_of_date <= end_date
-        )
-    ).order_by(MarketPrice.as_of_date).all()
+    price_series = _load_price_series(session, asset, start_date, end_date)
     
-    if len(prices) < 2:
+    if len(price_series) < 2:
         return None
     
-    # Convert to pandas Series
-    price_series = pd.Series(
-        {p.as_of_date: p.close_price for p in prices}
-    )
-    
     # Calculate returns
     daily_returns = price_series.pct_change().dropna()
     
@@ -97,9 +165,8 @@ def compute_returns(
     cumulative_return = (price_series.iloc[-1] / price_series.iloc[0]) - 1
     
     # Annualized metrics (assuming 252 trading days)
-    n_days = len(daily_returns)
-    annualized_return = (1 + daily_returns.mean()) ** 252 - 1
-    volatility = daily_returns.std() * np.sqrt(252)
+    annualized_return = (1 + daily_returns.mean()) ** TRADING_DAYS_PER_YEAR - 1
+    volatility = daily_returns.std() * SQRT_TRADING_DAYS_PER_YEAR
     
     # Sharpe ratio (assuming 0 risk-free rate for simplicity)
     sharpe_ratio = annualized_return / volatility if volatility > 0 else None
@@ -113,6 +180,46 @@ def compute_returns(
     )
 
 
+def _rolling_beta(
+    x: np.ndarray,
+    y: np.ndarray,
+    window: int,
+    index: pd.Index
+) -> pd.Series:
+    """
+    Rolling OLS beta of y on x from windowed cumulative sums.
+    
+    One O(n) pass computes the windowed sums for both covariance and
+    variance. Inputs should be demeaned to keep the sums well conditioned.
+    
+    Args:
+        x: Regressor returns (BTC)
+        y: Dependent returns (asset)
+        window: Window length in observations
+        index: Index for the returned Series
+        
+    Returns:
+        Series aligned to index, NaN for the first window - 1 entries
+    """
+    def window_sums(values: np.ndarray) -> np.ndarray:
+        cumulative = np.concatenate(([0.0], np.cumsum(values)))
+        return cumulative[window:] - cumulative[:-window]
+    
+    sx = window_sums(x)
+    sy = window_sums(y)
+    sxx = window_sums(x * x)
+    sxy = window_sums(x * y)
+    
+    cov = sxy - sx * sy / window
+    var = sxx - sx * sx / window
+    
+    beta = np.full(len(x), np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        beta[window - 1:] = cov / var
+    
+    return pd.Series(beta, index=index)
+
+
 def compute_beta_vs_btc(
     session: Session,
     asset: str = "MSTR",
@@ -138,67 +245,107 @@ def compute_beta_vs_btc(
     if start_date is None:
         start_date = end_date - timedelta(days=90)
     
-    # Get BTC returns
-    btc_metrics = compute_returns(session, 'BTC', start_date, end_date)
-    if not btc_metrics:
+    # Get BTC and asset prices in one query
+    prices = _load_price_frame(session, ['BTC', asset], start_date, end_date)
+    if 'BTC' not in prices or asset not in prices:
         return None
     
-    # Get asset returns
-    asset_metrics = compute_returns(session, asset, start_date, end_date)
-    if not asset_metrics:
-        return None
-    
-    # Align the two series
-    combined = pd.DataFrame({
-        'btc': btc_metrics.daily_returns,
-        'asset': asset_metrics.daily_returns
-    }).dropna()
+    # Returns over the dates both assets have prices for
+    aligned = prices[['BTC', asset]].dropna()
+    values = aligned.to_numpy()
+    returns = values[1:] / values[:-1] - 1
+    return_dates = aligned.index[1:]
     
-    if len(combined) < 10:
+    if len(returns) < 10:
         return None
     
     # Calculate beta using regression
     # asset_return = alpha + beta * btc_return + epsilon
-    btc_returns = combined['btc'].values
-    asset_returns = combined['asset'].values
+    btc_returns = returns[:, 0]
+    asset_returns = returns[:, 1]
+    
+    # Closed-form simple linear regression on demeaned returns
+    btc_mean = btc_returns.mean()
+    asset_mean = asset_returns.mean()
+    btc_dev = btc_returns - btc_mean
+    asset_dev = asset_returns - asset_mean
     
-    # Simple linear regression
-    covariance = np.cov(btc_returns, asset_returns)[0, 1]
-    btc_variance = np.var(btc_returns)
+    sxy = btc_dev @ asset_dev
+    sxx = btc_dev @ btc_dev
+    syy = asset_dev @ asset_dev
     
-    beta = covariance / btc_variance if btc_variance > 0 else 0
-    correlation = np.corrcoef(btc_returns, asset_returns)[0, 1]
+    beta = sxy / sxx if sxx > 0 else 0
+    correlation = sxy / np.sqrt(sxx * syy) if sxx > 0 and syy > 0 else np.nan
     
     # Calculate alpha (intercept)
-    alpha = asset_returns.mean() - beta * btc_returns.mean()
+    alpha = asset_mean - beta * btc_mean
     
-    # R-squared
-    ss_res = np.sum((asset_returns - (alpha + beta * btc_returns)) ** 2)
-    ss_tot = np.sum((asset_returns - asset_returns.mean()) ** 2)
-    r_squared = 1 - (ss_res / ss_tot) if ss_tot > 0 else 0
+    # R-squared of a single-regressor fit is the squared correlation
+    r_squared = correlation ** 2 if syy > 0 and sxx > 0 else 0
     
     # Rolling beta calculations
     rolling_beta_30d = None
     rolling_beta_90d = None
     
-    if rolling_windows and len(combined) >= 30:
-        rolling_beta_30d = combined['btc'].rolling(30).cov(combined['asset']) / \
-                           combined['btc'].rolling(30).var()
+    if rolling_windows and len(returns) >= 30:
+        rolling_beta_30d = _rolling_beta(btc_dev, asset_dev, 30, return_dates)
         
-        if len(combined) >= 90:
-            rolling_beta_90d = combined['btc'].rolling(90).cov(combined['asset']) / \
-                               combined['btc'].rolling(90).var()
+        if len(returns) >= 90:
+            rolling_beta_90d = _rolling_beta(btc_dev, asset_dev, 90, return_dates)
     
     return BetaMetrics(
         beta=beta,
         correlation=correlation,
-        alpha=alpha * 252,  # Annualized alpha
+        alpha=alpha * TRADING_DAYS_PER_YEAR,  # Annualized alpha
         r_squared=r_squared,
         rolling_beta_30d=rolling_beta_30d,
         rolling_beta_90d=rolling_beta_90d
     )
 
 
+def _scan_drawdowns(
+    prices: np.ndarray,
+    drawdown: np.ndarray,
+    top_n: int
+) -> Tuple[int, int, np.ndarray, np.ndarray]:
+    """
+    Locate the max drawdown and the top N local drawdowns by position.
+    
+    Pure array code so callers only map the returned positions back to dates.
+    
+    Args:
+        prices: Price array
+        drawdown: Drawdown from running max at each position
+        top_n: Number of local drawdowns to return
+        
+    Returns:
+        Tuple of (max_dd_end_idx, max_dd_start_idx, peak_idx, trough_idx)
+        where peak_idx/trough_idx are the top N local drawdowns, worst first
+    """
+    max_dd_end_idx = int(np.argmin(drawdown))
+    max_dd_start_idx = int(np.argmax(prices[:max_dd_end_idx + 1]))
+    
+    # Significant local minima of the drawdown curve (simplified peak detection)
+    minima_mask = (
+        (drawdown[1:-1] < drawdown[:-2]) &
+        (drawdown[1:-1] < drawdown[2:]) &
+        (drawdown[1:-1] < -MIN_DRAWDOWN_THRESHOLD)
+    )
+    trough_idx = np.nonzero(minima_mask)[0] + 1
+    
+    # The peak before each trough is the start of the falling run ending
+    # just before it: the last index whose price did not drop from the day before
+    positions = np.arange(len(prices))
+    run_start = np.r_[True, prices[1:] >= prices[:-1]]
+    run_start_idx = np.maximum.accumulate(np.where(run_start, positions, 0))
+    peak_idx = run_start_idx[trough_idx - 1]
+    
+    # Sort by magnitude (stable, so ties keep date order) and take top N
+    order = np.argsort(drawdown[trough_idx], kind='stable')[:top_n]
+    
+    return max_dd_end_idx, max_dd_start_idx, peak_idx[order], trough_idx[order]
+
+
 def compute_drawdowns(
     session: Session,
     asset: str,
@@ -225,67 +372,38 @@ def compute_drawdowns(
         start_date = end_date - timedelta(days=365)
     
     # Get price data
-    prices = session.query(MarketPrice).filter(
-        and_(
-            MarketPrice.asset == asset,
-            MarketPrice.as_of_date >= start_date,
-            MarketPrice.as_of_date <= end_date
-        )
-    ).order_by(MarketPrice.as_of_date).all()
+    price_series = _load_price_series(session, asset, start_date, end_date)
     
-    if len(prices) < 2:
+    if len(price_series) < 2:
         return None
     
-    # Convert to pandas Series
-    price_series = pd.Series(
-        {p.as_of_date: p.close_price for p in prices}
-    )
-    
-    # Calculate running maximum and drawdown
-    running_max = price_series.expanding().max()
-    drawdown = (price_series - running_max) / running_max
+    # Calculate running maximum and drawdown. Drawdowns are price ratios, so
+    # float32 keeps ~1e-7 relative accuracy at half the memory traffic
+    price_values = price_series.values.astype(np.float32)
+    running_max = np.maximum.accumulate(price_values)
+    drawdown_values = (price_values - running_max) / running_max
+    dates = price_series.index
     
-    max_drawdown = drawdown.min()
-    current_drawdown = drawdown.iloc[-1]
+    max_dd_end_idx, max_dd_start_idx, peak_idx, trough_idx = _scan_drawdowns(
+        price_values, drawdown_values, top_n
+    )
     
-    # Find max drawdown period
-    max_dd_end_idx = drawdown.idxmin()
-    max_dd_end = max_dd_end_idx
+    max_drawdown = float(drawdown_values[max_dd_end_idx])
+    current_drawdown = float(drawdown_values[-1])
     
-    # Find start of max drawdown (last peak before the trough)
-    prices_before_trough = price_series[:max_dd_end_idx]
-    if len(prices_before_trough) > 0:
-        max_dd_start = prices_before_trough.idxmax()
-        max_dd_duration = (max_dd_end - max_dd_start).days
-    else:
-        max_dd_start = None
-        max_dd_duration = None
+    # Max drawdown period runs from the highest price up to the trough
+    max_dd_end = dates[max_dd_end_idx]
+    max_dd_start = dates[max_dd_start_idx]
+    max_dd_duration = (max_dd_end - max_dd_start).days
     
-    # Find top N drawdowns (simplified - just find local minima)
+    # Top N drawdowns, already ordered by magnitude
     top_drawdowns = []
-    drawdown_values = drawdown.values
-    drawdown_dates = list(drawdown.index)
-    
-    # Simple peak detection
-    for i in range(1, len(drawdown_values) - 1):
-        if drawdown_values[i] < drawdown_values[i-1] and drawdown_values[i] < drawdown_values[i+1]:
-            # Local minimum found
-            if drawdown_values[i] < -MIN_DRAWDOWN_THRESHOLD:  # Only significant drawdowns
-                # Find the peak before
-                peak_idx = i - 1
-                while peak_idx > 0 and price_series.iloc[peak_idx] < price_series.iloc[peak_idx - 1]:
-                    peak_idx -= 1
-                
-                peak_date = drawdown_dates[peak_idx]
-                trough_date = drawdown_dates[i]
-                dd_value = drawdown_values[i]
-                duration = (trough_date - peak_date).days
-                
-                top_drawdowns.append((peak_date, trough_date, dd_value, duration))
-    
-    # Sort by magnitude and take top N
-    top_drawdowns.sort(key=lambda x: x[2])
-    top_drawdowns = top_drawdowns[:top_n]
+    for p_i, t_i in zip(peak_idx, trough_idx):
+        peak_date = dates[p_i]
+        trough_date = dates[t_i]
+        top_drawdowns.append(
+            (peak_date, trough_date, float(drawdown_values[t_i]), (trough_date - peak_date).days)
+        )
     
     return DrawdownMetrics(
         max_drawdown=max_drawdown,
@@ -2,11 +2,30 @@
 
 from dataclasses import dataclass
 from datetime import date
-from typing import Optional
+from typing import Optional, Tuple
 from sqlalchemy.orm import Session
+from sqlalchemy import text, bindparam
 
-from ..database.models import UserPosition
-from .nav import get_btc_per_share, compute_nav_metrics
+from ..database.models import OrdinalDate, UserPosition
+from .nav import (
+    NAVMetrics, NAV_INPUTS_CTES, NAV_INPUTS_COLUMNS,
+    get_btc_per_share, compute_nav_metrics, nav_metrics_from_row, remember_btc_price
+)
+
+
+# NAV inputs plus the active position, fetched in one round-trip
+_SIMULATION_INPUTS_SQL = text(
+    NAV_INPUTS_CTES + """,
+    active_position AS (
+        SELECT label, shares, avg_entry_price FROM user_position
+        WHERE is_active = 1
+        ORDER BY id LIMIT 1
+    )
+    SELECT""" + NAV_INPUTS_COLUMNS + """,
+        (SELECT label FROM active_position) AS position_label,
+        (SELECT shares FROM active_position) AS position_shares,
+        (SELECT avg_entry_price FROM active_position) AS position_avg_entry_price
+""").bindparams(bindparam("as_of_date", type_=OrdinalDate))
 
 
 @dataclass
@@ -74,12 +93,10 @@ def compute_position_metrics(
     if as_of_date is None:
         as_of_date = date.today()
     
-    # Get position
-    if position_id:
-        position = get_position_by_id(session, position_id)
-    else:
-        position = get_active_position(session)
+    if position_id is None:
+        return fetch_simulation_inputs(session, as_of_date)[1]
     
+    position = get_position_by_id(session, position_id)
     if not position:
         return None
     
@@ -89,24 +106,67 @@ def compute_position_metrics(
     if not nav_metrics:
         return None
     
+    return _build_position_metrics(
+        position.label, position.shares, position.avg_entry_price, nav_metrics
+    )
+
+
+def fetch_simulation_inputs(
+    session: Session,
+    as_of_date: Optional[date] = None
+) -> Tuple[Optional[NAVMetrics], Optional[PositionMetrics]]:
+    """
+    Fetch NAV metrics and active position metrics in a single query.
+    
+    Args:
+        session: Database session
+        as_of_date: Date to evaluate at (defaults to today)
+        
+    Returns:
+        Tuple of (NAVMetrics or None, PositionMetrics or None)
+    """
+    if as_of_date is None:
+        as_of_date = date.today()
+    
+    row = session.execute(
+        _SIMULATION_INPUTS_SQL, {"as_of_date": as_of_date}
+    ).one()
+    
+    remember_btc_price(session, as_of_date, row.btc_spot_price)
+    nav_metrics = nav_metrics_from_row(row)
+    if not nav_metrics or row.position_shares is None:
+        return nav_metrics, None
+    
+    return nav_metrics, _build_position_metrics(
+        row.position_label, row.position_shares, row.position_avg_entry_price, nav_metrics
+    )
+
+
+def _build_position_metrics(
+    label: str,
+    shares: float,
+    avg_entry_price: float,
+    nav_metrics: NAVMetrics
+) -> PositionMetrics:
+    """Derive position metrics from the position and current NAV metrics."""
     current_price = nav_metrics.mstr_share_price
     btc_per_share = nav_metrics.btc_per_share
     
     # Calculate position metrics
-    current_value = position.shares * current_price
-    cost_basis = position.shares * position.avg_entry_price
+    current_value = shares * current_price
+    cost_basis = shares * avg_entry_price
     unrealized_pnl = current_value - cost_basis
     unrealized_pnl_pct = (unrealized_pnl / cost_basis) * 100 if cost_basis > 0 else 0
     
     # Implied BTC exposure
     implied_btc_exposure = None
     if btc_per_share:
-        implied_btc_exposure = position.shares * btc_per_share
+        implied_btc_exposure = shares * btc_per_share
     
     return PositionMetrics(
-        label=position.label,
-        shares=position.shares,
-        avg_entry_price=position.avg_entry_price,
+        label=label,
+        shares=shares,
+        avg_entry_price=avg_entry_price,
         current_price=current_price,
         current_value=current_value,
         cost_basis=cost_basis,
@@ -2,14 +2,16 @@
 
 from dataclasses import dataclass
 from datetime import date
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
+import numpy as np
 from sqlalchemy.orm import Session
-from sqlalchemy import desc, and_
+from sqlalchemy import select
 
-from ..database.models import HoldingsTranche, MarketPrice
+from ..database.models import HoldingsTranche
+from .nav import get_latest_btc_price
 
 
-@dataclass
+@dataclass(slots=True)
 class TrancheSummary:
     """Summary of a single tranche."""
     id: int
@@ -26,7 +28,7 @@ class TrancheSummary:
     notes: Optional[str]
 
 
-@dataclass
+@dataclass(slots=True)
 class PortfolioSummary:
     """Portfolio-level summary."""
     total_btc: float
@@ -38,7 +40,7 @@ class PortfolioSummary:
     tranches_count: int
 
 
-@dataclass
+@dataclass(slots=True)
 class TrancheAnalysis:
     """Complete tranche analysis."""
     tranches: List[TrancheSummary]
@@ -59,62 +61,101 @@ def get_tranche_summary(
     Returns:
         TrancheAnalysis with individual tranches and portfolio summary
     """
+    result = get_tranche_columns(session, as_of_date)
+    if result is None:
+        return None
+    
+    columns, portfolio = result
+    
+    # Columns are in TrancheSummary field order, so construct positionally
+    tranche_summaries = [
+        TrancheSummary(*values)
+        for values in zip(*columns.values())
+    ]
+    
+    return TrancheAnalysis(
+        tranches=tranche_summaries,
+        portfolio=portfolio
+    )
+
+
+def get_tranche_columns(
+    session: Session,
+    as_of_date: Optional[date] = None
+) -> Optional[Tuple[Dict[str, list], PortfolioSummary]]:
+    """
+    Get tranche metrics as columns, without building per-tranche objects.
+    
+    Args:
+        session: Database session
+        as_of_date: Date to evaluate at (defaults to today)
+        
+    Returns:
+        Tuple of (columns keyed by TrancheSummary field name, PortfolioSummary),
+        or None if there are no tranches or no BTC price
+    """
     if as_of_date is None:
         as_of_date = date.today()
     
-    # Get all tranches up to as_of_date
-    tranches = session.query(HoldingsTranche).filter(
-        HoldingsTranche.as_of_date <= as_of_date
-    ).order_by(HoldingsTranche.as_of_date).all()
+    # Get all tranches up to as_of_date as plain column tuples
+    rows = session.execute(
+        select(
+            HoldingsTranche.id,
+            HoldingsTranche.as_of_date,
+            HoldingsTranche.btc_acquired,
+            HoldingsTranche.usd_spent,
+            HoldingsTranche.source_type,
+            HoldingsTranche.implied_btc_price,
+            HoldingsTranche.notes
+        ).where(
+            HoldingsTranche.as_of_date <= as_of_date
+        ).order_by(HoldingsTranche.as_of_date)
+    ).all()
     
-    if not tranches:
+    if not rows:
         return None
     
-    # Get current BTC price
-    btc_price_rec = session.query(MarketPrice).filter(
-        and_(
-            MarketPrice.as_of_date <= as_of_date,
-            MarketPrice.asset == 'BTC'
-        )
-    ).order_by(desc(MarketPrice.as_of_date)).first()
+    # Get current BTC price (shared with NAV lookups in the same session)
+    current_btc_price = get_latest_btc_price(session, as_of_date)
     
-    if not btc_price_rec:
+    if current_btc_price is None:
         return None
     
-    current_btc_price = btc_price_rec.close_price
+    # Per-tranche metrics computed column-wise
+    n = len(rows)
+    ids, dates, btc_acquired, usd_spent, source_types, implied_prices, notes = (
+        list(column) for column in zip(*rows)
+    )
+    btc = np.array(btc_acquired, dtype=np.float64)
+    usd = np.array(usd_spent, dtype=np.float64)
+    acquired = np.array(dates, dtype='datetime64[D]')
     
-    # Process each tranche
-    tranche_summaries = []
-    total_btc = 0.0
-    total_cost = 0.0
-    total_current_value = 0.0
+    current_values = btc * current_btc_price
+    pnl_abs = current_values - usd
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pnl_pct = np.where(usd > 0, pnl_abs / usd * 100, 0.0)
+    age_days = (np.datetime64(as_of_date, 'D') - acquired).astype(np.int64)
     
-    for tranche in tranches:
-        current_value = tranche.btc_acquired * current_btc_price
-        unrealized_pnl_abs = current_value - tranche.usd_spent
-        unrealized_pnl_pct = (unrealized_pnl_abs / tranche.usd_spent) * 100 if tranche.usd_spent > 0 else 0
-        age_days = (as_of_date - tranche.as_of_date).days
-        
-        tranche_summaries.append(TrancheSummary(
-            id=tranche.id,
-            as_of_date=tranche.as_of_date,
-            btc_acquired=tranche.btc_acquired,
-            usd_spent=tranche.usd_spent,
-            source_type=tranche.source_type,
-            implied_btc_price=tranche.implied_btc_price,
-            current_btc_price=current_btc_price,
-            current_market_value=current_value,
-            unrealized_pnl_abs=unrealized_pnl_abs,
-            unrealized_pnl_pct=unrealized_pnl_pct,
-            age_days=age_days,
-            notes=tranche.notes
-        ))
-        
-        total_btc += tranche.btc_acquired
-        total_cost += tranche.usd_spent
-        total_current_value += current_value
+    # Keep in TrancheSummary field order
+    columns = {
+        "id": ids,
+        "as_of_date": dates,
+        "btc_acquired": btc_acquired,
+        "usd_spent": usd_spent,
+        "source_type": source_types,
+        "implied_btc_price": implied_prices,
+        "current_btc_price": [current_btc_price] * n,
+        "current_market_value": current_values.tolist(),
+        "unrealized_pnl_abs": pnl_abs.tolist(),
+        "unrealized_pnl_pct": pnl_pct.tolist(),
+        "age_days": age_days.tolist(),
+        "notes": notes
+    }
     
     # Calculate portfolio summary
+    total_btc = float(btc.sum())
+    total_cost = float(usd.sum())
+    total_current_value = float(current_values.sum())
     total_unrealized_pnl = total_current_value - total_cost
     total_unrealized_pnl_pct = (total_unrealized_pnl / total_cost) * 100 if total_cost > 0 else 0
     weighted_avg_cost = total_cost / total_btc if total_btc > 0 else 0
@@ -126,10 +167,7 @@ def get_tranche_summary(
         total_unrealized_pnl=total_unrealized_pnl,
         total_unrealized_pnl_pct=total_unrealized_pnl_pct,
         weighted_avg_cost=weighted_avg_cost,
-        tranches_count=len(tranches)
+        tranches_count=n
     )
     
-    return TrancheAnalysis(
-        tranches=tranche_summaries,
-        portfolio=portfolio
-    )
+    return columns, portfolio
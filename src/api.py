@@ -1,21 +1,27 @@
 """REST API for MSTR Bitcoin Tracker."""
 
-from fastapi import FastAPI, HTTPException
+from fastapi import BackgroundTasks, Depends, FastAPI, HTTPException, Request
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Iterator, Optional, List
 from datetime import datetime
-import json
+from functools import lru_cache
+import asyncio
+import orjson
 
-from src.scraper import HoldingsScraper, PriceScraper
+from src.scraper import HoldingsScraper, PriceScraper, close_http_client
 from src.calculator import MetricsCalculator
 from src.simulator import MonteCarloSimulator
 from src.database import DatabaseOperations
+from src.clock import utcnow_cached
 
 app = FastAPI(
     title="MSTR Bitcoin Tracker API",
     description="API for tracking MicroStrategy's Bitcoin holdings and metrics",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware
@@ -28,6 +34,41 @@ app.add_middleware(
 )
 
 
+# Scrapers own pooled HTTP clients, so share one of each per app
+@app.on_event("startup")
+def create_scrapers():
+    """Create the shared scrapers."""
+    app.state.holdings_scraper = HoldingsScraper()
+    app.state.price_scraper = PriceScraper()
+
+
+@app.on_event("shutdown")
+def close_scrapers():
+    """Close the shared scrapers and their process-wide HTTP client."""
+    app.state.holdings_scraper.close()
+    app.state.price_scraper.close()
+    close_http_client()
+
+
+def get_holdings_scraper(request: Request) -> HoldingsScraper:
+    """Dependency returning the shared HoldingsScraper."""
+    return request.app.state.holdings_scraper
+
+
+def get_price_scraper(request: Request) -> PriceScraper:
+    """Dependency returning the shared PriceScraper."""
+    return request.app.state.price_scraper
+
+
+@lru_cache(maxsize=16)
+def _get_simulator(annual_volatility: float, annual_drift: float) -> MonteCarloSimulator:
+    """Get a shared simulator for the given parameters (simulators are stateless)."""
+    return MonteCarloSimulator(
+        annual_volatility=annual_volatility,
+        annual_drift=annual_drift
+    )
+
+
 # Pydantic models
 class HoldingsResponse(BaseModel):
     btc_holdings: float
@@ -95,212 +136,190 @@ def root():
 @app.get("/api/v1/health")
 def health():
     """Health check endpoint."""
-    return {"status": "healthy", "timestamp": datetime.utcnow()}
+    return {"status": "healthy", "timestamp": utcnow_cached()}
 
 
 @app.get("/api/v1/holdings", response_model=HoldingsResponse)
-def get_holdings():
+def get_holdings(holdings_scraper: HoldingsScraper = Depends(get_holdings_scraper)):
     """Get current BTC holdings."""
-    scraper = HoldingsScraper()
-    try:
-        data = scraper.fetch_latest()
-        return HoldingsResponse(
-            btc_holdings=data["btc_holdings"],
-            avg_cost_basis=data["avg_cost_basis"],
-            total_cost=data.get("total_cost", data["btc_holdings"] * data["avg_cost_basis"]),
-            source=data.get("source"),
-            timestamp=data.get("timestamp", datetime.utcnow())
-        )
-    finally:
-        scraper.close()
+    data = holdings_scraper.fetch_latest()
+    return HoldingsResponse(
+        btc_holdings=data["btc_holdings"],
+        avg_cost_basis=data["avg_cost_basis"],
+        total_cost=data.get("total_cost", data["btc_holdings"] * data["avg_cost_basis"]),
+        source=data.get("source"),
+        timestamp=data.get("timestamp") or utcnow_cached()
+    )
 
 
 @app.get("/api/v1/prices", response_model=PriceResponse)
-def get_prices():
+def get_prices(price_scraper: PriceScraper = Depends(get_price_scraper)):
     """Get current BTC and MSTR prices."""
-    scraper = PriceScraper()
-    try:
-        data = scraper.fetch_latest_prices()
-        return PriceResponse(**data)
-    finally:
-        scraper.close()
+    data = price_scraper.fetch_latest_prices()
+    return PriceResponse(**data)
 
 
 @app.get("/api/v1/metrics", response_model=MetricsResponse)
-def get_metrics():
+async def get_metrics(
+    holdings_scraper: HoldingsScraper = Depends(get_holdings_scraper),
+    price_scraper: PriceScraper = Depends(get_price_scraper)
+):
     """Get calculated metrics."""
-    holdings_scraper = HoldingsScraper()
-    price_scraper = PriceScraper()
+    # The two fetches are independent, so wait on them together
+    holdings_data, price_data = await asyncio.gather(
+        run_in_threadpool(holdings_scraper.fetch_latest),
+        run_in_threadpool(price_scraper.fetch_latest_prices)
+    )
     
-    try:
-        holdings_data = holdings_scraper.fetch_latest()
-        price_data = price_scraper.fetch_latest_prices()
-        
-        metrics = MetricsCalculator.calculate(
-            btc_holdings=holdings_data["btc_holdings"],
-            avg_cost_basis=holdings_data["avg_cost_basis"],
-            current_btc_price=price_data["btc_price_usd"],
-            mstr_price=price_data["mstr_price_usd"],
-            mstr_market_cap=price_data.get("mstr_market_cap_usd"),
-            mstr_shares_outstanding=price_data.get("mstr_shares_outstanding")
-        )
-        
-        return MetricsResponse(**MetricsCalculator.to_dict(metrics))
-    finally:
-        holdings_scraper.close()
-        price_scraper.close()
+    metrics = MetricsCalculator.calculate(
+        btc_holdings=holdings_data["btc_holdings"],
+        avg_cost_basis=holdings_data["avg_cost_basis"],
+        current_btc_price=price_data["btc_price_usd"],
+        mstr_price=price_data["mstr_price_usd"],
+        mstr_market_cap=price_data.get("mstr_market_cap_usd"),
+        mstr_shares_outstanding=price_data.get("mstr_shares_outstanding")
+    )
+    
+    return MetricsResponse.model_construct(**MetricsCalculator.to_dict(metrics))
 
 
 @app.post("/api/v1/simulate", response_model=SimulationResponse)
-def simulate(request: SimulationRequest):
+def simulate(
+    request: SimulationRequest,
+    background_tasks: BackgroundTasks,
+    price_scraper: PriceScraper = Depends(get_price_scraper),
+    holdings_scraper: HoldingsScraper = Depends(get_holdings_scraper)
+):
     """Run price simulation."""
-    price_scraper = PriceScraper()
-    holdings_scraper = HoldingsScraper()
+    price_data = price_scraper.fetch_latest_prices()
+    holdings_data = holdings_scraper.fetch_latest()
+    
+    initial_price = price_data["btc_price_usd"]
+    
+    if initial_price == 0:
+        raise HTTPException(status_code=500, detail="Could not fetch BTC price")
+    
+    simulator = _get_simulator(request.volatility, request.drift)
     
+    results = simulator.simulate_with_holdings(
+        initial_price=initial_price,
+        btc_holdings=holdings_data["btc_holdings"],
+        avg_cost_basis=holdings_data["avg_cost_basis"],
+        days=request.days,
+        scenarios=request.scenarios
+    )
+    
+    sim = results["simulation"]
+    
+    # Store in database after the response has been sent
+    background_tasks.add_task(
+        _store_simulation_record,
+        simulation_type="monte_carlo",
+        scenarios=request.scenarios,
+        days=request.days,
+        initial_btc_price=initial_price,
+        mean_price=sim.mean_price,
+        median_price=sim.median_price,
+        std_price=sim.std_price,
+        min_price=sim.min_price,
+        max_price=sim.max_price,
+        percentile_5=sim.percentile_5,
+        percentile_95=sim.percentile_95
+    )
+    
+    return SimulationResponse.model_construct(
+        initial_price=sim.initial_price,
+        scenarios=sim.scenarios,
+        days=sim.days,
+        mean_price=sim.mean_price,
+        median_price=sim.median_price,
+        std_price=sim.std_price,
+        min_price=sim.min_price,
+        max_price=sim.max_price,
+        percentile_5=sim.percentile_5,
+        percentile_25=sim.percentile_25,
+        percentile_75=sim.percentile_75,
+        percentile_95=sim.percentile_95,
+        holdings_analysis=results["holdings_analysis"]
+    )
+
+
+def _store_simulation_record(**fields) -> None:
+    """Store a simulation result using a session of its own."""
+    db = DatabaseOperations()
     try:
-        price_data = price_scraper.fetch_latest_prices()
-        holdings_data = holdings_scraper.fetch_latest()
-        
-        initial_price = price_data["btc_price_usd"]
-        
-        if initial_price == 0:
-            raise HTTPException(status_code=500, detail="Could not fetch BTC price")
-        
-        simulator = MonteCarloSimulator(
-            annual_volatility=request.volatility,
-            annual_drift=request.drift
-        )
-        
-        results = simulator.simulate_with_holdings(
-            initial_price=initial_price,
-            btc_holdings=holdings_data["btc_holdings"],
-            avg_cost_basis=holdings_data["avg_cost_basis"],
-            days=request.days,
-            scenarios=request.scenarios
-        )
-        
-        sim = results["simulation"]
-        
-        # Store in database
-        db = DatabaseOperations()
-        try:
-            db.add_simulation_record(
-                simulation_type="monte_carlo",
-                scenarios=request.scenarios,
-                days=request.days,
-                initial_btc_price=initial_price,
-                mean_price=sim.mean_price,
-                median_price=sim.median_price,
-                std_price=sim.std_price,
-                min_price=sim.min_price,
-                max_price=sim.max_price,
-                percentile_5=sim.percentile_5,
-                percentile_95=sim.percentile_95
-            )
-        finally:
-            db.close()
-        
-        return SimulationResponse(
-            initial_price=sim.initial_price,
-            scenarios=sim.scenarios,
-            days=sim.days,
-            mean_price=sim.mean_price,
-            median_price=sim.median_price,
-            std_price=sim.std_price,
-            min_price=sim.min_price,
-            max_price=sim.max_price,
-            percentile_5=sim.percentile_5,
-            percentile_25=sim.percentile_25,
-            percentile_75=sim.percentile_75,
-            percentile_95=sim.percentile_95,
-            holdings_analysis=results["holdings_analysis"]
-        )
+        db.add_simulation_record(**fields)
     finally:
-        price_scraper.close()
-        holdings_scraper.close()
+        db.close()
 
 
 @app.get("/api/v1/history/holdings")
 def get_holdings_history(days: Optional[int] = 30, limit: Optional[int] = 100):
-    """Get holdings history."""
+    """Get holdings history as newline-delimited JSON."""
     db = DatabaseOperations()
-    try:
-        records = db.get_holdings_history(days=days, limit=limit)
-        return [
-            {
-                "id": r.id,
-                "timestamp": r.timestamp.isoformat(),
-                "btc_holdings": r.btc_holdings,
-                "avg_cost_basis": r.avg_cost_basis,
-                "total_cost": r.total_cost,
-                "source": r.source,
-                "notes": r.notes
-            }
-            for r in records
-        ]
-    finally:
-        db.close()
+    return _stream_ndjson(db, db.stream_holdings_history(days=days, limit=limit))
 
 
 @app.get("/api/v1/history/prices")
 def get_price_history(days: Optional[int] = 30, limit: Optional[int] = 100):
-    """Get price history."""
+    """Get price history as newline-delimited JSON."""
     db = DatabaseOperations()
-    try:
-        records = db.get_price_history(days=days, limit=limit)
-        return [
-            {
-                "id": r.id,
-                "timestamp": r.timestamp.isoformat(),
-                "btc_price_usd": r.btc_price_usd,
-                "mstr_price_usd": r.mstr_price_usd,
-                "mstr_market_cap_usd": r.mstr_market_cap_usd,
-                "mstr_shares_outstanding": r.mstr_shares_outstanding
-            }
-            for r in records
-        ]
-    finally:
-        db.close()
+    return _stream_ndjson(db, db.stream_price_history(days=days, limit=limit))
+
+
+def _stream_ndjson(db: DatabaseOperations, rows: Iterator[dict]) -> StreamingResponse:
+    """Stream rows as NDJSON, closing the database session once sent."""
+    def generate():
+        try:
+            for row in rows:
+                yield orjson.dumps(row) + b"\n"
+        finally:
+            db.close()
+    
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
 
 
 @app.post("/api/v1/fetch")
-def fetch_and_store():
+async def fetch_and_store(
+    holdings_scraper: HoldingsScraper = Depends(get_holdings_scraper),
+    price_scraper: PriceScraper = Depends(get_price_scraper)
+):
     """Fetch latest data and store in database."""
-    holdings_scraper = HoldingsScraper()
-    price_scraper = PriceScraper()
+    holdings_data, price_data = await asyncio.gather(
+        run_in_threadpool(holdings_scraper.fetch_latest),
+        run_in_threadpool(price_scraper.fetch_latest_prices)
+    )
     
+    # Database writes are blocking, so keep them off the event loop
+    return await run_in_threadpool(_store_fetched_data, holdings_data, price_data)
+
+
+def _store_fetched_data(holdings_data: dict, price_data: dict) -> dict:
+    """Store fetched holdings and prices, returning the fetch response."""
+    db = DatabaseOperations()
     try:
-        holdings_data = holdings_scraper.fetch_latest()
-        price_data = price_scraper.fetch_latest_prices()
+        holdings_record = db.add_holdings_record(
+            btc_holdings=holdings_data["btc_holdings"],
+            avg_cost_basis=holdings_data["avg_cost_basis"],
+            total_cost=holdings_data.get("total_cost", holdings_data["btc_holdings"] * holdings_data["avg_cost_basis"]),
+            source=holdings_data.get("source"),
+            timestamp=holdings_data.get("timestamp")
+        )
+        price_record = db.add_price_record(
+            btc_price_usd=price_data["btc_price_usd"],
+            mstr_price_usd=price_data["mstr_price_usd"],
+            mstr_market_cap_usd=price_data.get("mstr_market_cap_usd"),
+            mstr_shares_outstanding=price_data.get("mstr_shares_outstanding")
+        )
         
-        # Store in database
-        db = DatabaseOperations()
-        try:
-            holdings_record = db.add_holdings_record(
-                btc_holdings=holdings_data["btc_holdings"],
-                avg_cost_basis=holdings_data["avg_cost_basis"],
-                total_cost=holdings_data.get("total_cost", holdings_data["btc_holdings"] * holdings_data["avg_cost_basis"]),
-                source=holdings_data.get("source"),
-                timestamp=holdings_data.get("timestamp")
-            )
-            price_record = db.add_price_record(
-                btc_price_usd=price_data["btc_price_usd"],
-                mstr_price_usd=price_data["mstr_price_usd"],
-                mstr_market_cap_usd=price_data.get("mstr_market_cap_usd"),
-                mstr_shares_outstanding=price_data.get("mstr_shares_outstanding")
-            )
-            
-            return {
-                "status": "success",
-                "holdings_record_id": holdings_record.id,
-                "price_record_id": price_record.id,
-                "timestamp": datetime.utcnow().isoformat()
-            }
-        finally:
-            db.close()
+        return {
+            "status": "success",
+            "holdings_record_id": holdings_record.id,
+            "price_record_id": price_record.id,
+            "timestamp": utcnow_cached().isoformat()
+        }
     finally:
-        holdings_scraper.close()
-        price_scraper.close()
+        db.close()
 
 
 if __name__ == "__main__":
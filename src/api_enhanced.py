@@ -1,21 +1,27 @@
 """Enhanced REST API for MSTR Bitcoin Tracker."""
 
 from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
+from dataclasses import asdict, replace
 from datetime import datetime, date
-import json
+import numpy as np
+import threading
+import time
 
 from src.database.session import get_db_session
 from src.analytics import nav, tranches, position
 from src.simulation import mc_paths, scenarios, risk
 from src.database.models import SimulationRun
+from src.clock import utcnow_cached
 
 app = FastAPI(
     title="MSTR Bitcoin Tracker API",
     description="Enhanced API for comprehensive MicroStrategy Bitcoin tracking and analytics",
-    version="2.0.0"
+    version="2.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware
@@ -28,6 +34,43 @@ app.add_middleware(
 )
 
 
+# Process-wide NAV metrics cache: (date, nav data version) -> (stored at, metrics)
+NAV_CACHE_TTL_SECONDS = 60
+NAV_CACHE_MAXSIZE = 128
+_nav_cache: Dict[tuple, tuple] = {}
+_nav_cache_lock = threading.Lock()
+
+
+def _cached_nav_metrics(session, query_date: date) -> Optional[nav.NAVMetrics]:
+    """
+    Get NAV metrics for a date, reusing results computed within the TTL.
+    
+    Entries are keyed on the NAV data version, so writes to NAV inputs made
+    in this process are picked up immediately; writes from other processes
+    are picked up once the TTL expires.
+    """
+    key = (query_date.isoformat(), nav.get_nav_data_version())
+    now = time.monotonic()
+    
+    with _nav_cache_lock:
+        entry = _nav_cache.get(key)
+    if entry is not None and now - entry[0] < NAV_CACHE_TTL_SECONDS:
+        return entry[1]
+    
+    nav_metrics = nav.compute_nav_metrics(session, query_date)
+    
+    with _nav_cache_lock:
+        if len(_nav_cache) >= NAV_CACHE_MAXSIZE:
+            # Drop expired entries first, then the oldest if still full
+            for stale in [k for k, v in _nav_cache.items() if now - v[0] >= NAV_CACHE_TTL_SECONDS]:
+                del _nav_cache[stale]
+            if len(_nav_cache) >= NAV_CACHE_MAXSIZE:
+                del _nav_cache[min(_nav_cache, key=lambda k: _nav_cache[k][0])]
+        _nav_cache[key] = (now, nav_metrics)
+    
+    return nav_metrics
+
+
 # Pydantic models
 class SummaryResponse(BaseModel):
     """Summary of today's metrics."""
@@ -99,6 +142,7 @@ class SimulateRequest(BaseModel):
     scenario_name: Optional[str] = "base"
     horizon_days: Optional[int] = None
     num_paths: Optional[int] = None
+    keep_paths: Optional[bool] = False
 
 
 class SimulateResponse(BaseModel):
@@ -125,14 +169,14 @@ def root():
 @app.get("/api/v1/health")
 def health():
     """Health check endpoint."""
-    return {"status": "healthy", "timestamp": datetime.utcnow()}
+    return {"status": "healthy", "timestamp": utcnow_cached()}
 
 
 @app.get("/api/v1/summary/today", response_model=SummaryResponse)
 def get_summary_today():
     """Get high-level summary for today."""
     with get_db_session() as session:
-        nav_metrics = nav.compute_nav_metrics(session, date.today())
+        nav_metrics = _cached_nav_metrics(session, date.today())
         
         if not nav_metrics:
             raise HTTPException(status_code=404, detail="No data available for today")
@@ -141,7 +185,7 @@ def get_summary_today():
         if nav_metrics.shares_outstanding and nav_metrics.shares_outstanding > 0:
             btc_nav_per_share = nav_metrics.btc_nav_usd / nav_metrics.shares_outstanding
         
-        return SummaryResponse(
+        return SummaryResponse.model_construct(
             date=date.today().isoformat(),
             total_btc=nav_metrics.total_btc,
             btc_spot=nav_metrics.btc_spot_price,
@@ -168,12 +212,12 @@ def get_nav(
             raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
     
     with get_db_session() as session:
-        nav_metrics = nav.compute_nav_metrics(session, query_date)
+        nav_metrics = _cached_nav_metrics(session, query_date)
         
         if not nav_metrics:
             raise HTTPException(status_code=404, detail=f"No data available for {query_date}")
         
-        return NAVResponse(
+        return NAVResponse.model_construct(
             date=query_date.isoformat(),
             total_btc=nav_metrics.total_btc,
             btc_spot_price=nav_metrics.btc_spot_price,
@@ -204,42 +248,27 @@ def get_tranches(
             raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
     
     with get_db_session() as session:
-        tranche_analysis = tranches.get_tranche_summary(session, query_date)
+        tranche_columns = tranches.get_tranche_columns(session, query_date)
         
-        if not tranche_analysis:
+        if not tranche_columns:
             raise HTTPException(status_code=404, detail=f"No tranches data for {query_date}")
         
+        columns, portfolio = tranche_columns
+        columns["as_of_date"] = [d.isoformat() for d in columns["as_of_date"]]
+        
+        # Build the TrancheDetail rows straight from the columns
+        detail_keys = list(TrancheDetail.model_fields)
         tranche_details = [
-            TrancheDetail(
-                id=t.id,
-                as_of_date=t.as_of_date.isoformat(),
-                btc_acquired=t.btc_acquired,
-                usd_spent=t.usd_spent,
-                source_type=t.source_type,
-                implied_btc_price=t.implied_btc_price,
-                current_market_value=t.current_market_value,
-                unrealized_pnl_abs=t.unrealized_pnl_abs,
-                unrealized_pnl_pct=t.unrealized_pnl_pct,
-                age_days=t.age_days
-            )
-            for t in tranche_analysis.tranches
+            dict(zip(detail_keys, values))
+            for values in zip(*(columns[key] for key in detail_keys))
         ]
         
-        portfolio_summary = {
-            "total_btc": tranche_analysis.portfolio.total_btc,
-            "total_cost": tranche_analysis.portfolio.total_cost,
-            "total_current_value": tranche_analysis.portfolio.total_current_value,
-            "total_unrealized_pnl": tranche_analysis.portfolio.total_unrealized_pnl,
-            "total_unrealized_pnl_pct": tranche_analysis.portfolio.total_unrealized_pnl_pct,
-            "weighted_avg_cost": tranche_analysis.portfolio.weighted_avg_cost,
-            "tranches_count": tranche_analysis.portfolio.tranches_count
-        }
-        
-        return TranchesResponse(
-            date=query_date.isoformat(),
-            tranches=tranche_details,
-            portfolio_summary=portfolio_summary
-        )
+        # Already typed by the analytics layer; skip response model validation
+        return ORJSONResponse({
+            "date": query_date.isoformat(),
+            "tranches": tranche_details,
+            "portfolio_summary": asdict(portfolio)
+        })
 
 
 @app.get("/api/v1/my-position", response_model=PositionResponse)
@@ -251,7 +280,7 @@ def get_my_position():
         if not pos_metrics:
             raise HTTPException(status_code=404, detail="No active position found")
         
-        return PositionResponse(
+        return PositionResponse.model_construct(
             label=pos_metrics.label,
             shares=pos_metrics.shares,
             avg_entry_price=pos_metrics.avg_entry_price,
@@ -272,20 +301,24 @@ def simulate(request: SimulateRequest):
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     
-    # Override if provided
+    # Override if provided, on a copy so the shared preset is left untouched
+    overrides = {}
     if request.horizon_days:
-        scenario_config.horizon_days = request.horizon_days
+        overrides["horizon_days"] = request.horizon_days
     if request.num_paths:
-        scenario_config.num_paths = request.num_paths
+        overrides["num_paths"] = request.num_paths
+    if overrides:
+        scenario_config = replace(scenario_config, **overrides)
     
     with get_db_session() as session:
-        # Get current metrics
-        nav_metrics = nav.compute_nav_metrics(session, date.today())
+        # Get current NAV and personal position metrics in one query
+        nav_metrics, pos_metrics = position.fetch_simulation_inputs(session, date.today())
         if not nav_metrics:
             raise HTTPException(status_code=404, detail="Insufficient data for simulation")
         
-        # Run simulation
-        sim_paths = mc_paths.simulate_joint_btc_mstr_paths(
+        # Run simulation (risk metrics only need terminal prices, which have
+        # a closed form unless the full paths are requested)
+        model_params = dict(
             initial_btc_price=nav_metrics.btc_spot_price,
             initial_mstr_price=nav_metrics.mstr_share_price,
             horizon_days=scenario_config.horizon_days,
@@ -294,25 +327,26 @@ def simulate(request: SimulateRequest):
             btc_sigma=scenario_config.btc_sigma,
             beta=scenario_config.mstr_beta,
             alpha=scenario_config.mstr_alpha,
-            residual_sigma=scenario_config.mstr_residual_sigma
+            residual_sigma=scenario_config.mstr_residual_sigma,
+            antithetic=True
         )
-        
-        # Compute risk metrics
-        btc_final = sim_paths.btc_paths[:, -1]
-        mstr_final = sim_paths.mstr_paths[:, -1]
-        
-        btc_risk = risk.compute_risk_metrics(btc_final, nav_metrics.btc_spot_price)
-        mstr_risk = risk.compute_risk_metrics(mstr_final, nav_metrics.mstr_share_price)
-        
-        # Get personal position if exists
-        pos_metrics = position.compute_position_metrics(session)
-        portfolio_risk_metrics = None
-        if pos_metrics:
-            portfolio_risk_metrics = risk.compute_portfolio_risk(
-                btc_final, mstr_final,
-                nav_metrics.btc_spot_price, nav_metrics.mstr_share_price,
-                pos_metrics.shares
+        if request.keep_paths:
+            sim_paths = mc_paths.simulate_joint_btc_mstr_paths(
+                **model_params, dtype=mc_paths.SCENARIO_DTYPE
             )
+            btc_final = sim_paths.btc_paths[:, -1]
+            mstr_final = sim_paths.mstr_paths[:, -1]
+        else:
+            btc_final, mstr_final = mc_paths.simulate_joint_final_prices(**model_params)
+        
+        # Compute risk metrics for BTC and MSTR in one batched pass. The
+        # personal position holds only MSTR, so its returns (and metrics)
+        # are MSTR's; the share count cancels
+        btc_risk, mstr_risk = risk.compute_risk_metrics_batched(
+            np.vstack([btc_final, mstr_final]),
+            [nav_metrics.btc_spot_price, nav_metrics.mstr_share_price]
+        )
+        portfolio_risk_metrics = mstr_risk if pos_metrics else None
         
         # Store simulation run
         risk_summary = risk.create_risk_summary(btc_risk, mstr_risk, portfolio_risk_metrics)
@@ -324,57 +358,22 @@ def simulate(request: SimulateRequest):
             num_paths=scenario_config.num_paths,
             seed=None,
             input_snapshot_date=date.today(),
-            results_summary_json=json.dumps(risk_summary)
+            results_summary_json=risk_summary
         )
         session.add(sim_run)
         session.flush()
         
         run_id = sim_run.id
         
-        # Format response
-        btc_risk_dict = {
-            "var_95": btc_risk.var_95,
-            "cvar_95": btc_risk.cvar_95,
-            "var_99": btc_risk.var_99,
-            "cvar_99": btc_risk.cvar_99,
-            "mean_return": btc_risk.mean_return,
-            "median_return": btc_risk.median_return,
-            "std_return": btc_risk.std_return,
-            "percentiles": btc_risk.percentiles
-        }
-        
-        mstr_risk_dict = {
-            "var_95": mstr_risk.var_95,
-            "cvar_95": mstr_risk.cvar_95,
-            "var_99": mstr_risk.var_99,
-            "cvar_99": mstr_risk.cvar_99,
-            "mean_return": mstr_risk.mean_return,
-            "median_return": mstr_risk.median_return,
-            "std_return": mstr_risk.std_return,
-            "percentiles": mstr_risk.percentiles
-        }
-        
-        portfolio_risk_dict = None
-        if portfolio_risk_metrics:
-            portfolio_risk_dict = {
-                "var_95": portfolio_risk_metrics.var_95,
-                "cvar_95": portfolio_risk_metrics.cvar_95,
-                "var_99": portfolio_risk_metrics.var_99,
-                "cvar_99": portfolio_risk_metrics.cvar_99,
-                "mean_return": portfolio_risk_metrics.mean_return,
-                "median_return": portfolio_risk_metrics.median_return,
-                "std_return": portfolio_risk_metrics.std_return,
-                "percentiles": portfolio_risk_metrics.percentiles
-            }
-        
-        return SimulateResponse(
+        # Reuse the summary dicts for the response
+        return SimulateResponse.model_construct(
             run_id=run_id,
             scenario_name=scenario_config.name,
             horizon_days=scenario_config.horizon_days,
             num_paths=scenario_config.num_paths,
-            btc_risk=btc_risk_dict,
-            mstr_risk=mstr_risk_dict,
-            portfolio_risk=portfolio_risk_dict
+            btc_risk=risk_summary["btc"],
+            mstr_risk=risk_summary["mstr"],
+            portfolio_risk=risk_summary.get("portfolio")
         )
 
 
@@ -387,7 +386,7 @@ def get_simulation_run(run_id: int):
         if not sim_run:
             raise HTTPException(status_code=404, detail=f"Simulation run {run_id} not found")
         
-        results = json.loads(sim_run.results_summary_json)
+        results = sim_run.results_summary_json
         
         return {
             "run_id": sim_run.id,
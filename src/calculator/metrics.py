@@ -1,10 +1,13 @@
 """Calculate metrics like average cost, NAV ratio, etc."""
 
 from typing import Dict, Optional
-from dataclasses import dataclass
+from dataclasses import dataclass, fields
+from operator import attrgetter
 
+import numpy as np
 
-@dataclass
+
+@dataclass(slots=True, frozen=True)
 class Metrics:
     """Container for calculated metrics."""
     
@@ -21,6 +24,10 @@ class Metrics:
     premium_discount: Optional[float]  # Positive = premium, Negative = discount
 
 
+_METRICS_FIELDS = tuple(f.name for f in fields(Metrics))
+_get_metrics_values = attrgetter(*_METRICS_FIELDS)
+
+
 class MetricsCalculator:
     """Calculate various metrics for MSTR Bitcoin holdings."""
     
@@ -87,19 +94,78 @@ class MetricsCalculator:
         )
     
     @staticmethod
-    def to_dict(metrics: Metrics) -> Dict:
-        """Convert Metrics to dictionary."""
+    def calculate_batch(
+        btc_holdings: np.ndarray,
+        avg_cost_basis: np.ndarray,
+        current_btc_price: np.ndarray,
+        mstr_price: np.ndarray,
+        mstr_market_cap: Optional[np.ndarray] = None,
+        mstr_shares_outstanding: Optional[np.ndarray] = None
+    ) -> Dict[str, np.ndarray]:
+        """
+        Calculate metrics for many records at once.
+        
+        Vectorized counterpart of ``calculate``: inputs are broadcast as
+        float64 arrays and each metric is returned as an array, so callers
+        iterating history rows or scenarios do not recompute in Python.
+        Missing values are NaN and propagate instead of branching per record.
+        
+        Args:
+            btc_holdings: Number of BTC held per record
+            avg_cost_basis: Average cost per BTC per record
+            current_btc_price: BTC price per record
+            mstr_price: MSTR stock price per record
+            mstr_market_cap: MSTR market cap per record (NaN where unknown)
+            mstr_shares_outstanding: Shares outstanding per record, used where
+                the market cap is NaN
+        
+        Returns:
+            Dictionary of arrays keyed by Metrics field name; ``nav_ratio``
+            and ``premium_discount`` are NaN where they cannot be computed
+        """
+        if mstr_market_cap is None:
+            mstr_market_cap = np.nan
+        if mstr_shares_outstanding is None:
+            mstr_shares_outstanding = np.nan
+        holdings, cost, btc_price, mstr, market_cap, shares = np.broadcast_arrays(
+            *(np.asarray(a, dtype=np.float64) for a in (
+                btc_holdings, avg_cost_basis, current_btc_price, mstr_price,
+                mstr_market_cap, mstr_shares_outstanding
+            ))
+        )
+        
+        total_cost = holdings * cost
+        current_holdings_value = holdings * btc_price
+        unrealized_gain_loss = current_holdings_value - total_cost
+        market_cap = np.where(np.isnan(market_cap), mstr * shares, market_cap)
+        
+        with np.errstate(divide="ignore", invalid="ignore"):
+            unrealized_gain_loss_pct = np.where(
+                total_cost > 0, unrealized_gain_loss / total_cost * 100, 0.0
+            )
+            # NaN out records without a usable market cap or BTC value so the
+            # ratios below are straight-line arithmetic
+            nav_value = np.where(
+                (market_cap > 0) & (current_holdings_value > 0), current_holdings_value, np.nan
+            )
+            nav_ratio = market_cap / nav_value
+            premium_discount = (market_cap - nav_value) / nav_value * 100
+        
         return {
-            "btc_holdings": metrics.btc_holdings,
-            "avg_cost_basis": metrics.avg_cost_basis,
-            "total_cost": metrics.total_cost,
-            "current_btc_price": metrics.current_btc_price,
-            "current_holdings_value": metrics.current_holdings_value,
-            "unrealized_gain_loss": metrics.unrealized_gain_loss,
-            "unrealized_gain_loss_pct": metrics.unrealized_gain_loss_pct,
-            "mstr_price": metrics.mstr_price,
-            "mstr_market_cap": metrics.mstr_market_cap,
-            "nav_ratio": metrics.nav_ratio,
-            "premium_discount": metrics.premium_discount
+            "btc_holdings": holdings,
+            "avg_cost_basis": cost,
+            "total_cost": total_cost,
+            "current_btc_price": btc_price,
+            "current_holdings_value": current_holdings_value,
+            "unrealized_gain_loss": unrealized_gain_loss,
+            "unrealized_gain_loss_pct": unrealized_gain_loss_pct,
+            "mstr_price": mstr,
+            "mstr_market_cap": market_cap,
+            "nav_ratio": nav_ratio,
+            "premium_discount": premium_discount
         }
-
+    
+    @staticmethod
+    def to_dict(metrics: Metrics) -> Dict:
+        """Convert Metrics to dictionary."""
+        return dict(zip(_METRICS_FIELDS, _get_metrics_values(metrics)))
@@ -1,21 +1,90 @@
 """CLI interface for MSTR Bitcoin Tracker."""
 
 import click
-import json
+import orjson
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from operator import methodcaller
+from pathlib import Path
+from typing import Dict, List, Tuple
 from rich.console import Console
 from rich.table import Table
 from rich.panel import Panel
+from rich.text import Text
 from rich import box
 
 from src.scraper import HoldingsScraper, PriceScraper
 from src.calculator import MetricsCalculator
 from src.calculator.metrics import Metrics
 from src.simulator import MonteCarloSimulator
+from src.simulator.monte_carlo import SimulationResults
 from src.database import DatabaseOperations
+from src.config import settings
 
 console = Console()
 
+# Latest fetch results, shared between CLI invocations for --use-cache
+FETCH_CACHE_PATH = Path(settings.database_path).parent / "latest_fetch.json"
+
+
+def _load_latest(use_cache: bool = False) -> Tuple[Dict, Dict]:
+    """
+    Get the latest holdings and price data, fetching both concurrently.
+    
+    Args:
+        use_cache: Reuse the last fetch if it is younger than
+            settings.fetch_cache_ttl_seconds
+        
+    Returns:
+        Tuple of (holdings_data, price_data)
+    """
+    if use_cache:
+        cached = _read_fetch_cache()
+        if cached is not None:
+            return cached
+    
+    holdings_scraper = HoldingsScraper()
+    price_scraper = PriceScraper()
+    try:
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            holdings_future = executor.submit(holdings_scraper.fetch_latest)
+            price_future = executor.submit(price_scraper.fetch_latest_prices)
+            holdings_data = holdings_future.result()
+            price_data = price_future.result()
+    finally:
+        holdings_scraper.close()
+        price_scraper.close()
+    
+    _write_fetch_cache(holdings_data, price_data)
+    return holdings_data, price_data
+
+
+def _read_fetch_cache():
+    """Return cached (holdings_data, price_data) if still fresh, else None."""
+    try:
+        if time.time() - FETCH_CACHE_PATH.stat().st_mtime > settings.fetch_cache_ttl_seconds:
+            return None
+        cached = orjson.loads(FETCH_CACHE_PATH.read_bytes())
+    except (OSError, ValueError):
+        return None
+    
+    for data in (cached["holdings"], cached["prices"]):
+        if data.get("timestamp"):
+            data["timestamp"] = datetime.fromisoformat(data["timestamp"])
+    return cached["holdings"], cached["prices"]
+
+
+def _write_fetch_cache(holdings_data: Dict, price_data: Dict) -> None:
+    """Save fetch results for later --use-cache runs (best effort)."""
+    try:
+        FETCH_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        FETCH_CACHE_PATH.write_bytes(orjson.dumps(
+            {"holdings": holdings_data, "prices": price_data}, default=str
+        ))
+    except OSError:
+        pass
+
 
 @click.group()
 def cli():
@@ -28,31 +97,38 @@ def fetch():
     """Fetch latest data and display metrics."""
     console.print("[bold blue]Fetching latest data...[/bold blue]")
     
-    # Fetch data
-    holdings_scraper = HoldingsScraper()
-    price_scraper = PriceScraper()
+    # Fetch data (always fresh, since it is stored)
+    holdings_data, price_data = _load_latest()
     
-    try:
-        holdings_data = holdings_scraper.fetch_latest()
-        price_data = price_scraper.fetch_latest_prices()
+    # Calculate metrics
+    metrics = MetricsCalculator.calculate(
+        btc_holdings=holdings_data["btc_holdings"],
+        avg_cost_basis=holdings_data["avg_cost_basis"],
+        current_btc_price=price_data["btc_price_usd"],
+        mstr_price=price_data["mstr_price_usd"],
+        mstr_market_cap=price_data.get("mstr_market_cap_usd"),
+        mstr_shares_outstanding=price_data.get("mstr_shares_outstanding")
+    )
+    
+    # Store in database on a worker thread while the results are displayed
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        store = executor.submit(_store_latest, holdings_data, price_data, metrics.total_cost)
         
-        # Calculate metrics
-        metrics = MetricsCalculator.calculate(
-            btc_holdings=holdings_data["btc_holdings"],
-            avg_cost_basis=holdings_data["avg_cost_basis"],
-            current_btc_price=price_data["btc_price_usd"],
-            mstr_price=price_data["mstr_price_usd"],
-            mstr_market_cap=price_data.get("mstr_market_cap_usd"),
-            mstr_shares_outstanding=price_data.get("mstr_shares_outstanding")
-        )
+        # Display results
+        display_metrics(metrics, holdings_data, price_data)
         
-        # Store in database
-        db = DatabaseOperations()
-        try:
+        store.result()
+
+
+def _store_latest(holdings_data: Dict, price_data: Dict, total_cost: float) -> None:
+    """Store fetched holdings and price data."""
+    db = DatabaseOperations()
+    try:
+        with db.batch():
             db.add_holdings_record(
                 btc_holdings=holdings_data["btc_holdings"],
                 avg_cost_basis=holdings_data["avg_cost_basis"],
-                total_cost=holdings_data.get("total_cost", metrics.total_cost),
+                total_cost=holdings_data.get("total_cost", total_cost),
                 source=holdings_data.get("source"),
                 timestamp=holdings_data.get("timestamp")
             )
@@ -62,81 +138,63 @@ def fetch():
                 mstr_market_cap_usd=price_data.get("mstr_market_cap_usd"),
                 mstr_shares_outstanding=price_data.get("mstr_shares_outstanding")
             )
-        finally:
-            db.close()
-        
-        # Display results
-        display_metrics(metrics, holdings_data, price_data)
-        
     finally:
-        holdings_scraper.close()
-        price_scraper.close()
+        db.close()
 
 
 @cli.command()
-def holdings():
+@click.option("--use-cache", is_flag=True, help="Reuse data fetched within the cache TTL")
+def holdings(use_cache):
     """Show current BTC holdings."""
     console.print("[bold blue]Fetching holdings data...[/bold blue]")
     
-    holdings_scraper = HoldingsScraper()
-    try:
-        data = holdings_scraper.fetch_latest()
-        
-        table = Table(title="MicroStrategy BTC Holdings", box=box.ROUNDED)
-        table.add_column("Metric", style="cyan")
-        table.add_column("Value", style="green", justify="right")
-        
-        table.add_row("BTC Holdings", f"{data['btc_holdings']:,.2f} BTC")
-        table.add_row("Average Cost Basis", f"${data['avg_cost_basis']:,.2f}")
-        table.add_row("Total Cost", f"${data.get('total_cost', data['btc_holdings'] * data['avg_cost_basis']):,.2f}")
-        table.add_row("Source", data.get("source", "unknown"))
-        
-        console.print(table)
-    finally:
-        holdings_scraper.close()
+    data, _ = _load_latest(use_cache)
+    
+    table = Table(title="MicroStrategy BTC Holdings", box=box.ROUNDED)
+    table.add_column("Metric", style="cyan")
+    table.add_column("Value", style="green", justify="right")
+    
+    table.add_row("BTC Holdings", f"{data['btc_holdings']:,.2f} BTC")
+    table.add_row("Average Cost Basis", f"${data['avg_cost_basis']:,.2f}")
+    table.add_row("Total Cost", f"${data.get('total_cost', data['btc_holdings'] * data['avg_cost_basis']):,.2f}")
+    table.add_row("Source", data.get("source", "unknown"))
+    
+    console.print(table)
 
 
 @cli.command()
-def nav():
+@click.option("--use-cache", is_flag=True, help="Reuse data fetched within the cache TTL")
+def nav(use_cache):
     """Calculate and display NAV ratio."""
     console.print("[bold blue]Calculating NAV ratio...[/bold blue]")
     
-    holdings_scraper = HoldingsScraper()
-    price_scraper = PriceScraper()
+    holdings_data, price_data = _load_latest(use_cache)
     
-    try:
-        holdings_data = holdings_scraper.fetch_latest()
-        price_data = price_scraper.fetch_latest_prices()
-        
-        metrics = MetricsCalculator.calculate(
-            btc_holdings=holdings_data["btc_holdings"],
-            avg_cost_basis=holdings_data["avg_cost_basis"],
-            current_btc_price=price_data["btc_price_usd"],
-            mstr_price=price_data["mstr_price_usd"],
-            mstr_market_cap=price_data.get("mstr_market_cap_usd"),
-            mstr_shares_outstanding=price_data.get("mstr_shares_outstanding")
+    metrics = MetricsCalculator.calculate(
+        btc_holdings=holdings_data["btc_holdings"],
+        avg_cost_basis=holdings_data["avg_cost_basis"],
+        current_btc_price=price_data["btc_price_usd"],
+        mstr_price=price_data["mstr_price_usd"],
+        mstr_market_cap=price_data.get("mstr_market_cap_usd"),
+        mstr_shares_outstanding=price_data.get("mstr_shares_outstanding")
+    )
+    
+    table = Table(title="NAV Ratio Analysis", box=box.ROUNDED)
+    table.add_column("Metric", style="cyan")
+    table.add_column("Value", style="green", justify="right")
+    
+    table.add_row("BTC Holdings Value", f"${metrics.current_holdings_value:,.2f}")
+    table.add_row("MSTR Market Cap", f"${metrics.mstr_market_cap:,.2f}" if metrics.mstr_market_cap else "N/A")
+    table.add_row("NAV Ratio", f"{metrics.nav_ratio:.4f}" if metrics.nav_ratio else "N/A")
+    
+    if metrics.premium_discount is not None:
+        style = "red" if metrics.premium_discount > 0 else "green"
+        table.add_row(
+            "Premium/Discount",
+            Text(f"{metrics.premium_discount:+.2f}%", style=style)
         )
-        
-        table = Table(title="NAV Ratio Analysis", box=box.ROUNDED)
-        table.add_column("Metric", style="cyan")
-        table.add_column("Value", style="green", justify="right")
-        
-        table.add_row("BTC Holdings Value", f"${metrics.current_holdings_value:,.2f}")
-        table.add_row("MSTR Market Cap", f"${metrics.mstr_market_cap:,.2f}" if metrics.mstr_market_cap else "N/A")
-        table.add_row("NAV Ratio", f"{metrics.nav_ratio:.4f}" if metrics.nav_ratio else "N/A")
-        
-        if metrics.premium_discount is not None:
-            style = "red" if metrics.premium_discount > 0 else "green"
-            table.add_row(
-                "Premium/Discount",
-                f"[{style}]{metrics.premium_discount:+.2f}%[/{style}]"
-            )
-        
-        console.print(table)
-        
-    finally:
-        holdings_scraper.close()
-        price_scraper.close()
+    
+    console.print(table)
 
 
 @cli.command()
@@ -144,38 +202,38 @@ def nav():
 @click.option("--days", default=30, help="Number of days to simulate")
 @click.option("--volatility", default=0.80, help="Annual volatility (default 0.80)")
 @click.option("--drift", default=0.20, help="Annual drift (default 0.20)")
-def simulate(scenarios, days, volatility, drift):
+@click.option("--use-cache", is_flag=True, help="Reuse data fetched within the cache TTL")
+def simulate(scenarios, days, volatility, drift, use_cache):
     """Run price simulations."""
     console.print(f"[bold blue]Running simulation ({scenarios} scenarios, {days} days)...[/bold blue]")
     
-    price_scraper = PriceScraper()
-    holdings_scraper = HoldingsScraper()
+    holdings_data, price_data = _load_latest(use_cache)
     
-    try:
-        price_data = price_scraper.fetch_latest_prices()
-        holdings_data = holdings_scraper.fetch_latest()
-        
-        initial_price = price_data["btc_price_usd"]
-        
-        if initial_price == 0:
-            console.print("[bold red]Error: Could not fetch BTC price[/bold red]")
-            return
-        
-        simulator = MonteCarloSimulator(
-            annual_volatility=volatility,
-            annual_drift=drift
-        )
-        
-        results = simulator.simulate_with_holdings(
-            initial_price=initial_price,
-            btc_holdings=holdings_data["btc_holdings"],
-            avg_cost_basis=holdings_data["avg_cost_basis"],
-            days=days,
-            scenarios=scenarios
-        )
-        
-        sim = results["simulation"]
-        holdings = results["holdings_analysis"]
+    initial_price = price_data["btc_price_usd"]
+    
+    if initial_price == 0:
+        console.print("[bold red]Error: Could not fetch BTC price[/bold red]")
+        return
+    
+    simulator = MonteCarloSimulator(
+        annual_volatility=volatility,
+        annual_drift=drift
+    )
+    
+    results = simulator.simulate_with_holdings(
+        initial_price=initial_price,
+        btc_holdings=holdings_data["btc_holdings"],
+        avg_cost_basis=holdings_data["avg_cost_basis"],
+        days=days,
+        scenarios=scenarios
+    )
+    
+    sim = results["simulation"]
+    holdings = results["holdings_analysis"]
+    
+    # Store simulation in database on a worker thread while the results are displayed
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        store = executor.submit(_store_simulation, scenarios, days, initial_price, sim, holdings)
         
         # Display simulation results
         table = Table(title=f"Price Simulation Results ({days} days)", box=box.ROUNDED)
@@ -227,82 +285,123 @@ def simulate(scenarios, days, volatility, drift):
         
         console.print(holdings_table)
         
-        # Store simulation in database
-        db = DatabaseOperations()
-        try:
-            db.add_simulation_record(
-                simulation_type="monte_carlo",
-                scenarios=scenarios,
-                days=days,
-                initial_btc_price=initial_price,
-                mean_price=sim.mean_price,
-                median_price=sim.median_price,
-                std_price=sim.std_price,
-                min_price=sim.min_price,
-                max_price=sim.max_price,
-                percentile_5=sim.percentile_5,
-                percentile_95=sim.percentile_95,
-                results_json=json.dumps({
-                    "initial_price": sim.initial_price,
-                    "mean_price": sim.mean_price,
-                    "median_price": sim.median_price,
-                    "percentile_5": sim.percentile_5,
-                    "percentile_95": sim.percentile_95,
-                    "holdings_analysis": holdings
-                })
-            )
-        finally:
-            db.close()
-        
+        store.result()
+
+
+def _store_simulation(
+    scenarios: int,
+    days: int,
+    initial_price: float,
+    sim: SimulationResults,
+    holdings: Dict
+) -> None:
+    """Store a CLI simulation run with its serialized summary."""
+    db = DatabaseOperations()
+    try:
+        db.add_simulation_record(
+            simulation_type="monte_carlo",
+            scenarios=scenarios,
+            days=days,
+            initial_btc_price=initial_price,
+            mean_price=sim.mean_price,
+            median_price=sim.median_price,
+            std_price=sim.std_price,
+            min_price=sim.min_price,
+            max_price=sim.max_price,
+            percentile_5=sim.percentile_5,
+            percentile_95=sim.percentile_95,
+            results_json=orjson.dumps({
+                "initial_price": sim.initial_price,
+                "mean_price": sim.mean_price,
+                "median_price": sim.median_price,
+                "percentile_5": sim.percentile_5,
+                "percentile_95": sim.percentile_95,
+                "holdings_analysis": holdings
+            }, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+        )
     finally:
-        price_scraper.close()
-        holdings_scraper.close()
+        db.close()
+
+
+# Rows shown per history table; the limit is applied in SQL
+HISTORY_DISPLAY_LIMIT = 10
+
+_format_timestamp = methodcaller("strftime", "%Y-%m-%d %H:%M")
+_format_number = "{:,.2f}".format
+_format_usd = "${:,.2f}".format
+
+
+def _format_optional_usd(value) -> str:
+    """Format a dollar amount, or N/A when it is missing."""
+    return _format_usd(value) if value else "N/A"
+
+
+# (header, style, justify, row key, formatter) per history table column
+_HOLDINGS_HISTORY_COLUMNS = (
+    ("Date", "cyan", "left", "timestamp", _format_timestamp),
+    ("BTC Holdings", "green", "right", "btc_holdings", _format_number),
+    ("Avg Cost", "yellow", "right", "avg_cost_basis", _format_usd),
+    ("Total Cost", "yellow", "right", "total_cost", _format_usd),
+)
+_PRICE_HISTORY_COLUMNS = (
+    ("Date", "cyan", "left", "timestamp", _format_timestamp),
+    ("BTC Price", "green", "right", "btc_price_usd", _format_usd),
+    ("MSTR Price", "yellow", "right", "mstr_price_usd", _format_usd),
+    ("MSTR Market Cap", "yellow", "right", "mstr_market_cap_usd", _format_optional_usd),
+)
+
+
+def _print_history(title: str, columns: Tuple, records: List[Dict], plain: bool) -> None:
+    """Print history rows as a Rich table, or as tab-separated text when plain."""
+    # Format column by column so each formatter is looked up once per table
+    formatted = [
+        list(map(formatter, (record[key] for record in records)))
+        for _, _, _, key, formatter in columns
+    ]
+    rows = list(zip(*formatted))
+    
+    if plain:
+        lines = [title, "\t".join(column[0] for column in columns)]
+        lines.extend("\t".join(row) for row in rows)
+        click.echo("\n".join(lines))
+        return
+    
+    table = Table(title=title, box=box.ROUNDED)
+    for name, style, justify, _, _ in columns:
+        table.add_column(name, style=style, justify=justify)
+    for row in rows:
+        table.add_row(*row)
+    console.print(table)
 
 
 @cli.command()
 @click.option("--days", default=30, help="Number of days of history to show")
-def history(days):
+@click.option("--plain", is_flag=True, help="Print tab-separated text instead of tables")
+def history(days, plain):
     """View historical records."""
-    console.print(f"[bold blue]Fetching last {days} days of history...[/bold blue]")
+    if not plain:
+        console.print(f"[bold blue]Fetching last {days} days of history...[/bold blue]")
     
     db = DatabaseOperations()
     try:
-        holdings_history = db.get_holdings_history(days=days, limit=50)
-        price_history = db.get_price_history(days=days, limit=50)
+        holdings_history = db.get_holdings_history_rows(
+            days=days, limit=HISTORY_DISPLAY_LIMIT,
+            columns=[column[3] for column in _HOLDINGS_HISTORY_COLUMNS]
+        )
+        price_history = db.get_price_history_rows(
+            days=days, limit=HISTORY_DISPLAY_LIMIT,
+            columns=[column[3] for column in _PRICE_HISTORY_COLUMNS]
+        )
         
         if holdings_history:
-            table = Table(title=f"Holdings History (Last {days} days)", box=box.ROUNDED)
-            table.add_column("Date", style="cyan")
-            table.add_column("BTC Holdings", style="green", justify="right")
-            table.add_column("Avg Cost", style="yellow", justify="right")
-            table.add_column("Total Cost", style="yellow", justify="right")
-            
-            for record in holdings_history[:10]:  # Show last 10
-                table.add_row(
-                    record.timestamp.strftime("%Y-%m-%d %H:%M"),
-                    f"{record.btc_holdings:,.2f}",
-                    f"${record.avg_cost_basis:,.2f}",
-                    f"${record.total_cost:,.2f}"
-                )
-            
-            console.print(table)
+            _print_history(
+                f"Holdings History (Last {days} days)", _HOLDINGS_HISTORY_COLUMNS, holdings_history, plain
+            )
         
         if price_history:
-            table = Table(title=f"Price History (Last {days} days)", box=box.ROUNDED)
-            table.add_column("Date", style="cyan")
-            table.add_column("BTC Price", style="green", justify="right")
-            table.add_column("MSTR Price", style="yellow", justify="right")
-            table.add_column("MSTR Market Cap", style="yellow", justify="right")
-            
-            for record in price_history[:10]:  # Show last 10
-                table.add_row(
-                    record.timestamp.strftime("%Y-%m-%d %H:%M"),
-                    f"${record.btc_price_usd:,.2f}",
-                    f"${record.mstr_price_usd:,.2f}",
-                    f"${record.mstr_market_cap_usd:,.2f}" if record.mstr_market_cap_usd else "N/A"
-                )
-            
-            console.print(table)
+            _print_history(
+                f"Price History (Last {days} days)", _PRICE_HISTORY_COLUMNS, price_history, plain
+            )
         
     finally:
         db.close()
@@ -310,46 +409,48 @@ def history(days):
 
 def display_metrics(metrics: Metrics, holdings_data: dict, price_data: dict):
     """Display metrics in a formatted table."""
-    table = Table(title="MSTR Bitcoin Tracker - Current Metrics", box=box.ROUNDED)
-    table.add_column("Metric", style="cyan", width=30)
-    table.add_column("Value", style="green", justify="right")
-    
-    # Holdings
-    table.add_row("BTC Holdings", f"{metrics.btc_holdings:,.2f} BTC")
-    table.add_row("Average Cost Basis", f"${metrics.avg_cost_basis:,.2f}")
-    table.add_row("Total Cost", f"${metrics.total_cost:,.2f}")
-    
-    # Current prices
-    table.add_row("", "")  # Separator
-    table.add_row("Current BTC Price", f"${metrics.current_btc_price:,.2f}")
-    table.add_row("Current Holdings Value", f"${metrics.current_holdings_value:,.2f}")
-    
-    # Gain/Loss
     gain_loss_style = "green" if metrics.unrealized_gain_loss >= 0 else "red"
-    table.add_row(
-        "Unrealized Gain/Loss",
-        f"[{gain_loss_style}]{metrics.unrealized_gain_loss:,.2f} ({metrics.unrealized_gain_loss_pct:+.2f}%)[/{gain_loss_style}]"
-    )
     
-    # MSTR
-    table.add_row("", "")  # Separator
-    table.add_row("MSTR Stock Price", f"${metrics.mstr_price:,.2f}")
+    # Styled cells are Text objects so Rich does not parse markup at render time
+    rows = [
+        # Holdings
+        ("BTC Holdings", f"{metrics.btc_holdings:,.2f} BTC"),
+        ("Average Cost Basis", f"${metrics.avg_cost_basis:,.2f}"),
+        ("Total Cost", f"${metrics.total_cost:,.2f}"),
+        # Current prices
+        ("", ""),  # Separator
+        ("Current BTC Price", f"${metrics.current_btc_price:,.2f}"),
+        ("Current Holdings Value", f"${metrics.current_holdings_value:,.2f}"),
+        # Gain/Loss
+        (
+            "Unrealized Gain/Loss",
+            Text(
+                f"{metrics.unrealized_gain_loss:,.2f} ({metrics.unrealized_gain_loss_pct:+.2f}%)",
+                style=gain_loss_style
+            )
+        ),
+        # MSTR
+        ("", ""),  # Separator
+        ("MSTR Stock Price", f"${metrics.mstr_price:,.2f}"),
+    ]
     if metrics.mstr_market_cap:
-        table.add_row("MSTR Market Cap", f"${metrics.mstr_market_cap:,.2f}")
+        rows.append(("MSTR Market Cap", f"${metrics.mstr_market_cap:,.2f}"))
     
     # NAV Ratio
     if metrics.nav_ratio:
-        table.add_row("NAV Ratio", f"{metrics.nav_ratio:.4f}")
+        rows.append(("NAV Ratio", f"{metrics.nav_ratio:.4f}"))
         if metrics.premium_discount is not None:
             pd_style = "red" if metrics.premium_discount > 0 else "green"
-            table.add_row(
-                "Premium/Discount",
-                f"[{pd_style}]{metrics.premium_discount:+.2f}%[/{pd_style}]"
-            )
+            rows.append(("Premium/Discount", Text(f"{metrics.premium_discount:+.2f}%", style=pd_style)))
+    
+    table = Table(title="MSTR Bitcoin Tracker - Current Metrics", box=box.ROUNDED)
+    table.add_column("Metric", style="cyan", width=30)
+    table.add_column("Value", style="green", justify="right")
+    for row in rows:
+        table.add_row(*row)
     
     console.print(table)
 
-
 if __name__ == "__main__":
     cli()
 
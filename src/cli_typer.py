@@ -1,19 +1,25 @@
 """Enhanced CLI interface with Typer for MSTR Bitcoin Tracker."""
 
+import csv
+import multiprocessing
+import os
 import typer
-import json
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, replace
 from datetime import date, datetime
+from itertools import repeat
+from pathlib import Path
 from typing import Optional, List
 from rich.console import Console
 from rich.table import Table
 from rich.panel import Panel
+from rich.text import Text
 from rich import box
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
 from src.database.models import init_database
-from src.database.session import get_db_session
+from src.database.session import get_db_readonly_session, get_db_session
 from src.database.operations import DatabaseOperations
-from src.analytics import nav, tranches, performance, position
-from src.simulation import mc_paths, scenarios, risk
 from src.database.models import (
     HoldingsTranche, CompanyStats, MarketPrice, DailySnapshot,
     UserPosition, ScenarioDefinition, SimulationRun
@@ -23,6 +29,97 @@ app = typer.Typer(help="MSTR Bitcoin Tracker - Comprehensive analytics and track
 console = Console()
 
 
+def _parse_as_of(as_of: Optional[str]) -> date:
+    """Parse an --as-of option (YYYY-MM-DD), defaulting to today; exits on bad input."""
+    if not as_of:
+        return date.today()
+    try:
+        return date.fromisoformat(as_of)
+    except ValueError:
+        console.print("[bold red]Invalid date format. Use YYYY-MM-DD[/bold red]")
+        raise typer.Exit(code=1)
+
+
+def _print_metric_rows(
+    title: str,
+    rows: List[tuple],
+    plain: bool = False,
+    label_width: Optional[int] = 30
+) -> None:
+    """
+    Print (metric, value) rows as a Rich table, or as aligned plain text.
+    
+    Plain output skips Rich rendering entirely and is written in one call,
+    which is what piped or scripted use wants.
+    """
+    if plain:
+        lines = [title] + [f"{str(label):<30}{str(value):>20}".rstrip() for label, value in rows]
+        typer.echo("\n".join(lines))
+        return
+    
+    table = Table(title=title, box=box.ROUNDED)
+    table.add_column("Metric", style="cyan", width=label_width)
+    table.add_column("Value", style="green", justify="right")
+    for row in rows:
+        table.add_row(*row)
+    console.print(table)
+
+
+# (label, format, style) per risk table row, filled from *_risk_values below
+_ASSET_RISK_ROWS = (
+    ("Initial Price", "${:,.2f}", None),
+    ("Mean Return", "{:+.2f}%", None),
+    ("Median Return", "{:+.2f}%", None),
+    ("Std Dev", "{:.2f}%", None),
+    ("VaR (95%)", "{:.2f}%", "red"),
+    ("CVaR (95%)", "{:.2f}%", "red"),
+    ("5th Percentile", "${:,.2f}", None),
+    ("95th Percentile", "${:,.2f}", None),
+)
+_POSITION_RISK_ROWS = (
+    ("Current Value", "${:,.0f}", None),
+    ("Mean Return", "{:+.2f}%", None),
+    ("Value at Risk (95%)", "${:,.0f}", "red"),
+    ("CVaR (95%)", "${:,.0f}", "red"),
+    ("5th Percentile Value", "${:,.0f}", None),
+    ("95th Percentile Value", "${:,.0f}", None),
+)
+
+
+def _asset_risk_values(initial_value: float, risk_metrics) -> tuple:
+    """Values for a risk table, in _ASSET_RISK_ROWS order."""
+    return (
+        initial_value,
+        risk_metrics.mean_return * 100,
+        risk_metrics.median_return * 100,
+        risk_metrics.std_return * 100,
+        risk_metrics.var_95 * 100,
+        risk_metrics.cvar_95 * 100,
+        initial_value * (1 + risk_metrics.percentile(5)),
+        initial_value * (1 + risk_metrics.percentile(95)),
+    )
+
+
+def _position_risk_values(current_value: float, risk_metrics) -> tuple:
+    """Values for the position risk table, in _POSITION_RISK_ROWS order."""
+    return (
+        current_value,
+        risk_metrics.mean_return * 100,
+        current_value * risk_metrics.var_95,
+        current_value * risk_metrics.cvar_95,
+        current_value * (1 + risk_metrics.percentile(5)),
+        current_value * (1 + risk_metrics.percentile(95)),
+    )
+
+
+def _format_risk_rows(templates: tuple, values: tuple) -> List[tuple]:
+    """Format risk values with their (label, format, style) row templates."""
+    return [
+        (label, Text(fmt.format(value), style=style) if style else fmt.format(value))
+        for (label, fmt, style), value in zip(templates, values)
+    ]
+
+
 @app.command()
 def init_db():
     """Initialize the database by creating all tables."""
@@ -46,16 +143,12 @@ def ingest_prices(
     as_of: Optional[str] = typer.Option(None, help="Date (YYYY-MM-DD), defaults to today")
 ):
     """Ingest BTC and MSTR prices into the database."""
+    from src.analytics import nav
+    
     console.print("[bold blue]Ingesting price data...[/bold blue]")
     
     # Parse date
-    ingest_date = date.today()
-    if as_of:
-        try:
-            ingest_date = datetime.strptime(as_of, "%Y-%m-%d").date()
-        except ValueError:
-            console.print("[bold red]Invalid date format. Use YYYY-MM-DD[/bold red]")
-            raise typer.Exit(code=1)
+    ingest_date = _parse_as_of(as_of)
     
     # If prices not provided, fetch them
     if btc_price is None or mstr_price is None:
@@ -70,32 +163,17 @@ def ingest_prices(
     
     # Store in database
     with get_db_session() as session:
-        # Check if already exists
-        existing_btc = session.query(MarketPrice).filter(
-            MarketPrice.as_of_date == ingest_date,
-            MarketPrice.asset == 'BTC'
-        ).first()
-        
-        if not existing_btc:
-            session.add(MarketPrice(
-                as_of_date=ingest_date,
-                asset='BTC',
-                close_price=btc_price,
-                currency='USD'
-            ))
-        
-        existing_mstr = session.query(MarketPrice).filter(
-            MarketPrice.as_of_date == ingest_date,
-            MarketPrice.asset == 'MSTR'
-        ).first()
-        
-        if not existing_mstr:
-            session.add(MarketPrice(
-                as_of_date=ingest_date,
-                asset='MSTR',
-                close_price=mstr_price,
-                currency='USD'
-            ))
+        # Insert both closes in one statement, keeping any already stored
+        result = session.execute(
+            sqlite_insert(MarketPrice).values([
+                {"as_of_date": ingest_date, "asset": asset, "close_price": price, "currency": 'USD'}
+                for asset, price in (('BTC', btc_price), ('MSTR', mstr_price))
+            ]).on_conflict_do_nothing(index_elements=['as_of_date', 'asset'])
+        )
+        # Core inserts bypass the ORM flush hooks that keep snapshots and
+        # cached NAV inputs current
+        if result.rowcount:
+            nav.invalidate_nav_inputs(session, ingest_date)
     
     console.print(f"[bold green]✓ Prices ingested for {ingest_date}[/bold green]")
     console.print(f"  BTC: ${btc_price:,.2f}")
@@ -114,13 +192,7 @@ def ingest_holdings(
     console.print("[bold blue]Ingesting holdings tranche...[/bold blue]")
     
     # Parse date
-    acquisition_date = date.today()
-    if as_of:
-        try:
-            acquisition_date = datetime.strptime(as_of, "%Y-%m-%d").date()
-        except ValueError:
-            console.print("[bold red]Invalid date format. Use YYYY-MM-DD[/bold red]")
-            raise typer.Exit(code=1)
+    acquisition_date = _parse_as_of(as_of)
     
     implied_price = usd_spent / btc_amount if btc_amount > 0 else 0
     
@@ -140,163 +212,181 @@ def ingest_holdings(
     console.print(f"  Implied Price: ${implied_price:,.2f}")
 
 
+@app.command()
+def ingest_holdings_csv(
+    path: Path = typer.Argument(..., exists=True, dir_okay=False, help="CSV with one tranche per row")
+):
+    """
+    Ingest many BTC holdings tranches from a CSV file.
+    
+    Expected columns: as_of_date (YYYY-MM-DD), btc_acquired, usd_spent, and
+    optionally source_type (defaults to cash) and notes.
+    """
+    console.print(f"[bold blue]Ingesting holdings tranches from {path}...[/bold blue]")
+    
+    with path.open(newline="") as f:
+        try:
+            records = [
+                {
+                    "as_of_date": date.fromisoformat(row["as_of_date"]),
+                    "btc_acquired": float(row["btc_acquired"]),
+                    "usd_spent": float(row["usd_spent"]),
+                    "source_type": row.get("source_type") or "cash",
+                    "notes": row.get("notes") or None
+                }
+                for row in csv.DictReader(f)
+            ]
+        except (KeyError, ValueError) as e:
+            console.print(f"[bold red]Invalid CSV row: {e}[/bold red]")
+            raise typer.Exit(code=1)
+    
+    # One executemany instead of an ORM unit of work per tranche
+    db = DatabaseOperations()
+    try:
+        count = db.bulk_add_holdings(records)
+    finally:
+        db.close()
+    
+    console.print(f"[bold green]✓ {count} tranches recorded[/bold green]")
+
+
 @app.command()
 def snapshot(
-    as_of: Optional[str] = typer.Option(None, help="Date (YYYY-MM-DD), defaults to today")
+    as_of: Optional[str] = typer.Option(None, help="Date (YYYY-MM-DD), defaults to today"),
+    start: Optional[str] = typer.Option(
+        None, help="Also rebuild every day from this date (YYYY-MM-DD) up to --as-of"
+    )
 ):
     """Generate and store a daily snapshot of metrics."""
+    from src.analytics import nav
+    
     console.print("[bold blue]Generating daily snapshot...[/bold blue]")
     
     # Parse date
-    snapshot_date = date.today()
-    if as_of:
-        try:
-            snapshot_date = datetime.strptime(as_of, "%Y-%m-%d").date()
-        except ValueError:
-            console.print("[bold red]Invalid date format. Use YYYY-MM-DD[/bold red]")
-            raise typer.Exit(code=1)
+    snapshot_date = _parse_as_of(as_of)
+    
+    if start:
+        start_date = _parse_as_of(start)
+        with get_db_session() as session:
+            # The whole range is computed and stored by one INSERT ... SELECT
+            written = nav.rebuild_daily_snapshots(session, start_date, snapshot_date)
+        console.print(
+            f"[bold green]✓ {written} snapshots created for {start_date} to {snapshot_date}[/bold green]"
+        )
+        return
     
     with get_db_session() as session:
-        # Compute NAV metrics
-        nav_metrics = nav.compute_nav_metrics(session, snapshot_date)
+        # Compute NAV metrics from the source tables, not an existing snapshot
+        nav_metrics = nav.compute_nav_metrics(session, snapshot_date, use_snapshot=False)
         
         if not nav_metrics:
             console.print("[bold red]Insufficient data to generate snapshot[/bold red]")
             raise typer.Exit(code=1)
         
-        # Check if snapshot already exists
-        existing = session.query(DailySnapshot).filter(
-            DailySnapshot.as_of_date == snapshot_date
-        ).first()
-        
-        if existing:
-            # Update existing
-            existing.total_btc = nav_metrics.total_btc
-            existing.btc_spot_price = nav_metrics.btc_spot_price
-            existing.mstr_share_price = nav_metrics.mstr_share_price
-            existing.market_cap_usd = nav_metrics.market_cap_usd
-            existing.btc_nav_usd = nav_metrics.btc_nav_usd
-            existing.bs_nav_usd = nav_metrics.bs_nav_usd
-            existing.btc_per_share = nav_metrics.btc_per_share
-            existing.bs_nav_per_share = nav_metrics.bs_nav_per_share
-            existing.premium_to_btc_nav = nav_metrics.premium_to_btc_nav
-            existing.premium_to_bs_nav = nav_metrics.premium_to_bs_nav
-        else:
-            # Create new
-            session.add(DailySnapshot(
-                as_of_date=snapshot_date,
-                total_btc=nav_metrics.total_btc,
-                btc_spot_price=nav_metrics.btc_spot_price,
-                mstr_share_price=nav_metrics.mstr_share_price,
-                market_cap_usd=nav_metrics.market_cap_usd,
-                btc_nav_usd=nav_metrics.btc_nav_usd,
-                bs_nav_usd=nav_metrics.bs_nav_usd,
-                btc_per_share=nav_metrics.btc_per_share,
-                bs_nav_per_share=nav_metrics.bs_nav_per_share,
-                premium_to_btc_nav=nav_metrics.premium_to_btc_nav,
-                premium_to_bs_nav=nav_metrics.premium_to_bs_nav
-            ))
+        # Insert the snapshot, or overwrite the existing one, in one statement;
+        # NAVMetrics fields map one-to-one onto the snapshot columns
+        values = asdict(nav_metrics)
+        stmt = sqlite_insert(DailySnapshot).values(as_of_date=snapshot_date, **values)
+        session.execute(stmt.on_conflict_do_update(
+            index_elements=['as_of_date'],
+            set_={column: stmt.excluded[column] for column in values}
+        ))
     
     console.print(f"[bold green]✓ Snapshot created for {snapshot_date}[/bold green]")
 
 
 @app.command()
 def status(
-    as_of: Optional[str] = typer.Option(None, help="Date (YYYY-MM-DD), defaults to today")
+    as_of: Optional[str] = typer.Option(None, help="Date (YYYY-MM-DD), defaults to today"),
+    plain: bool = typer.Option(False, "--plain", help="Print plain text instead of tables")
 ):
     """Display comprehensive status and metrics."""
+    from src.analytics import position, tranches
+    
     # Parse date
-    status_date = date.today()
-    if as_of:
-        try:
-            status_date = datetime.strptime(as_of, "%Y-%m-%d").date()
-        except ValueError:
-            console.print("[bold red]Invalid date format. Use YYYY-MM-DD[/bold red]")
-            raise typer.Exit(code=1)
+    status_date = _parse_as_of(as_of)
     
-    with get_db_session() as session:
-        # Get NAV metrics
-        nav_metrics = nav.compute_nav_metrics(session, status_date)
+    with get_db_readonly_session() as session:
+        # Get NAV metrics and personal position (if any) in one query
+        nav_metrics, pos_metrics = position.fetch_simulation_inputs(session, status_date)
         
         if not nav_metrics:
             console.print("[bold red]No data available for the specified date[/bold red]")
             raise typer.Exit(code=1)
         
-        # Get tranche summary
-        tranche_analysis = tranches.get_tranche_summary(session, status_date)
-        
-        # Get personal position if exists
-        pos_metrics = position.compute_position_metrics(session, as_of_date=status_date)
-        
-        # Display main metrics table
-        table = Table(title=f"MSTR Bitcoin Tracker Status - {status_date}", box=box.ROUNDED)
-        table.add_column("Metric", style="cyan", width=30)
-        table.add_column("Value", style="green", justify="right")
-        
-        # Holdings
-        table.add_row("Total BTC Holdings", f"{nav_metrics.total_btc:,.4f} BTC")
+        # Main metrics rows; styled values are Text so plain output can drop the style
+        rows = [
+            # Holdings
+            ("Total BTC Holdings", f"{nav_metrics.total_btc:,.4f} BTC"),
+        ]
         if nav_metrics.btc_per_share:
-            table.add_row("BTC per Share", f"{nav_metrics.btc_per_share:.8f} BTC")
-        
-        # Prices
-        table.add_row("", "")  # Separator
-        table.add_row("BTC Spot Price", f"${nav_metrics.btc_spot_price:,.2f}")
-        table.add_row("MSTR Share Price", f"${nav_metrics.mstr_share_price:,.2f}")
-        
-        # NAV
-        table.add_row("", "")
-        table.add_row("BTC NAV", f"${nav_metrics.btc_nav_usd:,.0f}")
-        table.add_row("BTC NAV per Share", f"${nav_metrics.btc_nav_usd / nav_metrics.shares_outstanding:,.2f}" if nav_metrics.shares_outstanding else "N/A")
+            rows.append(("BTC per Share", f"{nav_metrics.btc_per_share:.8f} BTC"))
+        
+        rows += [
+            # Prices
+            ("", ""),  # Separator
+            ("BTC Spot Price", f"${nav_metrics.btc_spot_price:,.2f}"),
+            ("MSTR Share Price", f"${nav_metrics.mstr_share_price:,.2f}"),
+            # NAV
+            ("", ""),
+            ("BTC NAV", f"${nav_metrics.btc_nav_usd:,.0f}"),
+            ("BTC NAV per Share", f"${nav_metrics.btc_nav_usd / nav_metrics.shares_outstanding:,.2f}" if nav_metrics.shares_outstanding else "N/A"),
+        ]
         
         if nav_metrics.bs_nav_usd:
-            table.add_row("Balance Sheet NAV", f"${nav_metrics.bs_nav_usd:,.0f}")
+            rows.append(("Balance Sheet NAV", f"${nav_metrics.bs_nav_usd:,.0f}"))
             if nav_metrics.bs_nav_per_share:
-                table.add_row("BS NAV per Share", f"${nav_metrics.bs_nav_per_share:,.2f}")
+                rows.append(("BS NAV per Share", f"${nav_metrics.bs_nav_per_share:,.2f}"))
         
         # Premium/Discount
         if nav_metrics.premium_to_btc_nav is not None:
             style = "red" if nav_metrics.premium_to_btc_nav > 0 else "green"
-            table.add_row("", "")
-            table.add_row(
+            rows.append(("", ""))
+            rows.append((
                 "Premium/Discount to BTC NAV",
-                f"[{style}]{nav_metrics.premium_to_btc_nav * 100:+.2f}%[/{style}]"
-            )
+                Text(f"{nav_metrics.premium_to_btc_nav * 100:+.2f}%", style=style)
+            ))
         
         if nav_metrics.premium_to_bs_nav is not None:
             style = "red" if nav_metrics.premium_to_bs_nav > 0 else "green"
-            table.add_row(
+            rows.append((
                 "Premium/Discount to BS NAV",
-                f"[{style}]{nav_metrics.premium_to_bs_nav * 100:+.2f}%[/{style}]"
-            )
+                Text(f"{nav_metrics.premium_to_bs_nav * 100:+.2f}%", style=style)
+            ))
         
-        # Portfolio performance
-        if tranche_analysis:
-            table.add_row("", "")
-            pf = tranche_analysis.portfolio
-            table.add_row("Total Cost Basis", f"${pf.total_cost:,.0f}")
-            table.add_row("Current Value", f"${pf.total_current_value:,.0f}")
-            pnl_style = "green" if pf.total_unrealized_pnl >= 0 else "red"
-            table.add_row(
-                "Unrealized P&L",
-                f"[{pnl_style}]${pf.total_unrealized_pnl:,.0f} ({pf.total_unrealized_pnl_pct:+.2f}%)[/{pnl_style}]"
-            )
+        # Print each section as soon as its data is loaded, so the NAV
+        # figures show before the tranche summary is queried
+        _print_metric_rows(f"MSTR Bitcoin Tracker Status - {status_date}", rows, plain)
         
-        # Personal position
+        # Personal position (already loaded with the NAV metrics)
         if pos_metrics:
-            table.add_row("", "")
-            table.add_row("[bold]My Position[/bold]", "")
-            table.add_row("Shares", f"{pos_metrics.shares:,.2f}")
-            table.add_row("Entry Price", f"${pos_metrics.avg_entry_price:,.2f}")
-            table.add_row("Current Value", f"${pos_metrics.current_value:,.0f}")
             pos_pnl_style = "green" if pos_metrics.unrealized_pnl >= 0 else "red"
-            table.add_row(
-                "Unrealized P&L",
-                f"[{pos_pnl_style}]${pos_metrics.unrealized_pnl:,.0f} ({pos_metrics.unrealized_pnl_pct:+.2f}%)[/{pos_pnl_style}]"
-            )
+            rows = [
+                ("Shares", f"{pos_metrics.shares:,.2f}"),
+                ("Entry Price", f"${pos_metrics.avg_entry_price:,.2f}"),
+                ("Current Value", f"${pos_metrics.current_value:,.0f}"),
+                (
+                    "Unrealized P&L",
+                    Text(f"${pos_metrics.unrealized_pnl:,.0f} ({pos_metrics.unrealized_pnl_pct:+.2f}%)", style=pos_pnl_style)
+                ),
+            ]
             if pos_metrics.implied_btc_exposure:
-                table.add_row("Implied BTC Exposure", f"{pos_metrics.implied_btc_exposure:,.4f} BTC")
+                rows.append(("Implied BTC Exposure", f"{pos_metrics.implied_btc_exposure:,.4f} BTC"))
+            _print_metric_rows("My Position", rows, plain)
         
-        console.print(table)
+        # Portfolio performance
+        tranche_analysis = tranches.get_tranche_summary(session, status_date)
+        if tranche_analysis:
+            pf = tranche_analysis.portfolio
+            pnl_style = "green" if pf.total_unrealized_pnl >= 0 else "red"
+            _print_metric_rows("Portfolio Performance", [
+                ("Total Cost Basis", f"${pf.total_cost:,.0f}"),
+                ("Current Value", f"${pf.total_current_value:,.0f}"),
+                (
+                    "Unrealized P&L",
+                    Text(f"${pf.total_unrealized_pnl:,.0f} ({pf.total_unrealized_pnl_pct:+.2f}%)", style=pnl_style)
+                ),
+            ], plain)
 
 
 @app.command()
@@ -305,16 +395,13 @@ def nav_table(
     as_of: Optional[str] = typer.Option(None, help="Date (YYYY-MM-DD)")
 ):
     """Display NAV sensitivity table across different BTC prices."""
+    import numpy as np
+    from src.analytics import nav
+    
     # Parse date
-    analysis_date = date.today()
-    if as_of:
-        try:
-            analysis_date = datetime.strptime(as_of, "%Y-%m-%d").date()
-        except ValueError:
-            console.print("[bold red]Invalid date format. Use YYYY-MM-DD[/bold red]")
-            raise typer.Exit(code=1)
+    analysis_date = _parse_as_of(as_of)
     
-    with get_db_session() as session:
+    with get_db_readonly_session() as session:
         # Get current metrics
         nav_metrics = nav.compute_nav_metrics(session, analysis_date)
         
@@ -326,7 +413,8 @@ def nav_table(
         table = Table(title=f"NAV Sensitivity Analysis - {analysis_date}", box=box.ROUNDED)
         table.add_column("BTC Price", style="cyan", justify="right")
         table.add_column("BTC NAV/Share", style="yellow", justify="right")
-        if nav_metrics.bs_nav_per_share and nav_metrics.cash_usd and nav_metrics.debt_usd_market:
+        show_bs_nav = bool(nav_metrics.bs_nav_per_share and nav_metrics.cash_usd and nav_metrics.debt_usd_market)
+        if show_bs_nav:
             table.add_column("BS NAV/Share", style="yellow", justify="right")
         table.add_column("Current MSTR", style="green", justify="right")
         table.add_column("Implied Premium", style="magenta", justify="right")
@@ -336,26 +424,30 @@ def nav_table(
         cash = nav_metrics.cash_usd or 0
         debt = nav_metrics.debt_usd_market or 0
         
-        for btc_price in sorted(btc_prices):
-            btc_nav_per_share = (nav_metrics.total_btc * btc_price) / shares
-            
-            if nav_metrics.bs_nav_per_share and nav_metrics.cash_usd and nav_metrics.debt_usd_market:
-                bs_nav_per_share = ((nav_metrics.total_btc * btc_price) + cash - debt) / shares
-                premium = ((current_mstr / bs_nav_per_share) - 1) * 100
+        # Sensitivity math for every price at once; the loop below only formats rows
+        prices = np.sort(np.asarray(btc_prices, dtype=np.float64))
+        btc_value = nav_metrics.total_btc * prices
+        btc_nav_per_share = btc_value / shares
+        
+        if show_bs_nav:
+            bs_nav_per_share = (btc_value + cash - debt) / shares
+            premium = (current_mstr / bs_nav_per_share - 1) * 100
+            for btc_price, btc_nav_ps, bs_nav_ps, prem in zip(prices, btc_nav_per_share, bs_nav_per_share, premium):
                 table.add_row(
                     f"${btc_price:,.0f}",
-                    f"${btc_nav_per_share:,.2f}",
-                    f"${bs_nav_per_share:,.2f}",
+                    f"${btc_nav_ps:,.2f}",
+                    f"${bs_nav_ps:,.2f}",
                     f"${current_mstr:,.2f}",
-                    f"{premium:+.2f}%"
+                    f"{prem:+.2f}%"
                 )
-            else:
-                premium = ((current_mstr / btc_nav_per_share) - 1) * 100
+        else:
+            premium = (current_mstr / btc_nav_per_share - 1) * 100
+            for btc_price, btc_nav_ps, prem in zip(prices, btc_nav_per_share, premium):
                 table.add_row(
                     f"${btc_price:,.0f}",
-                    f"${btc_nav_per_share:,.2f}",
+                    f"${btc_nav_ps:,.2f}",
                     f"${current_mstr:,.2f}",
-                    f"{premium:+.2f}%"
+                    f"{prem:+.2f}%"
                 )
         
         console.print(table)
@@ -366,19 +458,18 @@ def risk_report(
     scenario: str = typer.Option("base", help="Scenario name (bear, base, bull, hyper)"),
     horizon_days: Optional[int] = typer.Option(None, help="Override horizon days"),
     num_paths: Optional[int] = typer.Option(None, help="Override number of paths"),
-    as_of: Optional[str] = typer.Option(None, help="Date (YYYY-MM-DD)")
+    as_of: Optional[str] = typer.Option(None, help="Date (YYYY-MM-DD)"),
+    plain: bool = typer.Option(False, "--plain", help="Print plain text instead of tables")
 ):
     """Run simulation and display risk report with VaR/CVaR."""
+    import numpy as np
+    from src.analytics import nav, position
+    from src.simulation import mc_paths, scenarios, risk
+    
     console.print(f"[bold blue]Running {scenario} scenario simulation...[/bold blue]")
     
     # Parse date
-    sim_date = date.today()
-    if as_of:
-        try:
-            sim_date = datetime.strptime(as_of, "%Y-%m-%d").date()
-        except ValueError:
-            console.print("[bold red]Invalid date format. Use YYYY-MM-DD[/bold red]")
-            raise typer.Exit(code=1)
+    sim_date = _parse_as_of(as_of)
     
     # Get scenario config
     try:
@@ -387,11 +478,12 @@ def risk_report(
         console.print(f"[bold red]{e}[/bold red]")
         raise typer.Exit(code=1)
     
-    # Override if provided
-    if horizon_days:
-        scenario_config.horizon_days = horizon_days
-    if num_paths:
-        scenario_config.num_paths = num_paths
+    # Override if provided, on a copy (presets are frozen and shared)
+    scenario_config = replace(
+        scenario_config,
+        horizon_days=horizon_days or scenario_config.horizon_days,
+        num_paths=num_paths or scenario_config.num_paths
+    )
     
     with get_db_session() as session:
         # Get current prices
@@ -400,8 +492,8 @@ def risk_report(
             console.print("[bold red]Insufficient data[/bold red]")
             raise typer.Exit(code=1)
         
-        # Run simulation
-        sim_paths = mc_paths.simulate_joint_btc_mstr_paths(
+        # Run simulation (risk metrics only need terminal prices)
+        btc_final, mstr_final = mc_paths.simulate_joint_final_prices(
             initial_btc_price=nav_metrics.btc_spot_price,
             initial_mstr_price=nav_metrics.mstr_share_price,
             horizon_days=scenario_config.horizon_days,
@@ -410,77 +502,47 @@ def risk_report(
             btc_sigma=scenario_config.btc_sigma,
             beta=scenario_config.mstr_beta,
             alpha=scenario_config.mstr_alpha,
-            residual_sigma=scenario_config.mstr_residual_sigma
+            residual_sigma=scenario_config.mstr_residual_sigma,
+            antithetic=True
         )
         
-        # Compute risk metrics
-        btc_final = sim_paths.btc_paths[:, -1]
-        mstr_final = sim_paths.mstr_paths[:, -1]
-        
-        btc_risk = risk.compute_risk_metrics(btc_final, nav_metrics.btc_spot_price)
-        mstr_risk = risk.compute_risk_metrics(mstr_final, nav_metrics.mstr_share_price)
+        # Compute risk metrics for BTC and MSTR in one batched pass
+        btc_risk, mstr_risk = risk.compute_risk_metrics_batched(
+            np.vstack([btc_final, mstr_final]),
+            [nav_metrics.btc_spot_price, nav_metrics.mstr_share_price]
+        )
         
         # Get personal position if exists
         pos_metrics = position.compute_position_metrics(session, as_of_date=sim_date)
-        portfolio_risk = None
-        if pos_metrics:
-            portfolio_risk = risk.compute_portfolio_risk(
-                btc_final, mstr_final,
-                nav_metrics.btc_spot_price, nav_metrics.mstr_share_price,
-                pos_metrics.shares
-            )
+        # A pure MSTR position has the same returns as MSTR itself (the
+        # share count cancels), so its risk metrics are MSTR's
+        portfolio_risk = mstr_risk if pos_metrics else None
         
         # Display results
         console.print(f"\n[bold]Scenario: {scenario_config.name.upper()}[/bold]")
         console.print(f"Description: {scenario_config.description}")
         console.print(f"Horizon: {scenario_config.horizon_days} days | Paths: {scenario_config.num_paths:,}\n")
         
-        # BTC Risk Table
-        btc_table = Table(title="BTC Risk Metrics", box=box.ROUNDED)
-        btc_table.add_column("Metric", style="cyan")
-        btc_table.add_column("Value", style="green", justify="right")
-        
-        btc_table.add_row("Initial Price", f"${nav_metrics.btc_spot_price:,.2f}")
-        btc_table.add_row("Mean Return", f"{btc_risk.mean_return * 100:+.2f}%")
-        btc_table.add_row("Median Return", f"{btc_risk.median_return * 100:+.2f}%")
-        btc_table.add_row("Std Dev", f"{btc_risk.std_return * 100:.2f}%")
-        btc_table.add_row("VaR (95%)", f"[red]{btc_risk.var_95 * 100:.2f}%[/red]")
-        btc_table.add_row("CVaR (95%)", f"[red]{btc_risk.cvar_95 * 100:.2f}%[/red]")
-        btc_table.add_row("5th Percentile", f"${nav_metrics.btc_spot_price * (1 + btc_risk.percentiles['5']):,.2f}")
-        btc_table.add_row("95th Percentile", f"${nav_metrics.btc_spot_price * (1 + btc_risk.percentiles['95']):,.2f}")
-        
-        console.print(btc_table)
-        
-        # MSTR Risk Table
-        mstr_table = Table(title="MSTR Risk Metrics", box=box.ROUNDED)
-        mstr_table.add_column("Metric", style="cyan")
-        mstr_table.add_column("Value", style="green", justify="right")
-        
-        mstr_table.add_row("Initial Price", f"${nav_metrics.mstr_share_price:,.2f}")
-        mstr_table.add_row("Mean Return", f"{mstr_risk.mean_return * 100:+.2f}%")
-        mstr_table.add_row("Median Return", f"{mstr_risk.median_return * 100:+.2f}%")
-        mstr_table.add_row("Std Dev", f"{mstr_risk.std_return * 100:.2f}%")
-        mstr_table.add_row("VaR (95%)", f"[red]{mstr_risk.var_95 * 100:.2f}%[/red]")
-        mstr_table.add_row("CVaR (95%)", f"[red]{mstr_risk.cvar_95 * 100:.2f}%[/red]")
-        mstr_table.add_row("5th Percentile", f"${nav_metrics.mstr_share_price * (1 + mstr_risk.percentiles['5']):,.2f}")
-        mstr_table.add_row("95th Percentile", f"${nav_metrics.mstr_share_price * (1 + mstr_risk.percentiles['95']):,.2f}")
-        
-        console.print(mstr_table)
+        _print_metric_rows(
+            "BTC Risk Metrics",
+            _format_risk_rows(_ASSET_RISK_ROWS, _asset_risk_values(nav_metrics.btc_spot_price, btc_risk)),
+            plain, label_width=None
+        )
+        _print_metric_rows(
+            "MSTR Risk Metrics",
+            _format_risk_rows(_ASSET_RISK_ROWS, _asset_risk_values(nav_metrics.mstr_share_price, mstr_risk)),
+            plain, label_width=None
+        )
         
         # Portfolio Risk Table (if position exists)
         if portfolio_risk and pos_metrics:
-            port_table = Table(title=f"My Position Risk ({pos_metrics.shares:,.0f} shares)", box=box.ROUNDED)
-            port_table.add_column("Metric", style="cyan")
-            port_table.add_column("Value", style="green", justify="right")
-            
-            port_table.add_row("Current Value", f"${pos_metrics.current_value:,.0f}")
-            port_table.add_row("Mean Return", f"{portfolio_risk.mean_return * 100:+.2f}%")
-            port_table.add_row("Value at Risk (95%)", f"[red]${pos_metrics.current_value * portfolio_risk.var_95:,.0f}[/red]")
-            port_table.add_row("CVaR (95%)", f"[red]${pos_metrics.current_value * portfolio_risk.cvar_95:,.0f}[/red]")
-            port_table.add_row("5th Percentile Value", f"${pos_metrics.current_value * (1 + portfolio_risk.percentiles['5']):,.0f}")
-            port_table.add_row("95th Percentile Value", f"${pos_metrics.current_value * (1 + portfolio_risk.percentiles['95']):,.0f}")
-            
-            console.print(port_table)
+            _print_metric_rows(
+                f"My Position Risk ({pos_metrics.shares:,.0f} shares)",
+                _format_risk_rows(
+                    _POSITION_RISK_ROWS, _position_risk_values(pos_metrics.current_value, portfolio_risk)
+                ),
+                plain, label_width=None
+            )
         
         # Store simulation run
         risk_summary = risk.create_risk_summary(btc_risk, mstr_risk, portfolio_risk)
@@ -492,10 +554,117 @@ def risk_report(
             num_paths=scenario_config.num_paths,
             seed=None,
             input_snapshot_date=sim_date,
-            results_summary_json=json.dumps(risk_summary)
+            results_summary_json=risk_summary
         ))
 
 
+def _simulate_scenario_risk(scenario_config, btc_spot_price: float, mstr_share_price: float) -> tuple:
+    """
+    Simulate one scenario and compute BTC and MSTR risk metrics.
+    
+    Runs in a worker process, so it takes plain values and touches no session.
+    """
+    import numpy as np
+    from src.simulation import mc_paths, risk
+    
+    btc_final, mstr_final = mc_paths.simulate_joint_final_prices(
+        initial_btc_price=btc_spot_price,
+        initial_mstr_price=mstr_share_price,
+        horizon_days=scenario_config.horizon_days,
+        num_paths=scenario_config.num_paths,
+        btc_mu=scenario_config.btc_mu,
+        btc_sigma=scenario_config.btc_sigma,
+        beta=scenario_config.mstr_beta,
+        alpha=scenario_config.mstr_alpha,
+        residual_sigma=scenario_config.mstr_residual_sigma,
+        antithetic=True
+    )
+    btc_risk, mstr_risk = risk.compute_risk_metrics_batched(
+        np.vstack([btc_final, mstr_final]),
+        [btc_spot_price, mstr_share_price]
+    )
+    return btc_risk, mstr_risk
+
+
+@app.command()
+def risk_report_all(
+    horizon_days: Optional[int] = typer.Option(None, help="Override horizon days"),
+    num_paths: Optional[int] = typer.Option(None, help="Override number of paths"),
+    as_of: Optional[str] = typer.Option(None, help="Date (YYYY-MM-DD)")
+):
+    """Simulate every scenario in parallel and compare their risk metrics."""
+    from src.analytics import nav
+    from src.simulation import scenarios, risk
+    
+    sim_date = _parse_as_of(as_of)
+    
+    # Copies, so overrides never touch the shared presets
+    scenario_configs = [
+        replace(
+            config,
+            horizon_days=horizon_days or config.horizon_days,
+            num_paths=num_paths or config.num_paths
+        )
+        for config in scenarios.SCENARIOS.values()
+    ]
+    
+    console.print(f"[bold blue]Running {len(scenario_configs)} scenario simulations in parallel...[/bold blue]")
+    
+    with get_db_session() as session:
+        nav_metrics = nav.compute_nav_metrics(session, sim_date)
+        if not nav_metrics:
+            console.print("[bold red]Insufficient data[/bold red]")
+            raise typer.Exit(code=1)
+        
+        # Scenarios are independent, so each gets its own process (and core).
+        # Workers are spawned, not forked: a fork would copy this process's
+        # Numba threads, database connections and console state
+        with ProcessPoolExecutor(
+            max_workers=min(len(scenario_configs), os.cpu_count() or 1),
+            mp_context=multiprocessing.get_context("spawn")
+        ) as executor:
+            results = list(executor.map(
+                _simulate_scenario_risk,
+                scenario_configs,
+                repeat(nav_metrics.btc_spot_price),
+                repeat(nav_metrics.mstr_share_price)
+            ))
+        
+        table = Table(title=f"Scenario Risk Comparison - {sim_date}", box=box.ROUNDED)
+        table.add_column("Scenario", style="cyan")
+        table.add_column("Paths", justify="right")
+        table.add_column("BTC Mean", style="green", justify="right")
+        table.add_column("BTC VaR (95%)", style="red", justify="right")
+        table.add_column("MSTR Mean", style="green", justify="right")
+        table.add_column("MSTR VaR (95%)", style="red", justify="right")
+        table.add_column("MSTR CVaR (95%)", style="red", justify="right")
+        
+        # Runs from one invocation share a timestamp (naive UTC, like every
+        # other stored DateTime column)
+        created_at = datetime.utcnow()
+        for config, (btc_risk, mstr_risk) in zip(scenario_configs, results):
+            table.add_row(
+                config.name,
+                f"{config.num_paths:,}",
+                f"{btc_risk.mean_return * 100:+.2f}%",
+                f"{btc_risk.var_95 * 100:.2f}%",
+                f"{mstr_risk.mean_return * 100:+.2f}%",
+                f"{mstr_risk.var_95 * 100:.2f}%",
+                f"{mstr_risk.cvar_95 * 100:.2f}%"
+            )
+            session.add(SimulationRun(
+                created_at=created_at,
+                scenario_id=None,
+                horizon_days=config.horizon_days,
+                num_paths=config.num_paths,
+                seed=None,
+                input_snapshot_date=sim_date,
+                results_summary_json=risk.create_risk_summary(btc_risk, mstr_risk)
+            ))
+        
+        console.print(table)
+
+
 @app.command()
 def set_position(
     shares: float = typer.Option(..., help="Number of MSTR shares"),
@@ -509,12 +678,11 @@ def set_position(
     with get_db_session() as session:
         # Deactivate other positions if requested
         if deactivate_others:
-            # Only deactivate existing active positions
-            active_positions = session.query(UserPosition).filter(
+            # Only deactivate existing active positions, in a single UPDATE;
+            # the old rows are not used again so the identity map is left alone
+            session.query(UserPosition).filter(
                 UserPosition.is_active == True
-            ).all()
-            for pos in active_positions:
-                pos.is_active = False
+            ).update({UserPosition.is_active: False}, synchronize_session=False)
         
         # Create new position
         position = UserPosition(
@@ -0,0 +1,34 @@
+"""Coarse cached clock for response timestamps."""
+
+import threading
+import time
+from datetime import datetime
+
+# Cached timestamps are refreshed at most this often
+CLOCK_RESOLUTION_SECONDS = 1.0
+
+_lock = threading.Lock()
+_cached_now = datetime.utcnow()
+_cached_at = time.monotonic()
+
+
+def utcnow_cached() -> datetime:
+    """
+    Get the current UTC time, cached to CLOCK_RESOLUTION_SECONDS.
+    
+    Only suitable for informational timestamps (health checks, response
+    metadata); stored records should keep using datetime.utcnow().
+    
+    Returns:
+        Naive UTC datetime at most CLOCK_RESOLUTION_SECONDS old
+    """
+    global _cached_now, _cached_at
+    
+    now = time.monotonic()
+    if now - _cached_at >= CLOCK_RESOLUTION_SECONDS:
+        with _lock:
+            if now - _cached_at >= CLOCK_RESOLUTION_SECONDS:
+                _cached_now = datetime.utcnow()
+                _cached_at = now
+    
+    return _cached_now
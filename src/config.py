@@ -1,12 +1,15 @@
 """Configuration settings for MSTR Bitcoin Tracker."""
 
+from functools import lru_cache
 from pathlib import Path
-from pydantic_settings import BaseSettings
+from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class Settings(BaseSettings):
     """Application settings."""
     
+    model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8", frozen=True)
+    
     # Database
     database_path: str = str(Path(__file__).parent.parent / "data" / "mstr_tracker.db")
     
@@ -17,20 +20,25 @@ class Settings(BaseSettings):
     
     # Data sources
     coingecko_api_url: str = "https://api.coingecko.com/api/v3"
+    coingecko_calls_per_minute: int = 30  # Public API rate limit
     yahoo_finance_enabled: bool = True
     
     # Scraping
     user_agent: str = "MSTR-Bitcoin-Tracker/1.0"
     request_timeout: int = 30
+    fetch_cache_ttl_seconds: int = 60  # How long CLI --use-cache reuses a fetch
+    price_cache_ttl_seconds: int = 60  # How long a process reuses fetched quotes (0 disables)
     
     # Simulation defaults
     default_simulation_scenarios: int = 1000
     default_simulation_days: int = 30
-    
-    class Config:
-        env_file = ".env"
-        env_file_encoding = "utf-8"
 
 
-settings = Settings()
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Load settings from the environment and .env once per process."""
+    return Settings()
+
+
+settings = get_settings()
 
@@ -1,17 +1,41 @@
 """Database models for historical records."""
 
-from datetime import datetime
+import threading
+from datetime import date, datetime
+from typing import Any, Optional
+import orjson
 from sqlalchemy import (
     Column, Integer, Float, DateTime, String, Date, Boolean, 
-    ForeignKey, UniqueConstraint, create_engine, Text
+    ForeignKey, Index, JSON, UniqueConstraint, create_engine, Text,
+    TypeDecorator, event, inspect
 )
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 from src.config import settings
 
 Base = declarative_base()
 
 
+class OrdinalDate(TypeDecorator):
+    """
+    A date stored as an INTEGER day number (date.toordinal()).
+    
+    SQLite has no date type and would store ISO-8601 TEXT; integer keys
+    are smaller and range filters compare them as plain integers.
+    """
+    
+    impl = Integer
+    cache_ok = True
+    
+    def process_bind_param(self, value: Optional[date], dialect) -> Optional[int]:
+        """Convert a date to its ordinal day number."""
+        return value.toordinal() if value is not None else None
+    
+    def process_result_value(self, value: Optional[int], dialect) -> Optional[date]:
+        """Convert an ordinal day number back to a date."""
+        return date.fromordinal(value) if value is not None else None
+
+
 # Legacy tables (kept for backward compatibility)
 class HoldingsRecord(Base):
     """Record of MicroStrategy's BTC holdings at a point in time (legacy)."""
@@ -46,7 +70,8 @@ class SimulationRecord(Base):
     __tablename__ = "simulation_records"
     
     id = Column(Integer, primary_key=True, autoincrement=True)
-    timestamp = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    # Write-only log (never filtered or sorted), so no timestamp index
+    timestamp = Column(DateTime, default=datetime.utcnow, nullable=False)
     simulation_type = Column(String(50), nullable=False)
     scenarios = Column(Integer, nullable=False)
     days = Column(Integer, nullable=False)
@@ -68,7 +93,7 @@ class HoldingsTranche(Base):
     __tablename__ = "holdings_tranche"
     
     id = Column(Integer, primary_key=True, autoincrement=True)
-    as_of_date = Column(Date, nullable=False, index=True)
+    as_of_date = Column(OrdinalDate, nullable=False, index=True)
     btc_acquired = Column(Float, nullable=False)
     usd_spent = Column(Float, nullable=False)
     source_type = Column(String(100), nullable=False)  # e.g., "convertible_notes", "equity_raise", "atm", "cash"
@@ -82,7 +107,7 @@ class CompanyStats(Base):
     __tablename__ = "company_stats"
     
     id = Column(Integer, primary_key=True, autoincrement=True)
-    as_of_date = Column(Date, nullable=False, unique=True, index=True)
+    as_of_date = Column(OrdinalDate, nullable=False, unique=True, index=True)
     shares_outstanding = Column(Float, nullable=False)
     cash_usd = Column(Float, nullable=True)
     debt_usd_face = Column(Float, nullable=True)
@@ -94,12 +119,16 @@ class MarketPrice(Base):
     
     __tablename__ = "market_price"
     __table_args__ = (
-        UniqueConstraint('as_of_date', 'asset', name='_date_asset_uc'),
+        # Asset-leading so the unique index also serves per-asset date ranges
+        UniqueConstraint('asset', 'as_of_date', name='_asset_date_uc'),
+        # Per-asset range scans and latest-price lookups; close_price is
+        # included so those queries never touch the table itself
+        Index('ix_marketprice_asset_date_close', 'asset', 'as_of_date', 'close_price'),
     )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
-    as_of_date = Column(Date, nullable=False, index=True)
-    asset = Column(String(20), nullable=False, index=True)  # 'BTC', 'MSTR', 'SPX', etc.
+    as_of_date = Column(OrdinalDate, nullable=False)
+    asset = Column(String(20), nullable=False)  # 'BTC', 'MSTR', 'SPX', etc.
     close_price = Column(Float, nullable=False)
     currency = Column(String(10), nullable=False, default='USD')
 
@@ -110,7 +139,7 @@ class DailySnapshot(Base):
     __tablename__ = "daily_snapshot"
     
     id = Column(Integer, primary_key=True, autoincrement=True)
-    as_of_date = Column(Date, nullable=False, unique=True, index=True)
+    as_of_date = Column(OrdinalDate, nullable=False, unique=True, index=True)
     total_btc = Column(Float, nullable=False)
     btc_spot_price = Column(Float, nullable=False)
     mstr_share_price = Column(Float, nullable=False)
@@ -121,6 +150,10 @@ class DailySnapshot(Base):
     bs_nav_per_share = Column(Float, nullable=True)
     premium_to_btc_nav = Column(Float, nullable=True)
     premium_to_bs_nav = Column(Float, nullable=True)
+    # Company stats used for the snapshot, so it can stand in for a full NAV computation
+    shares_outstanding = Column(Float, nullable=True)
+    cash_usd = Column(Float, nullable=True)
+    debt_usd_market = Column(Float, nullable=True)
 
 
 class UserPosition(Base):
@@ -159,15 +192,180 @@ class SimulationRun(Base):
     num_paths = Column(Integer, nullable=False)
     seed = Column(Integer, nullable=True)
     input_snapshot_date = Column(Date, nullable=False)
-    results_summary_json = Column(Text, nullable=False)
+    results_summary_json = Column(JSON, nullable=False)  # Stored as JSON text in SQLite
 
 
 # Create engine and session factory
-engine = create_engine(f"sqlite:///{settings.database_path}", echo=False)
+def _json_serializer(value: Any) -> str:
+    """Serialize JSON columns with orjson (NumPy scalars included)."""
+    return orjson.dumps(value, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+
+
+engine = create_engine(
+    f"sqlite:///{settings.database_path}",
+    echo=False,
+    json_serializer=_json_serializer,
+    json_deserializer=orjson.loads,
+    connect_args={"check_same_thread": False}
+)
+
+# Per-connection settings for a workload of many small commits and
+# date-range reads: WAL with synchronous=NORMAL avoids a full fsync per
+# commit, and busy_timeout lets the scraper and UI share the file
+_SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-65536",
+    "PRAGMA busy_timeout=5000",
+)
+
+
+@event.listens_for(engine, "connect")
+def _set_sqlite_pragmas(dbapi_conn, connection_record):
+    """Apply _SQLITE_PRAGMAS to each new DBAPI connection."""
+    cursor = dbapi_conn.cursor()
+    try:
+        for pragma in _SQLITE_PRAGMAS:
+            cursor.execute(pragma)
+    finally:
+        cursor.close()
+
+
 SessionLocal = sessionmaker(bind=engine)
 
 
+# Columns of each input table that DailySnapshot values are computed from
+SNAPSHOT_INPUT_COLUMNS = {
+    HoldingsTranche: ("as_of_date", "btc_acquired"),
+    MarketPrice: ("as_of_date", "asset", "close_price"),
+    CompanyStats: ("as_of_date", "shares_outstanding", "cash_usd", "debt_usd_market"),
+}
+
+# session.info key holding the earliest input date changed by a flush
+_SNAPSHOT_REFRESH_KEY = "snapshot_refresh_from"
+
+
+def _earliest_input_date(session: Session) -> Optional[date]:
+    """
+    Earliest as_of_date (old or new) of the snapshot inputs a flush changes.
+    
+    Rows count when inserted or deleted, or when one of their
+    SNAPSHOT_INPUT_COLUMNS changed; edits to other columns (notes, etc.)
+    leave every snapshot valid.
+    """
+    dates = []
+    dirty = session.dirty
+    for obj in (*session.new, *dirty, *session.deleted):
+        columns = SNAPSHOT_INPUT_COLUMNS.get(type(obj))
+        if columns is None:
+            continue
+        attrs = inspect(obj).attrs
+        if obj in dirty and not any(attrs[name].history.has_changes() for name in columns):
+            continue
+        dates.extend(d for d in attrs.as_of_date.load_history().sum() if d)
+    return min(dates) if dates else None
+
+
+@event.listens_for(Session, "before_flush")
+def _record_snapshot_input_writes(session, flush_context, instances):
+    """Remember the earliest snapshot input date this flush changes."""
+    from_date = _earliest_input_date(session)
+    if from_date is not None:
+        pending = session.info.get(_SNAPSHOT_REFRESH_KEY)
+        session.info[_SNAPSHOT_REFRESH_KEY] = min(from_date, pending or from_date)
+
+
+@event.listens_for(Session, "after_flush")
+def _refresh_snapshots_on_input_write(session, flush_context):
+    """Recompute the DailySnapshot rows the flushed input rows feed into."""
+    from_date = session.info.pop(_SNAPSHOT_REFRESH_KEY, None)
+    if from_date is not None:
+        # Imported here: analytics.nav imports this module
+        from src.analytics.nav import refresh_daily_snapshots
+        refresh_daily_snapshots(session, from_date)
+
+
+# Indexes replaced by a wider one or no longer used; dropped from existing databases
+_SUPERSEDED_INDEXES = (
+    "ix_marketprice_asset_date",
+    "ix_market_price_as_of_date",
+    "ix_market_price_asset",
+    "ix_simulation_records_timestamp",
+)
+
+
+# Set once init_database has run in this process
+_initialized = False
+_init_lock = threading.Lock()
+
+
 def init_database():
-    """Initialize the database by creating all tables."""
+    """
+    Initialize the database by creating all tables.
+    
+    Runs once per process: repeated calls (one per DatabaseOperations)
+    return immediately instead of re-inspecting the schema.
+    """
+    global _initialized
+    if _initialized:
+        return
+    
+    with _init_lock:
+        if not _initialized:
+            _create_schema()
+            _initialized = True
+
+
+# julianday() of day 0 in date.toordinal() numbering (0000-12-31)
+_ORDINAL_JULIAN_OFFSET = 1721424.5
+
+
+def _create_schema():
+    """Create missing tables, columns and indexes, and drop superseded indexes."""
     Base.metadata.create_all(engine)
+    
+    # Databases created before OrdinalDate hold ISO-8601 TEXT dates
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            for column in table.columns:
+                if isinstance(column.type, OrdinalDate):
+                    conn.exec_driver_sql(
+                        f"UPDATE {table.name} SET {column.name} = "
+                        f"CAST(julianday({column.name}) - {_ORDINAL_JULIAN_OFFSET} AS INTEGER) "
+                        f"WHERE typeof({column.name}) = 'text'"
+                    )
+    
+    # create_all skips tables that already exist, so add any nullable
+    # columns and indexes introduced since an existing database was created
+    with engine.begin() as conn:
+        inspector = inspect(conn)
+        for table in Base.metadata.sorted_tables:
+            existing = {col["name"] for col in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing and column.nullable:
+                    conn.exec_driver_sql(
+                        f"ALTER TABLE {table.name} ADD COLUMN "
+                        f"{column.name} {column.type.compile(engine.dialect)}"
+                    )
+    
+    with engine.begin() as conn:
+        existing = {
+            row[0] for row in
+            conn.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'index'")
+        }
+        missing = [
+            index for table in Base.metadata.sorted_tables
+            for index in table.indexes if index.name not in existing
+        ]
+        superseded = [name for name in _SUPERSEDED_INDEXES if name in existing]
+        
+        for index in missing:
+            index.create(conn)
+        for name in superseded:
+            conn.exec_driver_sql(f"DROP INDEX {name}")
+        # Refresh planner statistics once the index set has changed
+        if missing or superseded:
+            conn.exec_driver_sql("ANALYZE")
 
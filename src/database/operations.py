@@ -1,12 +1,24 @@
 """Database operations for storing and retrieving historical records."""
 
-from datetime import datetime, timedelta
-from typing import List, Optional
-from sqlalchemy import desc
-from sqlalchemy.orm import Session
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Sequence, Tuple
+from sqlalchemy import desc, func, insert, select
+from sqlalchemy.orm import Session, make_transient_to_detached
 from .models import (
-    SessionLocal, HoldingsRecord, PriceRecord, SimulationRecord, init_database
+    SessionLocal, HoldingsRecord, PriceRecord, SimulationRecord, MarketPrice,
+    HoldingsTranche, SimulationRun, init_database
 )
+from ..analytics import nav
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Rows per executemany call for bulk inserts
+BULK_INSERT_CHUNK_SIZE = 1000
+
+# Rows fetched per round-trip when streaming history
+HISTORY_FETCH_SIZE = 1000
 
 
 class DatabaseOperations:
@@ -16,11 +28,128 @@ class DatabaseOperations:
         """Initialize database operations."""
         init_database()
         self.session = SessionLocal()
+        self._in_batch = False
     
     def close(self):
         """Close the database session."""
         self.session.close()
     
+    @contextmanager
+    def batch(self) -> Iterator["DatabaseOperations"]:
+        """
+        Group several add_* calls into a single transaction.
+        
+        Records are inserted (so they get ids) but only committed once on
+        exit; any exception rolls the whole batch back.
+        """
+        if self._in_batch:
+            yield self
+            return
+        
+        self._in_batch = True
+        try:
+            yield self
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+        finally:
+            self._in_batch = False
+    
+    def _insert_rows(self, model, rows: Sequence[Dict]) -> int:
+        """Insert rows with chunked Core executemany calls and one commit."""
+        if not rows:
+            return 0
+        
+        for start in range(0, len(rows), BULK_INSERT_CHUNK_SIZE):
+            self.session.execute(insert(model), rows[start:start + BULK_INSERT_CHUNK_SIZE])
+        if not self._in_batch:
+            self.session.commit()
+        return len(rows)
+    
+    def _insert_nav_inputs(self, model, rows: Sequence[Dict]) -> int:
+        """Insert NAV input rows, then refresh the snapshots and caches they feed."""
+        if not rows:
+            return 0
+        
+        with self.batch():
+            self._insert_rows(model, rows)
+            # Core inserts bypass the ORM flush hooks that keep snapshots
+            # and cached NAV inputs current
+            nav.invalidate_nav_inputs(self.session, min(row["as_of_date"] for row in rows))
+        return len(rows)
+    
+    def _insert_one(self, model, row: Dict):
+        """
+        Insert a single row with a Core insert.
+        
+        Returns a detached instance carrying the new id, so callers keep
+        their record without the ORM add/flush/refresh round-trips.
+        """
+        result = self.session.execute(insert(model).values(row))
+        if not self._in_batch:
+            self.session.commit()
+        obj = model(id=result.inserted_primary_key[0], **row)
+        make_transient_to_detached(obj)
+        return obj
+    
+    @staticmethod
+    def _with_timestamps(rows: Sequence[Dict]) -> List[Dict]:
+        """Copy rows, defaulting a missing timestamp to now (UTC)."""
+        now = datetime.utcnow()
+        return [{**row, "timestamp": row.get("timestamp") or now} for row in rows]
+    
+    def add_holdings_records_bulk(self, rows: Sequence[Dict]) -> int:
+        """
+        Insert many holdings records in one transaction.
+        
+        Args:
+            rows: Dicts with HoldingsRecord columns (btc_holdings, avg_cost_basis,
+                total_cost and optionally source, notes, timestamp)
+        
+        Returns:
+            Number of rows inserted
+        """
+        return self._insert_rows(
+            HoldingsRecord,
+            [{"source": None, "notes": None, **row} for row in self._with_timestamps(rows)]
+        )
+    
+    def add_price_records_bulk(self, rows: Sequence[Dict]) -> int:
+        """
+        Insert many price records in one transaction.
+        
+        Args:
+            rows: Dicts with PriceRecord columns (btc_price_usd, mstr_price_usd and
+                optionally mstr_market_cap_usd, mstr_shares_outstanding, timestamp)
+        
+        Returns:
+            Number of rows inserted
+        """
+        return self._insert_rows(
+            PriceRecord,
+            [
+                {"mstr_market_cap_usd": None, "mstr_shares_outstanding": None, **row}
+                for row in self._with_timestamps(rows)
+            ]
+        )
+    
+    def add_simulation_records_bulk(self, rows: Sequence[Dict]) -> int:
+        """
+        Insert many simulation records in one transaction.
+        
+        Args:
+            rows: Dicts with the add_simulation_record fields and optionally
+                timestamp
+        
+        Returns:
+            Number of rows inserted
+        """
+        return self._insert_rows(
+            SimulationRecord,
+            [{"results_json": None, **row} for row in self._with_timestamps(rows)]
+        )
+    
     def add_holdings_record(
         self,
         btc_holdings: float,
@@ -31,18 +160,14 @@ class DatabaseOperations:
         timestamp: Optional[datetime] = None
     ) -> HoldingsRecord:
         """Add a new holdings record."""
-        record = HoldingsRecord(
-            timestamp=timestamp or datetime.utcnow(),
-            btc_holdings=btc_holdings,
-            avg_cost_basis=avg_cost_basis,
-            total_cost=total_cost,
-            source=source,
-            notes=notes
-        )
-        self.session.add(record)
-        self.session.commit()
-        self.session.refresh(record)
-        return record
+        return self._insert_one(HoldingsRecord, {
+            "timestamp": timestamp or datetime.utcnow(),
+            "btc_holdings": btc_holdings,
+            "avg_cost_basis": avg_cost_basis,
+            "total_cost": total_cost,
+            "source": source,
+            "notes": notes
+        })
     
     def add_price_record(
         self,
@@ -53,17 +178,13 @@ class DatabaseOperations:
         timestamp: Optional[datetime] = None
     ) -> PriceRecord:
         """Add a new price record."""
-        record = PriceRecord(
-            timestamp=timestamp or datetime.utcnow(),
-            btc_price_usd=btc_price_usd,
-            mstr_price_usd=mstr_price_usd,
-            mstr_market_cap_usd=mstr_market_cap_usd,
-            mstr_shares_outstanding=mstr_shares_outstanding
-        )
-        self.session.add(record)
-        self.session.commit()
-        self.session.refresh(record)
-        return record
+        return self._insert_one(PriceRecord, {
+            "timestamp": timestamp or datetime.utcnow(),
+            "btc_price_usd": btc_price_usd,
+            "mstr_price_usd": mstr_price_usd,
+            "mstr_market_cap_usd": mstr_market_cap_usd,
+            "mstr_shares_outstanding": mstr_shares_outstanding
+        })
     
     def add_simulation_record(
         self,
@@ -81,25 +202,119 @@ class DatabaseOperations:
         results_json: Optional[str] = None
     ) -> SimulationRecord:
         """Add a simulation record."""
-        record = SimulationRecord(
-            timestamp=datetime.utcnow(),
-            simulation_type=simulation_type,
-            scenarios=scenarios,
-            days=days,
-            initial_btc_price=initial_btc_price,
-            mean_price=mean_price,
-            median_price=median_price,
-            std_price=std_price,
-            min_price=min_price,
-            max_price=max_price,
-            percentile_5=percentile_5,
-            percentile_95=percentile_95,
-            results_json=results_json
-        )
-        self.session.add(record)
-        self.session.commit()
-        self.session.refresh(record)
-        return record
+        return self._insert_one(SimulationRecord, {
+            "timestamp": datetime.utcnow(),
+            "simulation_type": simulation_type,
+            "scenarios": scenarios,
+            "days": days,
+            "initial_btc_price": initial_btc_price,
+            "mean_price": mean_price,
+            "median_price": median_price,
+            "std_price": std_price,
+            "min_price": min_price,
+            "max_price": max_price,
+            "percentile_5": percentile_5,
+            "percentile_95": percentile_95,
+            "results_json": results_json
+        })
+    
+    def add_market_prices(
+        self,
+        asset: str,
+        prices: Sequence[Tuple[date, float]],
+        currency: str = "USD"
+    ) -> int:
+        """
+        Insert daily close prices for an asset with chunked executemany calls.
+        
+        Args:
+            asset: Asset symbol ('BTC', 'MSTR', etc.)
+            prices: (as_of_date, close_price) pairs not yet stored
+            currency: Price currency
+        
+        Returns:
+            Number of rows inserted
+        """
+        return self._insert_nav_inputs(MarketPrice, [
+            {
+                "as_of_date": as_of_date,
+                "asset": asset,
+                "close_price": close_price,
+                "currency": currency
+            }
+            for as_of_date, close_price in prices
+        ])
+    
+    def bulk_add_holdings(self, records: Sequence[Dict]) -> int:
+        """
+        Insert many holdings tranches with executemany.
+        
+        Args:
+            records: Dicts with HoldingsTranche columns (as_of_date, btc_acquired,
+                usd_spent, source_type and optionally implied_btc_price, notes).
+                implied_btc_price defaults to usd_spent / btc_acquired.
+        
+        Returns:
+            Number of rows inserted
+        """
+        rows = []
+        for record in records:
+            row = {"notes": None, **record}
+            if row.get("implied_btc_price") is None:
+                btc = row["btc_acquired"]
+                row["implied_btc_price"] = row["usd_spent"] / btc if btc > 0 else 0
+            rows.append(row)
+        
+        return self._insert_nav_inputs(HoldingsTranche, rows)
+    
+    def get_cumulative_holdings(self, as_of: date) -> Tuple[float, float, Optional[float]]:
+        """
+        Sum holdings tranches acquired on or before a date, in SQL.
+        
+        Args:
+            as_of: Last acquisition date included
+        
+        Returns:
+            (total_btc, total_cost, average cost per BTC or None if no BTC)
+        """
+        total_btc, total_cost = self.session.execute(
+            select(
+                func.coalesce(func.sum(HoldingsTranche.btc_acquired), 0.0),
+                func.coalesce(func.sum(HoldingsTranche.usd_spent), 0.0)
+            ).where(HoldingsTranche.as_of_date <= as_of)
+        ).one()
+        return total_btc, total_cost, total_cost / total_btc if total_btc else None
+    
+    def get_cumulative_holdings_by_date(
+        self,
+        as_of: Optional[date] = None
+    ) -> List[Tuple[date, float, float]]:
+        """
+        Running holdings totals for every acquisition date, in one query.
+        
+        Args:
+            as_of: Last acquisition date included (default: all tranches)
+        
+        Returns:
+            (as_of_date, cumulative_btc, cumulative_cost) in date order
+        """
+        running = {"order_by": HoldingsTranche.as_of_date, "rows": (None, 0)}
+        stmt = select(
+            HoldingsTranche.as_of_date,
+            func.sum(func.sum(HoldingsTranche.btc_acquired)).over(**running),
+            func.sum(func.sum(HoldingsTranche.usd_spent)).over(**running)
+        ).group_by(HoldingsTranche.as_of_date).order_by(HoldingsTranche.as_of_date)
+        
+        if as_of is not None:
+            stmt = stmt.where(HoldingsTranche.as_of_date <= as_of)
+        
+        return [tuple(row) for row in self.session.execute(stmt)]
+    
+    def get_latest_market_price_date(self, asset: str) -> Optional[date]:
+        """Get the most recent date with a stored close price for an asset."""
+        return self.session.query(func.max(MarketPrice.as_of_date)).filter(
+            MarketPrice.asset == asset
+        ).scalar()
     
     def get_latest_holdings(self) -> Optional[HoldingsRecord]:
         """Get the most recent holdings record."""
@@ -113,6 +328,11 @@ class DatabaseOperations:
             desc(PriceRecord.timestamp)
         ).first()
     
+    @staticmethod
+    def _history_cutoff(days: int) -> datetime:
+        """Earliest timestamp in a days-long history window, to the second."""
+        return (datetime.utcnow() - timedelta(days=days)).replace(microsecond=0)
+    
     def get_holdings_history(
         self,
         days: Optional[int] = None,
@@ -122,7 +342,7 @@ class DatabaseOperations:
         query = self.session.query(HoldingsRecord)
         
         if days:
-            cutoff = datetime.utcnow() - timedelta(days=days)
+            cutoff = self._history_cutoff(days)
             query = query.filter(HoldingsRecord.timestamp >= cutoff)
         
         query = query.order_by(desc(HoldingsRecord.timestamp))
@@ -141,7 +361,7 @@ class DatabaseOperations:
         query = self.session.query(PriceRecord)
         
         if days:
-            cutoff = datetime.utcnow() - timedelta(days=days)
+            cutoff = self._history_cutoff(days)
             query = query.filter(PriceRecord.timestamp >= cutoff)
         
         query = query.order_by(desc(PriceRecord.timestamp))
@@ -150,4 +370,164 @@ class DatabaseOperations:
             query = query.limit(limit)
         
         return query.all()
-
+    
+    def get_holdings_history_rows(
+        self,
+        days: Optional[int] = None,
+        limit: Optional[int] = None,
+        columns: Optional[Sequence[str]] = None
+    ) -> List[Dict]:
+        """Get holdings history as plain column dicts (no ORM objects)."""
+        return list(self.stream_holdings_history(days, limit, columns))
+    
+    def get_price_history_rows(
+        self,
+        days: Optional[int] = None,
+        limit: Optional[int] = None,
+        columns: Optional[Sequence[str]] = None
+    ) -> List[Dict]:
+        """Get price history as plain column dicts (no ORM objects)."""
+        return list(self.stream_price_history(days, limit, columns))
+    
+    def stream_holdings_history(
+        self,
+        days: Optional[int] = None,
+        limit: Optional[int] = None,
+        columns: Optional[Sequence[str]] = None
+    ) -> Iterator[Dict]:
+        """Yield holdings history column dicts, fetched in batches."""
+        return self._stream_history(HoldingsRecord, days, limit, columns)
+    
+    def stream_price_history(
+        self,
+        days: Optional[int] = None,
+        limit: Optional[int] = None,
+        columns: Optional[Sequence[str]] = None
+    ) -> Iterator[Dict]:
+        """Yield price history column dicts, fetched in batches."""
+        return self._stream_history(PriceRecord, days, limit, columns)
+    
+    def get_holdings_dataframe(
+        self,
+        days: Optional[int] = None,
+        limit: Optional[int] = None,
+        columns: Optional[Sequence[str]] = None
+    ) -> "pd.DataFrame":
+        """Get holdings history as a DataFrame, newest first."""
+        return self._history_dataframe(HoldingsRecord, days, limit, columns)
+    
+    def get_price_dataframe(
+        self,
+        days: Optional[int] = None,
+        limit: Optional[int] = None,
+        columns: Optional[Sequence[str]] = None
+    ) -> "pd.DataFrame":
+        """Get price history as a DataFrame, newest first."""
+        return self._history_dataframe(PriceRecord, days, limit, columns)
+    
+    def _history_dataframe(
+        self,
+        model,
+        days: Optional[int],
+        limit: Optional[int],
+        columns: Optional[Sequence[str]]
+    ) -> "pd.DataFrame":
+        """Read a history query straight into pandas, skipping ORM objects."""
+        # Imported here: pandas dominates import time and the CLI never needs it
+        import pandas as pd
+        
+        stmt = self._history_statement(model, days, limit, columns)
+        return pd.read_sql_query(stmt, self.session.connection(), parse_dates=["timestamp"])
+    
+    def _stream_history(
+        self,
+        model,
+        days: Optional[int],
+        limit: Optional[int],
+        columns: Optional[Sequence[str]] = None
+    ) -> Iterator[Dict]:
+        """Yield column dicts of a timestamped table, newest first."""
+        stmt = self._history_statement(model, days, limit, columns)
+        result = self.session.execute(stmt.execution_options(yield_per=HISTORY_FETCH_SIZE))
+        for row in result:
+            yield dict(row._mapping)
+    
+    def _history_statement(
+        self,
+        model,
+        days: Optional[int],
+        limit: Optional[int],
+        columns: Optional[Sequence[str]] = None
+    ):
+        """
+        Build a select of a timestamped table's columns, newest first.
+        
+        Args:
+            model: HoldingsRecord or PriceRecord
+            days: Only rows from the last N days
+            limit: Maximum number of rows
+            columns: Column names to select (default: all columns)
+        
+        Returns:
+            Core select statement
+        """
+        table_columns = model.__table__.columns
+        stmt = select(*(table_columns[name] for name in columns) if columns else table_columns)
+        
+        if days:
+            cutoff = self._history_cutoff(days)
+            stmt = stmt.where(model.timestamp >= cutoff)
+        
+        stmt = stmt.order_by(desc(model.timestamp))
+        
+        if limit:
+            stmt = stmt.limit(limit)
+        
+        return stmt
+    
+    def get_simulation_run_value(self, run_id: int, json_path: str) -> Optional[Any]:
+        """
+        Read one field of a stored risk summary with SQLite's json_extract.
+        
+        Args:
+            run_id: SimulationRun id
+            json_path: JSON path into results_summary_json, e.g. '$.btc.mean_return'
+        
+        Returns:
+            The field value (objects and arrays come back as JSON text), or
+            None if the run or field does not exist
+        """
+        return self.session.execute(
+            select(func.json_extract(SimulationRun.results_summary_json, json_path))
+            .where(SimulationRun.id == run_id)
+        ).scalar()
+    
+    def get_simulation_run_values(
+        self,
+        json_path: str,
+        limit: Optional[int] = None
+    ) -> List[Tuple[int, datetime, Optional[Any]]]:
+        """
+        Read one risk-summary field across runs, newest first.
+        
+        The summaries are never decoded in Python; only the extracted
+        values leave SQLite.
+        
+        Args:
+            json_path: JSON path into results_summary_json, e.g. '$.mstr.var_95'
+            limit: Maximum number of runs
+        
+        Returns:
+            (run id, created_at, value) tuples; the value is None where the
+            field is missing
+        """
+        stmt = select(
+            SimulationRun.id,
+            SimulationRun.created_at,
+            func.json_extract(SimulationRun.results_summary_json, json_path)
+        ).order_by(desc(SimulationRun.created_at), desc(SimulationRun.id))
+        
+        if limit:
+            stmt = stmt.limit(limit)
+        
+        return [tuple(row) for row in self.session.execute(stmt)]
@@ -2,12 +2,13 @@
 
 from contextlib import contextmanager
 from sqlalchemy.orm import Session
-from .models import SessionLocal
+from .models import SessionLocal, init_database
 
 
 @contextmanager
 def get_db_session():
     """Context manager for database sessions."""
+    init_database()
     session = SessionLocal()
     try:
         yield session
@@ -19,6 +20,23 @@ def get_db_session():
         session.close()
 
 
+@contextmanager
+def get_db_readonly_session():
+    """
+    Context manager for sessions that only read.
+    
+    Objects stay loaded after the block (no expire on commit) and queries
+    never trigger an autoflush; nothing is committed.
+    """
+    init_database()
+    session = SessionLocal(expire_on_commit=False, autoflush=False)
+    try:
+        yield session
+    finally:
+        session.close()
+
+
 def get_session() -> Session:
     """Get a database session (for dependency injection)."""
+    init_database()
     return SessionLocal()
@@ -1,7 +1,8 @@
 """Data scraping modules for BTC holdings and prices."""
 
 from .holdings_scraper import HoldingsScraper
+from .http_client import close_http_client, get_http_client
 from .price_scraper import PriceScraper
 
-__all__ = ["HoldingsScraper", "PriceScraper"]
+__all__ = ["HoldingsScraper", "PriceScraper", "close_http_client", "get_http_client"]
 
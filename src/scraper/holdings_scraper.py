@@ -5,7 +5,13 @@ import httpx
 from typing import Optional, Dict
 from bs4 import BeautifulSoup
 from datetime import datetime
-from src.config import settings
+from .http_client import get_http_client
+
+# Holdings amounts ("X bitcoins" / "X BTC") and average cost in press-release text
+_BTC_RE = re.compile(r'(\d{1,3}(?:,\d{3})*(?:\.\d+)?)\s*(?:bitcoins?|BTC)', re.IGNORECASE)
+_COST_RE = re.compile(
+    r'\$?(\d{1,3}(?:,\d{3})*(?:\.\d+)?)\s*(?:per\s+)?(?:bitcoin|BTC|average)', re.IGNORECASE
+)
 
 
 class HoldingsScraper:
@@ -14,12 +20,14 @@ class HoldingsScraper:
     # Known sources and patterns for holdings data
     # MicroStrategy typically announces in press releases and SEC filings
     
-    def __init__(self):
-        """Initialize the scraper."""
-        self.client = httpx.Client(
-            timeout=settings.request_timeout,
-            headers={"User-Agent": settings.user_agent}
-        )
+    def __init__(self, client: Optional[httpx.Client] = None):
+        """
+        Initialize the scraper.
+        
+        Args:
+            client: HTTP client to use (defaults to the shared process client)
+        """
+        self.client = client or get_http_client()
     
     def fetch_from_web_search(self) -> Optional[Dict]:
         """
@@ -39,12 +47,8 @@ class HoldingsScraper:
     
     def parse_holdings_from_text(self, text: str) -> Optional[Dict]:
         """Parse holdings data from text (e.g., press release)."""
-        # Pattern: "X bitcoins" or "X BTC"
-        btc_pattern = r'(\d{1,3}(?:,\d{3})*(?:\.\d+)?)\s*(?:bitcoins?|BTC)'
-        cost_pattern = r'\$?(\d{1,3}(?:,\d{3})*(?:\.\d+)?)\s*(?:per\s+)?(?:bitcoin|BTC|average)'
-        
-        btc_match = re.search(btc_pattern, text, re.IGNORECASE)
-        cost_match = re.search(cost_pattern, text, re.IGNORECASE)
+        btc_match = _BTC_RE.search(text)
+        cost_match = _COST_RE.search(text)
         
         if btc_match:
             btc_holdings = float(btc_match.group(1).replace(',', ''))
@@ -85,6 +89,10 @@ class HoldingsScraper:
         }
     
     def close(self):
-        """Close the HTTP client."""
-        self.client.close()
+        """
+        Release the scraper.
+        
+        The HTTP client is shared (or owned by whoever passed it in), so it
+        is left open for later fetches.
+        """
 
@@ -0,0 +1,33 @@
+"""Process-wide HTTP client shared by the scrapers."""
+
+from functools import lru_cache
+import httpx
+from src.config import settings
+
+
+@lru_cache(maxsize=1)
+def get_http_client() -> httpx.Client:
+    """
+    Create the shared HTTP client once per process.
+    
+    Reusing one client keeps connections to CoinGecko, Yahoo Finance,
+    Finnhub and Alpha Vantage alive between fetches instead of paying a
+    TCP + TLS handshake for every scraper instance.
+    """
+    return httpx.Client(
+        timeout=settings.request_timeout,
+        headers={"User-Agent": settings.user_agent},
+        limits=httpx.Limits(max_keepalive_connections=8, keepalive_expiry=300)
+    )
+
+
+def close_http_client():
+    """
+    Close the shared HTTP client, if one was created.
+    
+    The cache is cleared too, so a later get_http_client() call builds a
+    fresh client instead of returning the closed one.
+    """
+    if get_http_client.cache_info().currsize:
+        get_http_client().close()
+    get_http_client.cache_clear()
@@ -1,25 +1,197 @@
 """Scraper for Bitcoin and MSTR stock prices."""
 
 import httpx
-import yfinance as yf
+import threading
 import time
-from typing import Optional, Dict
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional, Dict, List, Tuple
+from datetime import date, datetime, time as dt_time, timedelta, timezone
 from src.config import settings
+from .http_client import get_http_client
+
+
+class RateLimiter:
+    """Token bucket limiting calls to a fixed number per 60 seconds."""
+    
+    def __init__(self, calls_per_minute: int):
+        """
+        Initialize the limiter.
+        
+        Args:
+            calls_per_minute: Bucket capacity, refilled evenly over 60 seconds
+        """
+        self.capacity = max(1, calls_per_minute)
+        self.tokens = float(self.capacity)
+        self.refill_rate = self.capacity / 60.0
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def acquire(self):
+        """Block until a call is allowed, then consume a token."""
+        with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity,
+                    self.tokens + (now - self.updated_at) * self.refill_rate
+                )
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                time.sleep((1 - self.tokens) / self.refill_rate)
+
+
+class TTLCache:
+    """Thread-safe in-process cache whose entries expire after a fixed TTL."""
+    
+    def __init__(self, ttl_seconds: float):
+        """
+        Initialize the cache.
+        
+        Args:
+            ttl_seconds: Seconds an entry stays valid; 0 disables caching
+        """
+        self.ttl_seconds = ttl_seconds
+        self._entries: Dict[str, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+    
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for key, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry and time.monotonic() - entry[0] < self.ttl_seconds:
+            return entry[1]
+        return None
+    
+    def set(self, key: str, value: Any):
+        """Cache a value under key."""
+        if self.ttl_seconds > 0:
+            with self._lock:
+                self._entries[key] = (time.monotonic(), value)
+
+
+class ProviderBackoff:
+    """Per-provider cool-down after rate-limit responses."""
+    
+    def __init__(self, max_backoff_seconds: float = 32):
+        """
+        Initialize the tracker.
+        
+        Args:
+            max_backoff_seconds: Cap on the exponential cool-down
+        """
+        self.max_backoff_seconds = max_backoff_seconds
+        self._next_allowed: Dict[str, float] = {}
+        self._strikes: Dict[str, int] = {}
+        self._lock = threading.Lock()
+    
+    def available(self, provider: str) -> bool:
+        """Whether the provider's cool-down (if any) has expired."""
+        with self._lock:
+            return time.monotonic() >= self._next_allowed.get(provider, 0.0)
+    
+    def record_rate_limit(self, provider: str):
+        """Back off the provider for min(max, 2**strikes) seconds."""
+        with self._lock:
+            strikes = self._strikes.get(provider, 0) + 1
+            self._strikes[provider] = strikes
+            backoff = min(self.max_backoff_seconds, 2 ** strikes)
+            self._next_allowed[provider] = time.monotonic() + backoff
+    
+    def record_success(self, provider: str):
+        """Reset the provider's backoff after a successful call."""
+        with self._lock:
+            self._strikes.pop(provider, None)
+            self._next_allowed.pop(provider, None)
+
+
+class SourceStats:
+    """Exponentially weighted success rate and latency per data source."""
+    
+    # Assumed for sources that have not been tried yet
+    PRIOR_SUCCESS_RATE = 0.5
+    PRIOR_LATENCY_SECONDS = 1.0
+    
+    def __init__(self, weight: float = 0.3):
+        """
+        Initialize the tracker.
+        
+        Args:
+            weight: Weight of the newest observation in each average
+        """
+        self.weight = weight
+        self._stats: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+    
+    def record(self, source: str, success: bool, latency_seconds: float):
+        """Fold one call's outcome into the source's averages."""
+        with self._lock:
+            rate, latency = self._stats.get(
+                source, (self.PRIOR_SUCCESS_RATE, self.PRIOR_LATENCY_SECONDS)
+            )
+            rate += self.weight * (float(success) - rate)
+            latency += self.weight * (latency_seconds - latency)
+            self._stats[source] = (rate, latency)
+    
+    def score(self, source: str) -> float:
+        """Success rate per second of latency; higher is tried first."""
+        with self._lock:
+            rate, latency = self._stats.get(
+                source, (self.PRIOR_SUCCESS_RATE, self.PRIOR_LATENCY_SECONDS)
+            )
+        return rate / (latency + 1.0)
+    
+    def rank(self, sources: List[Tuple]) -> List[Tuple]:
+        """Order (name, ...) tuples best-first; ties keep their given order."""
+        return sorted(sources, key=lambda source: -self.score(source[0]))
+
+
+def _is_rate_limited(error: Exception) -> bool:
+    """Whether an error is an HTTP 429 or yfinance's rate-limit error."""
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code == 429
+    return type(error).__name__ == "YFRateLimitError"
+
+
+# Shared across scraper instances since the limit is per API key / IP
+coingecko_rate_limiter = RateLimiter(settings.coingecko_calls_per_minute)
+
+# Latest quotes per symbol, so repeated fetches within the TTL skip the network
+price_cache = TTLCache(settings.price_cache_ttl_seconds)
+
+# MSTR data providers currently backing off after a 429
+provider_backoff = ProviderBackoff()
+
+# Outcome history per MSTR source, used to try the best one first
+mstr_source_stats = SourceStats()
 
 
 class PriceScraper:
     """Scrape Bitcoin and MSTR stock prices."""
     
-    def __init__(self):
-        """Initialize the price scraper."""
-        self.client = httpx.Client(
-            timeout=settings.request_timeout,
-            headers={"User-Agent": settings.user_agent}
-        )
+    def __init__(self, client: Optional[httpx.Client] = None):
+        """
+        Initialize the price scraper.
+        
+        Args:
+            client: HTTP client to use (defaults to the shared process client)
+        """
+        self.client = client or get_http_client()
     
     def fetch_btc_price(self) -> Optional[float]:
-        """Fetch current Bitcoin price from CoinGecko."""
+        """Fetch current Bitcoin price from CoinGecko (cached for the price TTL)."""
+        cached = price_cache.get("BTC")
+        if cached is not None:
+            return cached
+        
+        price = self._fetch_btc_price()
+        if price is not None:
+            price_cache.set("BTC", price)
+        return price
+    
+    def _fetch_btc_price(self) -> Optional[float]:
+        """Request the current Bitcoin price from CoinGecko."""
         try:
             url = f"{settings.coingecko_api_url}/simple/price"
             params = {
@@ -30,6 +202,7 @@ class PriceScraper:
             if settings.coingecko_api_key:
                 params["x_cg_demo_api_key"] = settings.coingecko_api_key
             
+            coingecko_rate_limiter.acquire()
             response = self.client.get(url, params=params)
             response.raise_for_status()
             data = response.json()
@@ -39,181 +212,215 @@ class PriceScraper:
             print(f"Error fetching BTC price from CoinGecko: {e}")
             return None
     
-    def fetch_mstr_data(self) -> Optional[Dict]:
-        """Fetch MSTR stock data from Yahoo Finance with retry logic."""
-        ticker = yf.Ticker("MSTR")
+    def fetch_btc_range(self, start_date: date, end_date: date) -> List[Tuple[date, float]]:
+        """
+        Fetch daily BTC closes for a date range in a single CoinGecko call.
         
-        # Method 1: Try download() function (sometimes more reliable)
-        try:
-            time.sleep(1)  # Delay to avoid rate limiting
-            df = yf.download("MSTR", period="1d", progress=False, interval="1m")
-            if not df.empty:
-                current_price = float(df['Close'].iloc[-1])
-                if current_price and current_price > 0:
-                    return {
-                        "price": current_price,
-                        "market_cap": None,
-                        "shares_outstanding": None
-                    }
-        except Exception:
-            pass
-        
-        # Method 2: Try history API with longer period
-        for attempt in range(2):
-            try:
-                time.sleep(1.5)  # Longer delay
-                hist = ticker.history(period="1mo", interval="1d")
-                if not hist.empty:
-                    current_price = float(hist['Close'].iloc[-1])
-                    if current_price and current_price > 0:
-                        return {
-                            "price": current_price,
-                            "market_cap": None,
-                            "shares_outstanding": None
-                        }
-            except Exception:
-                if attempt < 1:
-                    time.sleep(2)
-                    continue
-        
-        # Method 3: Fallback to info API with longer delay
+        Args:
+            start_date: First date (inclusive)
+            end_date: Last date (inclusive)
+        
+        Returns:
+            List of (date, close_price) in date order; the close is the last
+            quote CoinGecko returns for each UTC day. Empty on error.
+        """
         try:
-            time.sleep(2)  # Longer delay to avoid rate limiting
-            info = ticker.info
-            current_price = (
-                info.get("currentPrice") or 
-                info.get("regularMarketPrice") or 
-                info.get("previousClose") or
-                info.get("open")
-            )
-            market_cap = info.get("marketCap")
-            shares_outstanding = info.get("sharesOutstanding")
+            url = f"{settings.coingecko_api_url}/coins/bitcoin/market_chart/range"
+            start_ts = datetime.combine(start_date, dt_time.min, tzinfo=timezone.utc)
+            end_ts = datetime.combine(end_date + timedelta(days=1), dt_time.min, tzinfo=timezone.utc)
+            params = {
+                "vs_currency": "usd",
+                "from": int(start_ts.timestamp()),
+                "to": int(end_ts.timestamp()) - 1
+            }
+            
+            if settings.coingecko_api_key:
+                params["x_cg_demo_api_key"] = settings.coingecko_api_key
             
-            if current_price and current_price > 0:
-                return {
-                    "price": float(current_price),
-                    "market_cap": float(market_cap) if market_cap else None,
-                    "shares_outstanding": float(shares_outstanding) if shares_outstanding else None
-                }
+            coingecko_rate_limiter.acquire()
+            response = self.client.get(url, params=params)
+            response.raise_for_status()
+            data = response.json()
+            
+            # Quotes are [timestamp_ms, price] pairs in time order; keep the last per day
+            closes: Dict[date, float] = {}
+            for timestamp_ms, price in data.get("prices", []):
+                day = datetime.fromtimestamp(timestamp_ms / 1000, tz=timezone.utc).date()
+                if start_date <= day <= end_date:
+                    closes[day] = float(price)
+            
+            return sorted(closes.items())
         except Exception as e:
-            print(f"Warning: Could not fetch MSTR data from Yahoo Finance (rate limited). Error: {str(e)[:100]}")
+            print(f"Error fetching BTC price range from CoinGecko: {e}")
+            return []
+    
+    def fetch_mstr_data(self) -> Optional[Dict]:
+        """Fetch MSTR stock data (cached for the price TTL)."""
+        cached = price_cache.get("MSTR")
+        if cached is not None:
+            return dict(cached)
         
-        # Method 4: Try Alpha Vantage if API key is available
+        data = self._fetch_mstr_data()
+        if data is not None:
+            price_cache.set("MSTR", dict(data))
+        return data
+    
+    def _fetch_mstr_data(self) -> Optional[Dict]:
+        """
+        Fetch MSTR stock data, trying each source in turn.
+        
+        Sources are ordered by their recent success rate and latency.
+        Sources whose provider answered 429 recently are skipped until
+        their backoff expires, so a throttled provider costs no waiting.
+        """
+        # Imported here: yfinance (and pandas) dominate CLI start-up time and
+        # are only needed when MSTR data is actually fetched
+        import yfinance as yf
+        
+        ticker = yf.Ticker("MSTR")
+        sources = [
+            ("yf_fast_info", "yahoo", lambda: self._fetch_mstr_from_yf_fast_info(ticker)),
+            ("yf_download", "yahoo", lambda: self._fetch_mstr_from_yf_download(yf)),
+            ("yf_history", "yahoo", lambda: self._fetch_mstr_from_yf_history(ticker)),
+        ]
         if settings.alpha_vantage_api_key:
-            try:
-                return self._fetch_mstr_from_alpha_vantage()
-            except Exception:
-                pass
+            sources.append(("alpha_vantage", "alpha_vantage", self._fetch_mstr_from_alpha_vantage))
+        if settings.finnhub_api_key:
+            sources.append(("finnhub", "finnhub", self._fetch_mstr_from_finnhub))
+        sources.append(("yahoo_http", "yahoo", self._fetch_mstr_direct_http))
         
-        # Method 5: Try Finnhub (free tier available)
-        try:
-            return self._fetch_mstr_from_finnhub()
-        except Exception:
-            pass
+        # Try the historically best source first; the full profile is large
+        # and heavily rate-limited, so it stays the last resort
+        sources = mstr_source_stats.rank(sources)
+        sources.append(("yf_info", "yahoo", lambda: self._fetch_mstr_from_yf_info(ticker)))
         
-        # Method 6: Try direct HTTP request to Yahoo Finance quote endpoint
-        try:
-            return self._fetch_mstr_direct_http()
-        except Exception:
-            pass
+        for name, provider, fetch in sources:
+            if not provider_backoff.available(provider):
+                continue
+            started = time.monotonic()
+            try:
+                data = fetch()
+            except Exception as e:
+                print(f"Error fetching MSTR data from {name}: {e}")
+                mstr_source_stats.record(name, False, time.monotonic() - started)
+                if _is_rate_limited(e):
+                    provider_backoff.record_rate_limit(provider)
+                continue
+            mstr_source_stats.record(name, bool(data), time.monotonic() - started)
+            if data:
+                provider_backoff.record_success(provider)
+                return data
         
         return None
     
+    @staticmethod
+    def _mstr_quote(price, market_cap=None, shares_outstanding=None) -> Optional[Dict]:
+        """Build an MSTR quote dict, or None if the price is missing."""
+        price = float(price) if price else 0.0
+        if price <= 0:
+            return None
+        return {
+            "price": price,
+            "market_cap": float(market_cap) if market_cap else None,
+            "shares_outstanding": float(shares_outstanding) if shares_outstanding else None
+        }
+    
+    def _fetch_mstr_from_yf_fast_info(self, ticker) -> Optional[Dict]:
+        """Fetch MSTR price, market cap and shares via the light yfinance fast_info."""
+        fast_info = ticker.fast_info
+        return self._mstr_quote(
+            getattr(fast_info, "last_price", None),
+            getattr(fast_info, "market_cap", None),
+            getattr(fast_info, "shares", None)
+        )
+    
+    def _fetch_mstr_from_yf_download(self, yf) -> Optional[Dict]:
+        """Fetch the latest MSTR minute close via yfinance download()."""
+        df = yf.download("MSTR", period="1d", progress=False, interval="1m")
+        return None if df.empty else self._mstr_quote(float(df['Close'].iloc[-1]))
+    
+    def _fetch_mstr_from_yf_history(self, ticker) -> Optional[Dict]:
+        """Fetch the latest MSTR daily close via the yfinance history API."""
+        hist = ticker.history(period="1mo", interval="1d")
+        return None if hist.empty else self._mstr_quote(float(hist['Close'].iloc[-1]))
+    
+    def _fetch_mstr_from_yf_info(self, ticker) -> Optional[Dict]:
+        """Fetch MSTR price, market cap and shares via the yfinance info API."""
+        info = ticker.info
+        current_price = (
+            info.get("currentPrice") or 
+            info.get("regularMarketPrice") or 
+            info.get("previousClose") or
+            info.get("open")
+        )
+        return self._mstr_quote(
+            current_price, info.get("marketCap"), info.get("sharesOutstanding")
+        )
+    
     def _fetch_mstr_direct_http(self) -> Optional[Dict]:
-        """Try fetching MSTR price via direct HTTP request to Yahoo Finance."""
-        try:
-            import random
-            # Use a different endpoint that might be less rate-limited
-            url = "https://query1.finance.yahoo.com/v8/finance/chart/MSTR"
-            params = {
-                "interval": "1d",
-                "range": "1d"
-            }
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36",
-                "Accept": "application/json"
-            }
-            time.sleep(2)  # Wait before trying
-            response = self.client.get(url, params=params, headers=headers, timeout=15)
-            response.raise_for_status()
-            data = response.json()
-            
-            result = data.get("chart", {}).get("result", [])
-            if result:
-                quote = result[0].get("meta", {})
-                price = quote.get("regularMarketPrice") or quote.get("previousClose")
-                if price and price > 0:
-                    return {
-                        "price": float(price),
-                        "market_cap": quote.get("marketCap"),
-                        "shares_outstanding": None
-                    }
-        except Exception:
-            pass
-        return None
+        """Fetch MSTR price via a direct HTTP request to Yahoo Finance."""
+        # Use a different endpoint that might be less rate-limited
+        url = "https://query1.finance.yahoo.com/v8/finance/chart/MSTR"
+        params = {
+            "interval": "1d",
+            "range": "1d"
+        }
+        headers = {
+            "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36",
+            "Accept": "application/json"
+        }
+        response = self.client.get(url, params=params, headers=headers, timeout=15)
+        response.raise_for_status()
+        data = response.json()
+        
+        result = data.get("chart", {}).get("result", [])
+        if not result:
+            return None
+        quote = result[0].get("meta", {})
+        return self._mstr_quote(
+            quote.get("regularMarketPrice") or quote.get("previousClose"),
+            quote.get("marketCap")
+        )
     
     def _fetch_mstr_from_finnhub(self) -> Optional[Dict]:
         """Fetch MSTR data from Finnhub API (free tier - API key required)."""
-        try:
-            # Check if API key is available (required for Finnhub)
-            api_key = settings.finnhub_api_key
-            if not api_key:
-                return None  # Skip if no API key
-            
-            url = "https://finnhub.io/api/v1/quote"
-            params = {
-                "symbol": "MSTR",
-                "token": api_key
-            }
-            response = self.client.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            
-            # Check for error responses
-            if data.get("s") == "no_data" or data.get("c") == 0:
-                return None
-            
-            price = data.get("c")  # Current price
-            if price and price > 0:
-                return {
-                    "price": float(price),
-                    "market_cap": None,
-                    "shares_outstanding": None
-                }
-        except Exception as e:
-            print(f"Finnhub API error: {str(e)[:100]}")
-        return None
+        url = "https://finnhub.io/api/v1/quote"
+        params = {
+            "symbol": "MSTR",
+            "token": settings.finnhub_api_key
+        }
+        response = self.client.get(url, params=params, timeout=10)
+        response.raise_for_status()
+        data = response.json()
+        
+        # Check for error responses
+        if data.get("s") == "no_data" or data.get("c") == 0:
+            return None
+        
+        return self._mstr_quote(data.get("c"))  # Current price
     
     def _fetch_mstr_from_alpha_vantage(self) -> Optional[Dict]:
         """Fetch MSTR data from Alpha Vantage API."""
-        try:
-            url = "https://www.alphavantage.co/query"
-            params = {
-                "function": "GLOBAL_QUOTE",
-                "symbol": "MSTR",
-                "apikey": settings.alpha_vantage_api_key
-            }
-            response = self.client.get(url, params=params)
-            response.raise_for_status()
-            data = response.json()
-            
-            quote = data.get("Global Quote", {})
-            if quote:
-                price = quote.get("05. price")
-                if price:
-                    return {
-                        "price": float(price),
-                        "market_cap": None,
-                        "shares_outstanding": None
-                    }
-        except Exception:
-            pass
-        return None
+        url = "https://www.alphavantage.co/query"
+        params = {
+            "function": "GLOBAL_QUOTE",
+            "symbol": "MSTR",
+            "apikey": settings.alpha_vantage_api_key
+        }
+        response = self.client.get(url, params=params)
+        response.raise_for_status()
+        data = response.json()
+        
+        return self._mstr_quote(data.get("Global Quote", {}).get("05. price"))
     
     def fetch_latest_prices(self) -> Dict:
         """Fetch latest BTC and MSTR prices."""
-        btc_price = self.fetch_btc_price()
-        mstr_data = self.fetch_mstr_data()
+        # The two sources are independent, so the slow MSTR fallback chain
+        # runs on a worker thread while CoinGecko is queried here
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            mstr_future = executor.submit(self.fetch_mstr_data)
+            btc_price = self.fetch_btc_price()
+            mstr_data = mstr_future.result()
         
         return {
             "btc_price_usd": btc_price or 0.0,
@@ -224,6 +431,10 @@ class PriceScraper:
         }
     
     def close(self):
-        """Close the HTTP client."""
-        self.client.close()
+        """
+        Release the scraper.
+        
+        The HTTP client is shared (or owned by whoever passed it in), so it
+        is left open for later fetches.
+        """
 
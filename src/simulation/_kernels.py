@@ -0,0 +1,252 @@
+"""Optional Numba kernels for building Monte Carlo price paths.
+
+Each kernel walks a path once, adding up its log returns and writing
+``S0 * exp(running_sum)`` straight into the output matrix. The NumPy
+version instead materialises the log-return and cumsum arrays first.
+Numba is an optional dependency (requirements-fast.txt): without it the
+functions below stay plain Python, and mc_paths keeps using its NumPy
+implementation.
+
+With Numba, each kernel is compiled on its first call (or by warm_up())
+for the float64 and float32 array signatures that the simulations use,
+so later calls pay no type-dispatch cost. Nothing is compiled at import:
+loading a parallel kernel starts Numba's thread pool, and a process
+that forks after that (e.g. a fork-based process pool) hangs at exit.
+``cache=True`` stores the machine code next to this module, or under
+NUMBA_CACHE_DIR when that is set: only the first compile takes several
+seconds, and later processes load the cached code. Every kernel must
+stay cacheable, i.e. free of dynamic globals.
+"""
+
+import math
+import threading
+
+import numpy as np
+
+try:
+    from numba import get_num_threads, njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:  # pragma: no cover - depends on the environment
+    prange = range
+    NUMBA_AVAILABLE = False
+    
+    def get_num_threads():
+        return 1
+
+HISTOGRAM_BINS = 4096  # Bins per thread when locating the VaR order statistic
+
+
+def gbm_paths(Z, drift, diff, S0, out):
+    """
+    Fill ``out`` with GBM price paths driven by the shocks ``Z``.
+    
+    Args:
+        Z: (num_paths, horizon_days) array of N(0, 1) draws
+        drift: Per-step log drift, (mu - 0.5*sigma^2)*dt
+        diff: Per-step diffusion scale, sigma*sqrt(dt)
+        S0: Starting price
+        out: (num_paths, horizon_days + 1) array written in place
+    """
+    num_paths, horizon_days = Z.shape
+    for i in prange(num_paths):
+        running = 0.0
+        out[i, 0] = S0
+        for t in range(horizon_days):
+            running += drift + diff * Z[i, t]
+            out[i, t + 1] = S0 * math.exp(running)
+
+
+def joint_gbm(Z_btc, Z_res, drift, diff, alpha_dt, beta, res_scale,
+              S0_btc, S0_mstr, btc_out, mstr_out):
+    """
+    Fill ``btc_out`` and ``mstr_out`` with joint BTC/MSTR beta-model paths.
+    
+    Per step, r_BTC = drift + diff*Z_btc and
+    r_MSTR = alpha_dt + beta*r_BTC + res_scale*Z_res.
+    
+    Args:
+        Z_btc: (num_paths, horizon_days) BTC shocks
+        Z_res: (num_paths, horizon_days) MSTR residual shocks
+        drift: Per-step BTC log drift
+        diff: Per-step BTC diffusion scale
+        alpha_dt: Per-step MSTR alpha, alpha*dt
+        beta: MSTR beta vs BTC
+        res_scale: Per-step residual scale, residual_sigma*sqrt(dt)
+        S0_btc: Starting BTC price
+        S0_mstr: Starting MSTR price
+        btc_out: (num_paths, horizon_days + 1) array written in place
+        mstr_out: (num_paths, horizon_days + 1) array written in place
+    """
+    num_paths, horizon_days = Z_btc.shape
+    for i in prange(num_paths):
+        btc_running = 0.0
+        mstr_running = 0.0
+        btc_out[i, 0] = S0_btc
+        mstr_out[i, 0] = S0_mstr
+        for t in range(horizon_days):
+            btc_step = drift + diff * Z_btc[i, t]
+            btc_running += btc_step
+            mstr_running += alpha_dt + beta * btc_step + res_scale * Z_res[i, t]
+            btc_out[i, t + 1] = S0_btc * math.exp(btc_running)
+            mstr_out[i, t + 1] = S0_mstr * math.exp(mstr_running)
+
+
+def var_cvar(returns, alpha):
+    """
+    Exact VaR/CVaR of ``returns`` without sorting or copying the array.
+    
+    Runs _var_cvar with one block of returns per Numba thread. Used by
+    risk.compute_var_cvar for large path counts; compute_risk_metrics
+    reads VaR/CVaR from the sort it already does for percentiles.
+    
+    Args:
+        returns: 1-D float array of simulated returns
+        alpha: Confidence level (e.g. 0.95)
+        
+    Returns:
+        Tuple of (VaR, CVaR), positive for losses
+    """
+    return _var_cvar(returns, alpha, get_num_threads())
+
+
+def _var_cvar(returns, alpha, num_threads):
+    """
+    Histogram-select kernel behind var_cvar.
+    
+    Matches compute_var_cvar's definition (k = round((1-alpha) * N) worst
+    returns). Threads first find the range, then fill per-thread histograms
+    with counts and sums. The merged histogram gives the bin holding the
+    k-th worst return; only that bin's members are gathered and sorted.
+    
+    The thread count is an argument rather than a get_num_threads() call
+    inside the kernel: that call is a dynamic global, which would stop
+    Numba from caching the compiled kernel.
+    
+    Args:
+        returns: 1-D float array of simulated returns
+        alpha: Confidence level (e.g. 0.95)
+        num_threads: Number of blocks (one per thread) to split returns into
+        
+    Returns:
+        Tuple of (VaR, CVaR), positive for losses
+    """
+    n = returns.size
+    k = max(1, int(round((1 - alpha) * n)))
+    block = (n + num_threads - 1) // num_threads
+    
+    # Pass 1: range of the returns
+    mins = np.empty(num_threads)
+    maxs = np.empty(num_threads)
+    for t in prange(num_threads):
+        low = np.inf
+        high = -np.inf
+        for i in range(t * block, min((t + 1) * block, n)):
+            value = returns[i]
+            if value < low:
+                low = value
+            if value > high:
+                high = value
+        mins[t] = low
+        maxs[t] = high
+    low = mins.min()
+    high = maxs.max()
+    if high == low:
+        return -low, -low
+    scale = HISTOGRAM_BINS / (high - low)
+    
+    # Pass 2: per-thread histograms of counts and sums
+    counts = np.zeros((num_threads, HISTOGRAM_BINS), dtype=np.int64)
+    sums = np.zeros((num_threads, HISTOGRAM_BINS))
+    for t in prange(num_threads):
+        for i in range(t * block, min((t + 1) * block, n)):
+            b = min(int((returns[i] - low) * scale), HISTOGRAM_BINS - 1)
+            counts[t, b] += 1
+            sums[t, b] += returns[i]
+    
+    # Walk the merged bins up to the one holding the k-th worst return
+    bin_counts = counts.sum(axis=0)
+    target = 0
+    below = 0
+    tail_sum = 0.0
+    while below + bin_counts[target] < k:
+        below += bin_counts[target]
+        tail_sum += sums[:, target].sum()
+        target += 1
+    
+    # Pass 3: gather that bin's members, each thread into its own slice
+    offsets = np.zeros(num_threads + 1, dtype=np.int64)
+    for t in range(num_threads):
+        offsets[t + 1] = offsets[t] + counts[t, target]
+    members = np.empty(offsets[num_threads])
+    for t in prange(num_threads):
+        m = offsets[t]
+        for i in range(t * block, min((t + 1) * block, n)):
+            if min(int((returns[i] - low) * scale), HISTOGRAM_BINS - 1) == target:
+                members[m] = returns[i]
+                m += 1
+    members.sort()
+    
+    needed = k - below
+    return -members[needed - 1], -(tail_sum + members[:needed].sum()) / k
+
+
+# Array signatures the kernels are compiled for: float64 for library callers,
+# float32 for scenario runs (mc_paths.SCENARIO_DTYPE)
+_GBM_SIGNATURES = [
+    f"void({t}[:, :], float64, float64, float64, {t}[:, :])" for t in ("float64", "float32")
+]
+_JOINT_SIGNATURES = [
+    f"void({t}[:, :], {t}[:, :], float64, float64, float64, float64, float64, "
+    f"float64, float64, {t}[:, :], {t}[:, :])"
+    for t in ("float64", "float32")
+]
+_VAR_CVAR_SIGNATURES = ["UniTuple(float64, 2)(float64[:], float64, int64)"]
+
+class _LazyKernel:
+    """A Numba kernel compiled for fixed signatures on its first call."""
+    
+    def __init__(self, func, signatures, **options):
+        """
+        Wrap a kernel without compiling it.
+        
+        Args:
+            func: Plain Python kernel
+            signatures: Numba signatures to compile for
+            **options: njit options
+        """
+        self._func = func
+        self._signatures = signatures
+        self._options = options
+        self._compiled = None
+        self._lock = threading.Lock()
+        self.__doc__ = func.__doc__
+    
+    def compile(self):
+        """Compile (or load from cache) the kernel once; return the dispatcher."""
+        if self._compiled is None:
+            with self._lock:
+                if self._compiled is None:
+                    self._compiled = njit(self._signatures, **self._options)(self._func)
+        return self._compiled
+    
+    def __call__(self, *args):
+        """Run the compiled kernel."""
+        return self.compile()(*args)
+
+
+def warm_up():
+    """
+    Compile (or load from cache) every kernel now instead of on first use.
+    
+    Starts Numba's thread pool, so do not fork afterwards.
+    """
+    if NUMBA_AVAILABLE:
+        for kernel in (gbm_paths, joint_gbm, _var_cvar):
+            kernel.compile()
+
+
+if NUMBA_AVAILABLE:
+    gbm_paths = _LazyKernel(gbm_paths, _GBM_SIGNATURES, parallel=True, fastmath=True, cache=True)
+    joint_gbm = _LazyKernel(joint_gbm, _JOINT_SIGNATURES, parallel=True, fastmath=True, cache=True)
+    # No fastmath: the range pass relies on infinities
+    _var_cvar = _LazyKernel(_var_cvar, _VAR_CVAR_SIGNATURES, parallel=True, cache=True)
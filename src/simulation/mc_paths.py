@@ -1,22 +1,116 @@
 """Monte Carlo simulation paths for BTC and MSTR."""
 
+import threading
 from dataclasses import dataclass
 from typing import Tuple, Optional
 import numpy as np
-from scipy import stats
+
+from src.simulation import _kernels
 
 # Constants
 MIN_DATA_POINTS = 10  # Minimum data points for beta estimation
 DEFAULT_BETA = 1.5  # Default beta if insufficient data
 DEFAULT_ALPHA = 0.0  # Default alpha
 DEFAULT_RESIDUAL_SIGMA = 0.30  # Default residual volatility
+TERMINAL_CHUNK_ELEMENTS = 1_000_000  # Random draws held in memory at once for terminal-only runs
+SCENARIO_DTYPE = np.float32  # Path precision for scenario runs; ample for percentile-level risk
+_KERNEL_DTYPES = (np.float64, np.float32)  # Dtypes the Numba path kernels are compiled for
+SHOCK_BUFFER_MAX_BYTES = 256 * 1024 * 1024  # Largest shock buffer a thread keeps between runs
+
+
+def make_rng(seed: Optional[int] = None) -> np.random.Generator:
+    """
+    Build the random generator used by the path simulations.
+    
+    SFC64 draws normals noticeably faster than the legacy Mersenne Twister
+    and keeps no global state, so concurrent simulations cannot interfere.
+    
+    Args:
+        seed: Random seed, or None for fresh OS entropy
+        
+    Returns:
+        A numpy Generator backed by SFC64
+    """
+    return np.random.Generator(np.random.SFC64(seed))
+
+
+class ShockBuffers:
+    """
+    Per-thread scratch arrays for random shocks, reused across simulations.
+    
+    Each thread keeps its most recent buffer, so repeated runs with the same
+    shape and dtype (e.g. one per scenario) skip the allocation and page
+    faults of a fresh (num_paths, horizon_days) block. A different shape
+    replaces the buffer rather than growing the cache, and blocks larger
+    than max_bytes are handed out without being kept.
+    """
+    
+    def __init__(self, max_bytes: int = SHOCK_BUFFER_MAX_BYTES):
+        """
+        Initialize the per-thread storage.
+        
+        Args:
+            max_bytes: Largest buffer kept per thread
+        """
+        self._local = threading.local()
+        self.max_bytes = max_bytes
+    
+    def get(self, shape: Tuple[int, ...], dtype=np.float64) -> np.ndarray:
+        """
+        Return this thread's buffer for shape and dtype (contents undefined).
+        
+        Args:
+            shape: Array shape
+            dtype: Array dtype
+            
+        Returns:
+            A C-contiguous array of the requested shape and dtype
+        """
+        buffer = getattr(self._local, "buffer", None)
+        if buffer is not None and buffer.shape == tuple(shape) and buffer.dtype == np.dtype(dtype):
+            return buffer
+        
+        buffer = np.empty(shape, dtype=dtype)
+        if buffer.nbytes <= self.max_bytes:
+            self._local.buffer = buffer
+        return buffer
+
+
+# Shared by the path simulations when reuse_shock_buffer is set
+shock_buffers = ShockBuffers()
 
 
-@dataclass
+def _draw_shocks(
+    rng: np.random.Generator,
+    shape: Tuple[int, ...],
+    dtype=np.float64,
+    antithetic: bool = False,
+    out: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Draw N(0, 1) shocks with paths along axis 0, into out when given.
+    
+    With antithetic, only the first ceil(num_paths / 2) paths are drawn and
+    the rest are their negatives, so every shock of a path (BTC and residual
+    alike) is mirrored together. Odd path counts leave the last drawn path
+    unpaired.
+    """
+    if not antithetic:
+        return rng.standard_normal(shape, dtype=dtype, out=out)
+    
+    num_paths = shape[0]
+    half = (num_paths + 1) // 2
+    shocks = np.empty(shape, dtype=dtype) if out is None else out
+    rng.standard_normal((half,) + tuple(shape[1:]), dtype=dtype, out=shocks[:half])
+    np.negative(shocks[:num_paths - half], out=shocks[half:])
+    return shocks
+
+
+@dataclass(frozen=True, slots=True)
 class SimulationPaths:
     """Container for simulation path results."""
-    btc_paths: np.ndarray  # Shape: (num_paths, horizon_days + 1)
-    mstr_paths: Optional[np.ndarray]  # Shape: (num_paths, horizon_days + 1) or None
+    btc_paths: np.ndarray  # Shape: (num_paths, horizon_days + 1), or (num_paths, 1) for terminals only
+    mstr_paths: Optional[np.ndarray]  # Same shape as btc_paths, or None
     initial_btc_price: float
     initial_mstr_price: Optional[float]
     num_paths: int
@@ -30,7 +124,11 @@ def simulate_btc_paths(
     mu: float = 0.20,
     sigma: float = 0.80,
     dt: float = 1/252,
-    seed: Optional[int] = None
+    seed: Optional[int] = None,
+    rng: Optional[np.random.Generator] = None,
+    dtype=np.float64,
+    antithetic: bool = False,
+    reuse_shock_buffer: bool = False
 ) -> np.ndarray:
     """
     Simulate BTC price paths using Geometric Brownian Motion (GBM).
@@ -44,30 +142,104 @@ def simulate_btc_paths(
         mu: Annual drift (expected return)
         sigma: Annual volatility
         dt: Time step (default 1/252 for daily with trading days)
-        seed: Random seed for reproducibility
+        seed: Random seed for reproducibility (ignored when rng is given)
+        rng: Generator to draw from; built from seed when omitted
+        dtype: Float dtype of the shocks and paths (np.float32 halves memory)
+        antithetic: Mirror the second half of the paths' shocks off the first
+        reuse_shock_buffer: Draw into this thread's shared shock buffer
         
     Returns:
         Array of shape (num_paths, horizon_days + 1) with price paths
     """
-    if seed is not None:
-        np.random.seed(seed)
+    if rng is None:
+        rng = make_rng(seed)
     
     # Generate random normal increments
-    random_increments = np.random.standard_normal((num_paths, horizon_days))
+    shape = (num_paths, horizon_days)
+    out = shock_buffers.get(shape, dtype) if reuse_shock_buffer else None
+    random_increments = _draw_shocks(rng, shape, dtype, antithetic, out=out)
     
-    # Calculate log returns
-    # S(t+dt) = S(t) * exp((mu - 0.5*sigma^2)*dt + sigma*sqrt(dt)*Z)
-    drift = (mu - 0.5 * sigma ** 2) * dt
-    diffusion = sigma * np.sqrt(dt)
+    if _kernels.NUMBA_AVAILABLE and np.dtype(dtype) in _KERNEL_DTYPES:
+        drift = (mu - 0.5 * sigma ** 2) * dt
+        paths = np.empty((num_paths, horizon_days + 1), dtype=dtype)
+        _kernels.gbm_paths(random_increments, drift, sigma * np.sqrt(dt), float(initial_price), paths)
+        return paths
     
-    log_returns = drift + diffusion * random_increments
+    log_returns = _btc_log_returns(random_increments, mu=mu, sigma=sigma, dt=dt)
     
-    # Initialize price paths
-    paths = np.zeros((num_paths, horizon_days + 1))
-    paths[:, 0] = initial_price
+    return _paths_from_log_returns(log_returns, initial_price)
+
+
+def simulate_btc_final_prices(
+    initial_price: float,
+    horizon_days: int,
+    num_paths: int,
+    mu: float = 0.20,
+    sigma: float = 0.80,
+    dt: float = 1/252,
+    seed: Optional[int] = None,
+    rng: Optional[np.random.Generator] = None,
+    antithetic: bool = False
+) -> np.ndarray:
+    """
+    Simulate only the terminal BTC prices of the GBM model, in closed form.
+    
+    The sum of horizon_days independent N(0, 1) shocks is N(0, horizon_days),
+    so each path needs a single draw and no path matrix is built:
+    S_T = S_0 * exp((mu - 0.5*sigma^2)*dt*h + sigma*sqrt(dt*h)*W).
+    
+    Args:
+        initial_price: Starting BTC price
+        horizon_days: Number of days to simulate
+        num_paths: Number of simulation paths
+        mu: Annual drift (expected return)
+        sigma: Annual volatility
+        dt: Time step
+        seed: Random seed (ignored when rng is given)
+        rng: Generator to draw from; built from seed when omitted
+        antithetic: Mirror the second half of the paths' shocks off the first
+        
+    Returns:
+        Array of shape (num_paths,) with final prices
+    """
+    if rng is None:
+        rng = make_rng(seed)
+    
+    log_total = _draw_shocks(rng, (num_paths,), antithetic=antithetic)
+    log_total *= sigma * np.sqrt(dt * horizon_days)
+    log_total += (mu - 0.5 * sigma ** 2) * dt * horizon_days
     
-    # Build paths from log returns
-    paths[:, 1:] = initial_price * np.exp(np.cumsum(log_returns, axis=1))
+    return initial_price * np.exp(log_total)
+
+
+def _btc_log_returns(
+    random_increments: np.ndarray,
+    mu: float,
+    sigma: float,
+    dt: float
+) -> np.ndarray:
+    """Turn a (num_paths, horizon_days) block of N(0, 1) draws into GBM log returns."""
+    # S(t+dt) = S(t) * exp((mu - 0.5*sigma^2)*dt + sigma*sqrt(dt)*Z),
+    # with the scalars cast so the result keeps the shocks' dtype
+    dtype = random_increments.dtype.type
+    drift = dtype((mu - 0.5 * sigma ** 2) * dt)
+    diffusion = dtype(sigma * np.sqrt(dt))
+    
+    # One output array, scaled and shifted in place
+    log_returns = np.multiply(random_increments, diffusion)
+    log_returns += drift
+    return log_returns
+
+
+def _paths_from_log_returns(log_returns: np.ndarray, initial_price: float) -> np.ndarray:
+    """Build (num_paths, horizon_days + 1) price paths from per-step log returns."""
+    num_paths, horizon_days = log_returns.shape
+    
+    paths = np.empty((num_paths, horizon_days + 1), dtype=log_returns.dtype)
+    paths[:, 0] = initial_price
+    np.cumsum(log_returns, axis=1, out=paths[:, 1:])
+    np.exp(paths[:, 1:], out=paths[:, 1:])
+    paths[:, 1:] *= initial_price
     
     return paths
 
@@ -83,7 +255,11 @@ def simulate_joint_btc_mstr_paths(
     alpha: float = 0.0,
     residual_sigma: float = 0.30,
     dt: float = 1/252,
-    seed: Optional[int] = None
+    seed: Optional[int] = None,
+    return_terminals_only: bool = False,
+    dtype=np.float64,
+    antithetic: bool = False,
+    reuse_shock_buffer: bool = False
 ) -> SimulationPaths:
     """
     Simulate joint BTC and MSTR paths using beta model.
@@ -105,40 +281,85 @@ def simulate_joint_btc_mstr_paths(
         residual_sigma: Residual volatility of MSTR not explained by BTC
         dt: Time step
         seed: Random seed
+        return_terminals_only: Keep only the final prices; the paths then
+            have shape (num_paths, 1) so ``paths[:, -1]`` still works
+        dtype: Float dtype of the shocks and paths (np.float32 halves memory)
+        antithetic: Mirror the second half of the paths' shocks off the first
+        reuse_shock_buffer: Draw into this thread's shared shock buffer
+            (ignored for terminals-only runs, which draw in small chunks)
         
     Returns:
         SimulationPaths with both BTC and MSTR paths
     """
-    if seed is not None:
-        np.random.seed(seed)
+    if return_terminals_only:
+        btc_final, mstr_final = replay_joint_final_prices(
+            initial_btc_price=initial_btc_price,
+            initial_mstr_price=initial_mstr_price,
+            horizon_days=horizon_days,
+            num_paths=num_paths,
+            btc_mu=btc_mu,
+            btc_sigma=btc_sigma,
+            beta=beta,
+            alpha=alpha,
+            residual_sigma=residual_sigma,
+            dt=dt,
+            seed=seed,
+            dtype=dtype,
+            antithetic=antithetic
+        )
+        return SimulationPaths(
+            btc_paths=btc_final[:, np.newaxis],
+            mstr_paths=mstr_final[:, np.newaxis],
+            initial_btc_price=initial_btc_price,
+            initial_mstr_price=initial_mstr_price,
+            num_paths=num_paths,
+            horizon_days=horizon_days
+        )
     
-    # Simulate BTC paths
-    btc_paths = simulate_btc_paths(
-        initial_price=initial_btc_price,
-        horizon_days=horizon_days,
-        num_paths=num_paths,
-        mu=btc_mu,
-        sigma=btc_sigma,
-        dt=dt,
-        seed=seed
-    )
+    dtype = np.dtype(dtype).type
+    
+    # One contiguous draw: [..., 0] drives BTC, [..., 1] is the MSTR residual
+    shape = (num_paths, horizon_days, 2)
+    out = shock_buffers.get(shape, dtype) if reuse_shock_buffer else None
+    shocks = _draw_shocks(make_rng(seed), shape, dtype, antithetic, out=out)
     
-    # Calculate BTC returns from paths
-    btc_returns = np.diff(np.log(btc_paths), axis=1)
+    if _kernels.NUMBA_AVAILABLE and dtype in _KERNEL_DTYPES:
+        # Fused single pass per path; no intermediate return arrays
+        btc_paths = np.empty((num_paths, horizon_days + 1), dtype=dtype)
+        mstr_paths = np.empty((num_paths, horizon_days + 1), dtype=dtype)
+        _kernels.joint_gbm(
+            shocks[:, :, 0], shocks[:, :, 1],
+            (btc_mu - 0.5 * btc_sigma ** 2) * dt, btc_sigma * np.sqrt(dt),
+            alpha * dt, float(beta), residual_sigma * np.sqrt(dt),
+            float(initial_btc_price), float(initial_mstr_price),
+            btc_paths, mstr_paths
+        )
+        return SimulationPaths(
+            btc_paths=btc_paths,
+            mstr_paths=mstr_paths,
+            initial_btc_price=initial_btc_price,
+            initial_mstr_price=initial_mstr_price,
+            num_paths=num_paths,
+            horizon_days=horizon_days
+        )
     
-    # Generate residual (idiosyncratic) noise for MSTR
-    np.random.seed(seed + 1 if seed else None)
-    residual_noise = np.random.standard_normal((num_paths, horizon_days))
-    residual_noise = residual_noise * residual_sigma * np.sqrt(dt)
+    # Simulate BTC log returns; the MSTR model reuses them directly
+    btc_returns = _btc_log_returns(shocks[:, :, 0], mu=btc_mu, sigma=btc_sigma, dt=dt)
     
-    # Calculate MSTR returns using beta model
+    # Generate residual (idiosyncratic) noise for MSTR, in the scratch
+    # shock block itself
+    residual_noise = shocks[:, :, 1]
+    residual_noise *= dtype(residual_sigma * np.sqrt(dt))
+    
+    # Calculate MSTR returns using beta model, accumulating into one array
     # r_MSTR = alpha*dt + beta * r_BTC + epsilon
-    mstr_returns = alpha * dt + beta * btc_returns + residual_noise
+    mstr_returns = np.multiply(btc_returns, dtype(beta))
+    mstr_returns += dtype(alpha * dt)
+    mstr_returns += residual_noise
     
-    # Build MSTR price paths from returns
-    mstr_paths = np.zeros((num_paths, horizon_days + 1))
-    mstr_paths[:, 0] = initial_mstr_price
-    mstr_paths[:, 1:] = initial_mstr_price * np.exp(np.cumsum(mstr_returns, axis=1))
+    # Build both price paths from their returns
+    btc_paths = _paths_from_log_returns(btc_returns, initial_btc_price)
+    mstr_paths = _paths_from_log_returns(mstr_returns, initial_mstr_price)
     
     return SimulationPaths(
         btc_paths=btc_paths,
@@ -150,6 +371,141 @@ def simulate_joint_btc_mstr_paths(
     )
 
 
+def replay_joint_final_prices(
+    initial_btc_price: float,
+    initial_mstr_price: float,
+    horizon_days: int,
+    num_paths: int,
+    btc_mu: float = 0.20,
+    btc_sigma: float = 0.80,
+    beta: float = 1.5,
+    alpha: float = 0.0,
+    residual_sigma: float = 0.30,
+    dt: float = 1/252,
+    seed: Optional[int] = None,
+    dtype=np.float64,
+    antithetic: bool = False
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Reproduce the terminal prices simulate_joint_btc_mstr_paths would give.
+    
+    Draws the same random stream as the full-path simulation, path for
+    path, but accumulates log returns over blocks of paths instead of
+    building the price paths, so memory stays O(num_paths). When only the
+    distribution matters, simulate_joint_final_prices is much cheaper.
+    
+    Args:
+        initial_btc_price: Starting BTC price
+        initial_mstr_price: Starting MSTR price
+        horizon_days: Number of days to simulate
+        num_paths: Number of simulation paths
+        btc_mu: BTC annual drift
+        btc_sigma: BTC annual volatility
+        beta: MSTR beta vs BTC
+        alpha: MSTR alpha (excess return over beta*BTC)
+        residual_sigma: Residual volatility of MSTR not explained by BTC
+        dt: Time step
+        seed: Random seed
+        dtype: Float dtype of the shocks; match the full-path call to reproduce it
+        antithetic: Mirror the second half of the paths' shocks off the first
+        
+    Returns:
+        Tuple of (btc_final, mstr_final) arrays of shape (num_paths,)
+    """
+    rng = make_rng(seed)
+    
+    drift = (btc_mu - 0.5 * btc_sigma ** 2) * dt
+    diffusion = btc_sigma * np.sqrt(dt)
+    residual_scale = residual_sigma * np.sqrt(dt)
+    
+    btc_log_total = np.empty(num_paths)
+    residual_total = np.empty(num_paths)
+    
+    # Draw whole rows per block so the streams match the full-path version.
+    # Antithetic runs draw only the first half; each mirrored path's shock
+    # sums are the negatives of its partner's
+    drawn = (num_paths + 1) // 2 if antithetic else num_paths
+    chunk = max(1, TERMINAL_CHUNK_ELEMENTS // max(2 * horizon_days, 1))
+    chunk_buffer = np.empty((min(chunk, drawn), horizon_days, 2), dtype=dtype)
+    for start in range(0, drawn, chunk):
+        stop = min(start + chunk, drawn)
+        shocks = rng.standard_normal(
+            (stop - start, horizon_days, 2), dtype=dtype, out=chunk_buffer[:stop - start]
+        )
+        btc_shock_sum = shocks[:, :, 0].sum(axis=1)
+        residual_shock_sum = shocks[:, :, 1].sum(axis=1)
+        btc_log_total[start:stop] = drift * horizon_days + diffusion * btc_shock_sum
+        residual_total[start:stop] = residual_scale * residual_shock_sum
+        if antithetic:
+            mirror_stop = min(drawn + stop, num_paths)
+            mirrored = mirror_stop - (drawn + start)
+            if mirrored > 0:
+                btc_log_total[drawn + start:mirror_stop] = (
+                    drift * horizon_days - diffusion * btc_shock_sum[:mirrored]
+                )
+                residual_total[drawn + start:mirror_stop] = (
+                    -residual_scale * residual_shock_sum[:mirrored]
+                )
+    
+    btc_final = initial_btc_price * np.exp(btc_log_total)
+    mstr_final = initial_mstr_price * np.exp(
+        alpha * dt * horizon_days + beta * btc_log_total + residual_total
+    )
+    
+    return btc_final, mstr_final
+
+
+def simulate_joint_final_prices(
+    initial_btc_price: float,
+    initial_mstr_price: float,
+    horizon_days: int,
+    num_paths: int,
+    btc_mu: float = 0.20,
+    btc_sigma: float = 0.80,
+    beta: float = 1.5,
+    alpha: float = 0.0,
+    residual_sigma: float = 0.30,
+    dt: float = 1/252,
+    seed: Optional[int] = None,
+    antithetic: bool = False
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Simulate terminal BTC and MSTR prices of the joint beta model in closed form.
+    
+    Both summed log returns are normal, so two draws per path replace the
+    (num_paths, horizon_days) shock matrices. The distribution matches
+    simulate_joint_btc_mstr_paths, but not its individual seeded draws; use
+    replay_joint_final_prices when those must agree.
+    
+    Args:
+        initial_btc_price: Starting BTC price
+        initial_mstr_price: Starting MSTR price
+        horizon_days: Number of days to simulate
+        num_paths: Number of simulation paths
+        btc_mu: BTC annual drift
+        btc_sigma: BTC annual volatility
+        beta: MSTR beta vs BTC
+        alpha: MSTR alpha (excess return over beta*BTC)
+        residual_sigma: Residual volatility of MSTR not explained by BTC
+        dt: Time step
+        seed: Random seed
+        antithetic: Mirror the second half of the paths' shocks off the first
+        
+    Returns:
+        Tuple of (btc_final, mstr_final) arrays of shape (num_paths,)
+    """
+    horizon = dt * horizon_days
+    btc_shocks, residual_shocks = _draw_shocks(make_rng(seed), (num_paths, 2), antithetic=antithetic).T
+    
+    btc_log_total = (btc_mu - 0.5 * btc_sigma ** 2) * horizon + btc_sigma * np.sqrt(horizon) * btc_shocks
+    residual_total = residual_sigma * np.sqrt(horizon) * residual_shocks
+    
+    btc_final = initial_btc_price * np.exp(btc_log_total)
+    mstr_final = initial_mstr_price * np.exp(alpha * horizon + beta * btc_log_total + residual_total)
+    
+    return btc_final, mstr_final
+
+
 def estimate_beta_parameters(
     btc_returns: np.ndarray,
     mstr_returns: np.ndarray
@@ -179,15 +535,23 @@ def estimate_beta_parameters(
         # Not enough data, return defaults
         return DEFAULT_ALPHA, DEFAULT_BETA, DEFAULT_RESIDUAL_SIGMA
     
-    # Linear regression: mstr = alpha + beta * btc + epsilon
-    slope, intercept, r_value, p_value, std_err = stats.linregress(btc_returns, mstr_returns)
+    # Least squares in closed form: beta = cov(x, y) / var(x); the residual
+    # variance is var(y) - beta^2 * var(x), so no residual array is built
+    btc_mean = btc_returns.mean()
+    mstr_mean = mstr_returns.mean()
+    btc_dev = btc_returns - btc_mean
+    mstr_dev = mstr_returns - mstr_mean
+    n = btc_returns.size
     
-    beta = slope
-    alpha = intercept
+    var_btc = btc_dev @ btc_dev / n
+    if var_btc == 0:
+        # Constant BTC returns carry no information about beta
+        return DEFAULT_ALPHA, DEFAULT_BETA, DEFAULT_RESIDUAL_SIGMA
+    cov = btc_dev @ mstr_dev / n
+    var_mstr = mstr_dev @ mstr_dev / n
     
-    # Calculate residual standard deviation
-    predicted = alpha + beta * btc_returns
-    residuals = mstr_returns - predicted
-    residual_sigma = np.std(residuals)
+    beta = cov / var_btc
+    alpha = mstr_mean - beta * btc_mean
+    residual_sigma = np.sqrt(max(var_mstr - beta * cov, 0.0))
     
     return alpha, beta, residual_sigma
@@ -1,11 +1,21 @@
 """Risk metrics: VaR, CVaR, and simulation risk analysis."""
 
 from dataclasses import dataclass
-from typing import Optional, Dict, Any, Tuple
+from typing import Optional, Dict, Any, List, Tuple
 import numpy as np
 
+from src.simulation import _kernels
 
-@dataclass
+
+NUMBA_VAR_MIN_PATHS = 50_000  # compute_var_cvar only: below this, np.partition beats the histogram kernel
+
+# Percentiles reported in RiskMetrics.percentiles
+RISK_PERCENTILES = (1, 5, 10, 25, 50, 75, 90, 95, 99)
+_PERCENTILE_POSITION = {q: i for i, q in enumerate(RISK_PERCENTILES)}
+_PERCENTILE_KEYS = tuple(str(q) for q in RISK_PERCENTILES)
+
+
+@dataclass(frozen=True, slots=True)
 class RiskMetrics:
     """Risk metrics from simulation results."""
     var_95: float  # Value at Risk at 95% confidence
@@ -15,7 +25,26 @@ class RiskMetrics:
     mean_return: float
     median_return: float
     std_return: float
-    percentiles: Dict[str, float]  # Various percentile returns
+    percentiles: np.ndarray  # Percentile returns, one per PERCENTILE_LEVELS entry
+    
+    PERCENTILE_LEVELS = RISK_PERCENTILES
+    
+    def percentile(self, q: int) -> float:
+        """Return the q-th percentile return (q must be in PERCENTILE_LEVELS)."""
+        return float(self.percentiles[_PERCENTILE_POSITION[q]])
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the metrics as a plain dict, with percentiles keyed by level."""
+        return {
+            "var_95": self.var_95,
+            "cvar_95": self.cvar_95,
+            "var_99": self.var_99,
+            "cvar_99": self.cvar_99,
+            "mean_return": self.mean_return,
+            "median_return": self.median_return,
+            "std_return": self.std_return,
+            "percentiles": dict(zip(_PERCENTILE_KEYS, self.percentiles.tolist()))
+        }
 
 
 def compute_var_cvar(
@@ -26,8 +55,17 @@ def compute_var_cvar(
     """
     Compute Value at Risk (VaR) and Conditional VaR (CVaR).
     
-    VaR(alpha) = -percentile(returns, 1-alpha)
-    CVaR(alpha) = -E[returns | returns <= -VaR(alpha)]
+    VaR(alpha) = -(k-th worst return), k = round((1-alpha) * N)
+    CVaR(alpha) = -mean(k worst returns)
+    
+    compute_risk_metrics reports var/cvar with the same definition.
+    
+    Only the k worst returns are needed, so a single O(N) partition is
+    enough; no full sort or boolean tail mask. From NUMBA_VAR_MIN_PATHS
+    paths the parallel histogram kernel is used instead. This serves
+    standalone VaR/CVaR queries only: compute_risk_metrics(_batched), used
+    by the API and CLI, sorts the returns for its percentiles anyway and
+    reads VaR/CVaR from that sort.
     
     Args:
         final_prices: Array of final prices from simulation paths
@@ -37,21 +75,20 @@ def compute_var_cvar(
     Returns:
         Tuple of (VaR, CVaR) as returns (negative values indicate losses)
     """
-    # Calculate returns
-    returns = (final_prices - initial_price) / initial_price
+    # Calculate returns (in float64, whatever precision the paths used)
+    returns = (np.asarray(final_prices, dtype=np.float64) - initial_price) / initial_price
     
-    # VaR: (1-alpha) percentile of the return distribution
-    # Negative sign convention: VaR is reported as a positive number for losses
-    var = -np.percentile(returns, (1 - alpha) * 100)
+    if _kernels.NUMBA_AVAILABLE and returns.size >= NUMBA_VAR_MIN_PATHS:
+        # Parallel histogram select: no sort and no partitioned copy
+        return _kernels.var_cvar(returns.ravel(), alpha)
     
-    # CVaR: Average of returns worse than VaR
-    threshold = -var
-    worse_returns = returns[returns <= threshold]
+    # Move the k worst returns to the front; the k-th worst is in place
+    k = max(1, int(round((1 - alpha) * returns.size)))
+    partitioned = np.partition(returns, k - 1)
     
-    if len(worse_returns) > 0:
-        cvar = -np.mean(worse_returns)
-    else:
-        cvar = var
+    # Negative sign convention: VaR is reported as a positive number for losses
+    var = -partitioned[k - 1]
+    cvar = -partitioned[:k].mean()
     
     return var, cvar
 
@@ -63,6 +100,10 @@ def compute_risk_metrics(
     """
     Compute comprehensive risk metrics from simulation results.
     
+    var_95/cvar_95 and var_99/cvar_99 follow compute_var_cvar's definition
+    (k-th worst return and mean of the k worst), so they can differ slightly
+    from the interpolated 5th and 1st entries of percentiles.
+    
     Args:
         final_prices: Array of final prices from simulation
         initial_price: Initial price
@@ -70,41 +111,118 @@ def compute_risk_metrics(
     Returns:
         RiskMetrics dataclass
     """
-    # Calculate returns
-    returns = (final_prices - initial_price) / initial_price
-    
-    # VaR and CVaR at different confidence levels
-    var_95, cvar_95 = compute_var_cvar(final_prices, initial_price, alpha=0.95)
-    var_99, cvar_99 = compute_var_cvar(final_prices, initial_price, alpha=0.99)
-    
-    # Basic statistics
-    mean_return = np.mean(returns)
-    median_return = np.median(returns)
-    std_return = np.std(returns)
-    
-    # Percentiles
-    percentiles = {
-        "1": np.percentile(returns, 1),
-        "5": np.percentile(returns, 5),
-        "10": np.percentile(returns, 10),
-        "25": np.percentile(returns, 25),
-        "50": np.percentile(returns, 50),
-        "75": np.percentile(returns, 75),
-        "90": np.percentile(returns, 90),
-        "95": np.percentile(returns, 95),
-        "99": np.percentile(returns, 99)
-    }
-    
-    return RiskMetrics(
-        var_95=var_95,
-        cvar_95=cvar_95,
-        var_99=var_99,
-        cvar_99=cvar_99,
-        mean_return=mean_return,
-        median_return=median_return,
-        std_return=std_return,
-        percentiles=percentiles
-    )
+    return compute_risk_metrics_batched(
+        np.asarray(final_prices)[np.newaxis, :], [initial_price]
+    )[0]
+
+
+def compute_risk_metrics_batched(
+    final_prices: np.ndarray,
+    initial_prices
+) -> List[RiskMetrics]:
+    """
+    Compute risk metrics for several assets with a single sort per asset.
+    
+    Args:
+        final_prices: Array of shape (num_assets, num_paths) of final prices
+        initial_prices: Initial price per asset (length num_assets)
+        
+    Returns:
+        List of RiskMetrics, one per row of final_prices
+    """
+    initial = np.asarray(initial_prices, dtype=np.float64)[:, np.newaxis]
+    
+    # Calculate returns (in float64, whatever precision the paths used)
+    returns = (np.asarray(final_prices, dtype=np.float64) - initial) / initial
+    
+    # Sort each asset's returns once; every other statistic is read from
+    # the sorted rows
+    return _risk_from_sorted(np.sort(returns, axis=1))
+
+
+def _risk_from_sorted(sorted_returns: np.ndarray) -> List[RiskMetrics]:
+    """
+    Build RiskMetrics from returns that are already computed and sorted.
+    
+    Args:
+        sorted_returns: Array of shape (num_assets, num_paths), sorted along axis 1
+        
+    Returns:
+        List of RiskMetrics, one per row of sorted_returns
+    """
+    # Every percentile (median included) is an index lookup into the
+    # sorted rows
+    pct_values = percentiles_of_sorted(sorted_returns, RISK_PERCENTILES)
+    pct_index = _PERCENTILE_POSITION
+    
+    # Prefix sums of the sorted rows give the mean and every tail mean
+    # as O(1) lookups; one more reduction (sum of squares) gives the std
+    n = sorted_returns.shape[1]
+    prefix_sums = np.cumsum(sorted_returns, axis=1)
+    mean_returns = prefix_sums[:, -1] / n
+    mean_squares = np.einsum("ij,ij->i", sorted_returns, sorted_returns) / n
+    std_returns = np.sqrt(np.maximum(mean_squares - mean_returns ** 2, 0.0))
+    
+    metrics = []
+    for row in range(sorted_returns.shape[0]):
+        row_returns = sorted_returns[row]
+        row_sums = prefix_sums[row]
+        row_pcts = pct_values[:, row]
+        
+        # Same VaR/CVaR definition as compute_var_cvar, read off the sort
+        var_95, cvar_95 = _var_cvar_of_sorted(row_returns, row_sums, 0.95)
+        var_99, cvar_99 = _var_cvar_of_sorted(row_returns, row_sums, 0.99)
+        
+        metrics.append(RiskMetrics(
+            var_95=var_95,
+            cvar_95=cvar_95,
+            var_99=var_99,
+            cvar_99=cvar_99,
+            mean_return=mean_returns[row],
+            median_return=row_pcts[pct_index[50]],
+            std_return=std_returns[row],
+            percentiles=row_pcts
+        ))
+    
+    return metrics
+
+
+def percentiles_of_sorted(sorted_rows: np.ndarray, percentiles) -> np.ndarray:
+    """
+    Linear-interpolated percentiles of rows that are already sorted.
+    
+    Matches np.percentile's default method exactly, without re-partitioning.
+    
+    Args:
+        sorted_rows: Array of shape (num_assets, num_paths), sorted along axis 1
+        percentiles: Percentiles to compute, in [0, 100]
+        
+    Returns:
+        Array of shape (len(percentiles), num_assets)
+    """
+    n = sorted_rows.shape[1]
+    virtual = (n - 1) * (np.asarray(percentiles, dtype=np.float64) / 100)
+    lower = np.floor(virtual).astype(np.intp)
+    upper = np.minimum(lower + 1, n - 1)
+    gamma = virtual - lower
+    
+    below = sorted_rows[:, lower]
+    above = sorted_rows[:, upper]
+    diff = above - below
+    
+    # Interpolate from the nearer neighbour, as NumPy does
+    values = np.where(gamma >= 0.5, above - diff * (1 - gamma), below + diff * gamma)
+    return values.T
+
+
+def _var_cvar_of_sorted(
+    sorted_returns: np.ndarray,
+    prefix_sums: np.ndarray,
+    alpha: float
+) -> Tuple[float, float]:
+    """VaR/CVaR as in compute_var_cvar, from sorted returns and their prefix sums."""
+    k = max(1, int(round((1 - alpha) * sorted_returns.size)))
+    return -sorted_returns[k - 1], -prefix_sums[k - 1] / k
 
 
 def compute_portfolio_risk(
@@ -127,11 +245,9 @@ def compute_portfolio_risk(
     Returns:
         RiskMetrics for the portfolio value
     """
-    # Calculate portfolio values
-    initial_value = mstr_shares * mstr_initial_price
-    final_values = mstr_shares * mstr_final_prices
-    
-    return compute_risk_metrics(final_values, initial_value)
+    # The position's return is (shares*final - shares*initial) / (shares*initial),
+    # so the share count cancels and the MSTR returns are used directly
+    return compute_risk_metrics(mstr_final_prices, mstr_initial_price)
 
 
 def create_risk_summary(
@@ -150,41 +266,12 @@ def create_risk_summary(
     Returns:
         Dictionary with structured risk summary
     """
-    summary = {
-        "btc": {
-            "var_95": btc_risk.var_95,
-            "cvar_95": btc_risk.cvar_95,
-            "var_99": btc_risk.var_99,
-            "cvar_99": btc_risk.cvar_99,
-            "mean_return": btc_risk.mean_return,
-            "median_return": btc_risk.median_return,
-            "std_return": btc_risk.std_return,
-            "percentiles": btc_risk.percentiles
-        }
-    }
+    summary = {"btc": btc_risk.to_dict()}
     
     if mstr_risk:
-        summary["mstr"] = {
-            "var_95": mstr_risk.var_95,
-            "cvar_95": mstr_risk.cvar_95,
-            "var_99": mstr_risk.var_99,
-            "cvar_99": mstr_risk.cvar_99,
-            "mean_return": mstr_risk.mean_return,
-            "median_return": mstr_risk.median_return,
-            "std_return": mstr_risk.std_return,
-            "percentiles": mstr_risk.percentiles
-        }
+        summary["mstr"] = mstr_risk.to_dict()
     
     if portfolio_risk:
-        summary["portfolio"] = {
-            "var_95": portfolio_risk.var_95,
-            "cvar_95": portfolio_risk.cvar_95,
-            "var_99": portfolio_risk.var_99,
-            "cvar_99": portfolio_risk.cvar_99,
-            "mean_return": portfolio_risk.mean_return,
-            "median_return": portfolio_risk.median_return,
-            "std_return": portfolio_risk.std_return,
-            "percentiles": portfolio_risk.percentiles
-        }
+        summary["portfolio"] = portfolio_risk.to_dict()
     
     return summary
@@ -2,10 +2,10 @@
 
 from dataclasses import dataclass
 from typing import Dict
-import json
+import orjson
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class ScenarioConfig:
     """Configuration for a simulation scenario."""
     name: str
@@ -91,22 +91,13 @@ def get_scenario(name: str) -> ScenarioConfig:
 
 def scenario_to_json(scenario: ScenarioConfig) -> str:
     """Convert scenario config to JSON string."""
-    return json.dumps({
-        "name": scenario.name,
-        "description": scenario.description,
-        "btc_mu": scenario.btc_mu,
-        "btc_sigma": scenario.btc_sigma,
-        "mstr_beta": scenario.mstr_beta,
-        "mstr_alpha": scenario.mstr_alpha,
-        "mstr_residual_sigma": scenario.mstr_residual_sigma,
-        "horizon_days": scenario.horizon_days,
-        "num_paths": scenario.num_paths
-    })
+    # orjson serialises dataclasses (slotted ones included) field by field
+    return orjson.dumps(scenario).decode()
 
 
 def scenario_from_json(json_str: str) -> ScenarioConfig:
     """Create scenario config from JSON string."""
-    data = json.loads(json_str)
+    data = orjson.loads(json_str)
     return ScenarioConfig(**data)
 
 
@@ -4,6 +4,10 @@ import numpy as np
 from typing import Dict, List
 from dataclasses import dataclass
 
+from src.simulation.risk import percentiles_of_sorted
+
+DRAW_CHUNK_ELEMENTS = 1_000_000  # float64 draws held at once when filling a narrower dtype
+
 
 @dataclass
 class SimulationResults:
@@ -47,7 +51,8 @@ class MonteCarloSimulator:
         initial_price: float,
         days: int,
         scenarios: int = 1000,
-        return_paths: bool = False
+        return_paths: bool = False,
+        dtype=np.float64
     ) -> SimulationResults:
         """
         Run Monte Carlo simulation.
@@ -57,59 +62,82 @@ class MonteCarloSimulator:
             days: Number of days to simulate
             scenarios: Number of simulation scenarios
             return_paths: Whether to return sample price paths
+            dtype: Float dtype of the path buffers (np.float32 halves memory)
         
         Returns:
             SimulationResults with statistics
         """
-        # Convert annual parameters to daily
+        # GBM: S(t+1) = S(t) * exp((mu - 0.5*sigma^2)*dt + sigma*sqrt(dt)*Z),
+        # with both daily terms reduced to scalars up front
         dt = 1 / 365.0  # One day
-        daily_drift = self.annual_drift * dt
-        daily_volatility = self.annual_volatility * np.sqrt(dt)
+        mu_term = (self.annual_drift - 0.5 * self.annual_volatility**2) * dt
+        sig_term = self.annual_volatility * np.sqrt(dt)
         
-        # Generate random shocks
-        random_shocks = np.random.normal(0, 1, (scenarios, days))
+        # Draw the shocks straight into the log-return buffer. The legacy
+        # global generator only draws float64, so a narrower dtype is filled
+        # a bounded block of rows at a time to keep peak memory near its size
+        if np.dtype(dtype) == np.float64:
+            log_returns = np.random.standard_normal((scenarios, days))
+        else:
+            log_returns = np.empty((scenarios, days), dtype=dtype)
+            chunk = max(1, DRAW_CHUNK_ELEMENTS // max(days, 1))
+            for start in range(0, scenarios, chunk):
+                rows = log_returns[start:start + chunk]
+                rows[...] = np.random.standard_normal(rows.shape)
         
-        # Simulate price paths using geometric Brownian motion
-        price_paths = np.zeros((scenarios, days + 1))
-        price_paths[:, 0] = initial_price
+        # Turn the random shocks into log returns in place
+        log_returns *= sig_term
+        log_returns += mu_term
         
-        for day in range(1, days + 1):
-            # GBM: S(t+1) = S(t) * exp((mu - 0.5*sigma^2)*dt + sigma*dW)
-            price_paths[:, day] = price_paths[:, day - 1] * np.exp(
-                (daily_drift - 0.5 * daily_volatility**2) * dt +
-                daily_volatility * random_shocks[:, day - 1]
-            )
+        # Final prices only need each path's total log return (summed in
+        # float64); no (scenarios, days + 1) price matrix is built
+        final_prices = initial_price * np.exp(log_returns.sum(axis=1, dtype=np.float64))
         
-        # Extract final prices
-        final_prices = price_paths[:, -1]
+        # Calculate statistics from one sorted copy: min and max are its ends,
+        # the median and percentiles direct index lookups (interpolated as
+        # np.percentile does), mean and std two reductions
+        sorted_prices = np.sort(final_prices)
+        min_price = sorted_prices[0]
+        max_price = sorted_prices[-1]
+        p5, p25, median_price, p75, p95 = percentiles_of_sorted(
+            sorted_prices[np.newaxis], [5, 25, 50, 75, 95]
+        )[:, 0]
+        percentiles = (p5, p25, p75, p95)
         
-        # Calculate statistics
-        mean_price = np.mean(final_prices)
-        median_price = np.median(final_prices)
-        std_price = np.std(final_prices)
-        min_price = np.min(final_prices)
-        max_price = np.max(final_prices)
+        mean_price = sorted_prices.sum() / scenarios
+        std_price = np.sqrt(max(sorted_prices @ sorted_prices / scenarios - mean_price ** 2, 0.0))
         
-        percentiles = np.percentile(final_prices, [5, 25, 75, 95])
-        
-        # Sample paths for visualization (return first 10)
+        # Sample paths for visualization (first 10), built from their own rows
         sample_paths = []
         if return_paths:
-            sample_paths = price_paths[:min(10, scenarios)].tolist()
+            sample = np.empty((min(10, scenarios), days + 1))
+            sample[:, 0] = initial_price
+            np.cumsum(log_returns[:len(sample)], axis=1, out=sample[:, 1:])
+            np.exp(sample[:, 1:], out=sample[:, 1:])
+            sample[:, 1:] *= initial_price
+            sample_paths = sample.tolist()
+        
+        # Convert all nine statistics to Python floats in one tolist() call
+        (
+            mean_price, median_price, std_price, min_price, max_price,
+            p5, p25, p75, p95
+        ) = np.array([
+            mean_price, median_price, std_price, min_price, max_price, *percentiles
+        ]).tolist()
         
         return SimulationResults(
             initial_price=initial_price,
             scenarios=scenarios,
             days=days,
-            mean_price=float(mean_price),
-            median_price=float(median_price),
-            std_price=float(std_price),
-            min_price=float(min_price),
-            max_price=float(max_price),
-            percentile_5=float(percentiles[0]),
-            percentile_25=float(percentiles[1]),
-            percentile_75=float(percentiles[2]),
-            percentile_95=float(percentiles[3]),
+            mean_price=mean_price,
+            median_price=median_price,
+            std_price=std_price,
+            min_price=min_price,
+            max_price=max_price,
+            percentile_5=p5,
+            percentile_25=p25,
+            percentile_75=p75,
+            percentile_95=p95,
             price_paths=sample_paths
         )
     
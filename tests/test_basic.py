@@ -65,6 +65,182 @@ def test_joint_simulation():
     assert sim_paths.mstr_paths[0, 0] == 300.0
 
 
+def test_shock_buffer_reused_across_runs():
+    """Test repeated same-shape runs draw into one buffer, and large ones are not kept."""
+    import numpy as np
+    
+    kwargs = dict(initial_price=50000.0, horizon_days=30, num_paths=100, seed=42)
+    buffer = mc_paths.shock_buffers.get((100, 30))
+    buffer.fill(np.nan)
+    reused = mc_paths.simulate_btc_paths(**kwargs, reuse_shock_buffer=True)
+    
+    # The shocks were drawn into the thread's existing buffer
+    assert mc_paths.shock_buffers.get((100, 30)) is buffer
+    assert buffer == pytest.approx(mc_paths.make_rng(42).standard_normal((100, 30)))
+    assert reused == pytest.approx(mc_paths.simulate_btc_paths(**kwargs))
+    
+    buffers = mc_paths.ShockBuffers(max_bytes=1024)
+    small = buffers.get((8, 8))
+    assert buffers.get((8, 8)) is small
+    large = buffers.get((100, 100))
+    assert buffers.get((100, 100)) is not large
+    assert buffers.get((8, 8), np.float64) is small
+
+
+def test_joint_terminal_prices_match_full_paths():
+    """Test terminal-only simulation reproduces the last column of the full paths."""
+    kwargs = dict(
+        initial_btc_price=50000.0,
+        initial_mstr_price=300.0,
+        horizon_days=30,
+        num_paths=100,
+        seed=42
+    )
+    sim_paths = mc_paths.simulate_joint_btc_mstr_paths(**kwargs)
+    btc_final, mstr_final = mc_paths.replay_joint_final_prices(**kwargs)
+    
+    assert btc_final == pytest.approx(sim_paths.btc_paths[:, -1])
+    assert mstr_final == pytest.approx(sim_paths.mstr_paths[:, -1])
+    
+    terminal_paths = mc_paths.simulate_joint_btc_mstr_paths(**kwargs, return_terminals_only=True)
+    assert terminal_paths.btc_paths.shape == (100, 1)
+    assert terminal_paths.mstr_paths[:, -1] == pytest.approx(mstr_final)
+
+
+def test_antithetic_terminal_prices_match_full_paths():
+    """Test antithetic runs mirror shocks and stay reproducible terminal-only."""
+    import numpy as np
+    
+    kwargs = dict(
+        initial_btc_price=50000.0,
+        initial_mstr_price=300.0,
+        horizon_days=30,
+        num_paths=101,
+        seed=42,
+        antithetic=True
+    )
+    sim_paths = mc_paths.simulate_joint_btc_mstr_paths(**kwargs)
+    btc_final, mstr_final = mc_paths.replay_joint_final_prices(**kwargs)
+    
+    assert btc_final == pytest.approx(sim_paths.btc_paths[:, -1])
+    assert mstr_final == pytest.approx(sim_paths.mstr_paths[:, -1])
+    
+    # Mirrored pairs have log returns symmetric about the drift
+    btc_log = np.log(btc_final / 50000.0)
+    drift_total = (0.20 - 0.5 * 0.80 ** 2) / 252 * 30
+    assert btc_log[:50] + btc_log[51:] == pytest.approx(np.full(50, 2 * drift_total))
+
+
+def test_joint_final_prices_match_path_distribution():
+    """Test closed-form terminal prices follow the joint model's log-normal law."""
+    import numpy as np
+    
+    btc_final, mstr_final = mc_paths.simulate_joint_final_prices(
+        initial_btc_price=50000.0,
+        initial_mstr_price=300.0,
+        horizon_days=252,
+        num_paths=100000,
+        seed=42
+    )
+    
+    # One year with the defaults: BTC log return ~ N(0.20 - 0.32, 0.80^2),
+    # MSTR ~ N(1.5 * (0.20 - 0.32), 1.5^2 * 0.80^2 + 0.30^2)
+    assert np.log(btc_final / 50000.0).mean() == pytest.approx(-0.12, abs=0.01)
+    assert np.log(btc_final / 50000.0).std() == pytest.approx(0.80, rel=0.01)
+    assert np.log(mstr_final / 300.0).mean() == pytest.approx(-0.18, abs=0.015)
+    assert np.log(mstr_final / 300.0).std() == pytest.approx(np.hypot(1.2, 0.30), rel=0.01)
+
+
+def test_btc_final_prices_match_gbm_distribution():
+    """Test closed-form BTC terminal prices follow GBM's log-normal law."""
+    import numpy as np
+    
+    btc_final = mc_paths.simulate_btc_final_prices(
+        initial_price=50000.0,
+        horizon_days=126,
+        num_paths=100000,
+        seed=42
+    )
+    
+    # Half a year with the defaults: log return ~ N((0.20 - 0.32) / 2, 0.80^2 / 2)
+    log_returns = np.log(btc_final / 50000.0)
+    assert btc_final.shape == (100000,)
+    assert log_returns.mean() == pytest.approx(-0.06, abs=0.01)
+    assert log_returns.std() == pytest.approx(0.80 * np.sqrt(0.5), rel=0.01)
+    
+    mirrored = mc_paths.simulate_btc_final_prices(50000.0, 126, 10, seed=1, antithetic=True)
+    assert np.log(mirrored[:5] / 50000.0) + np.log(mirrored[5:] / 50000.0) == \
+        pytest.approx(np.full(5, -0.12))
+
+
+def test_joint_gbm_kernel_matches_numpy_paths():
+    """Test the fused joint path kernel reproduces the NumPy beta-model paths."""
+    import numpy as np
+    from src.simulation import _kernels
+    
+    dt = 1 / 252
+    shocks = mc_paths.make_rng(7).standard_normal((20, 10, 2))
+    btc_out = np.empty((20, 11))
+    mstr_out = np.empty((20, 11))
+    _kernels.joint_gbm(
+        shocks[:, :, 0], shocks[:, :, 1],
+        (0.20 - 0.5 * 0.80 ** 2) * dt, 0.80 * np.sqrt(dt),
+        0.0, 1.5, 0.30 * np.sqrt(dt),
+        50000.0, 300.0, btc_out, mstr_out
+    )
+    
+    btc_returns = mc_paths._btc_log_returns(shocks[:, :, 0], mu=0.20, sigma=0.80, dt=dt)
+    mstr_returns = 1.5 * btc_returns + shocks[:, :, 1] * 0.30 * np.sqrt(dt)
+    assert btc_out == pytest.approx(mc_paths._paths_from_log_returns(btc_returns, 50000.0))
+    assert mstr_out == pytest.approx(mc_paths._paths_from_log_returns(mstr_returns, 300.0))
+
+
+def test_fork_after_importing_simulation_exits():
+    """Test a fork-based process pool still exits after importing the kernels."""
+    import multiprocessing
+    import subprocess
+    import sys
+    from pathlib import Path
+    
+    if "fork" not in multiprocessing.get_all_start_methods():
+        pytest.skip("fork start method unavailable")
+    
+    script = (
+        "import multiprocessing\n"
+        "from concurrent.futures import ProcessPoolExecutor\n"
+        "import src.simulation.mc_paths, src.simulation.risk\n"
+        "with ProcessPoolExecutor(2, mp_context=multiprocessing.get_context('fork')) as pool:\n"
+        "    assert list(pool.map(abs, [-1, 2])) == [1, 2]\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script], cwd=Path(__file__).parent.parent, timeout=60
+    )
+    assert result.returncode == 0
+
+
+def test_legacy_simulator_median_matches_gbm(monkeypatch):
+    """Test the legacy simulator's terminal median matches GBM's closed form."""
+    import numpy as np
+    from src.simulator.monte_carlo import MonteCarloSimulator
+    
+    np.random.seed(42)
+    simulator = MonteCarloSimulator(annual_volatility=0.80, annual_drift=0.20)
+    results = simulator.simulate(initial_price=50000.0, days=365, scenarios=20000)
+    
+    # Median of S_T is S_0 * exp((mu - sigma^2 / 2) * T) for T = 1 year
+    assert results.median_price == pytest.approx(50000.0 * np.exp(0.20 - 0.5 * 0.80**2), rel=0.03)
+    
+    # float32 buffers are filled from the same stream, in chunks
+    from src.simulator import monte_carlo
+    np.random.seed(42)
+    full = simulator.simulate(initial_price=50000.0, days=30, scenarios=500)
+    np.random.seed(42)
+    monkeypatch.setattr(monte_carlo, "DRAW_CHUNK_ELEMENTS", 3000)
+    narrow = simulator.simulate(initial_price=50000.0, days=30, scenarios=500, dtype=np.float32)
+    assert narrow.mean_price == pytest.approx(full.mean_price, rel=1e-5)
+    assert narrow.percentile_5 == pytest.approx(full.percentile_5, rel=1e-5)
+
+
 def test_risk_metrics_calculation():
     """Test VaR/CVaR calculation."""
     # Simulate some final prices
@@ -80,6 +256,20 @@ def test_risk_metrics_calculation():
     assert cvar >= var  # CVaR should be worse than or equal to VaR
 
 
+def test_var_cvar_kernel_matches_partition():
+    """Test the histogram VaR/CVaR kernel is exact, ties included."""
+    import numpy as np
+    from src.simulation import _kernels
+    
+    rng = np.random.default_rng(0)
+    for returns in (rng.normal(size=3000), np.round(rng.normal(size=2000), 1)):
+        k = int(round(0.05 * returns.size))
+        worst = np.sort(returns)[:k]
+        var, cvar = _kernels.var_cvar(returns, 0.95)
+        assert var == pytest.approx(-worst[-1])
+        assert cvar == pytest.approx(-worst.mean())
+
+
 def test_risk_metrics_comprehensive():
     """Test comprehensive risk metrics."""
     import numpy as np
@@ -93,7 +283,48 @@ def test_risk_metrics_comprehensive():
     assert hasattr(risk_metrics, 'cvar_95')
     assert hasattr(risk_metrics, 'mean_return')
     assert hasattr(risk_metrics, 'percentiles')
-    assert '50' in risk_metrics.percentiles
+    assert risk_metrics.percentiles.shape == (len(risk.RISK_PERCENTILES),)
+    assert '50' in risk_metrics.to_dict()['percentiles']
+    
+    # Both entry points share one VaR/CVaR definition
+    for alpha in (0.95, 0.99):
+        var, cvar = risk.compute_var_cvar(final_prices, initial_price, alpha=alpha)
+        level = round(100 * alpha)
+        assert getattr(risk_metrics, f"var_{level}") == pytest.approx(var)
+        assert getattr(risk_metrics, f"cvar_{level}") == pytest.approx(cvar)
+
+
+def test_metrics_batch_matches_scalar():
+    """Test vectorized metrics agree with the per-record calculator."""
+    import numpy as np
+    from src.calculator.metrics import MetricsCalculator
+    
+    holdings = np.array([100.0, 250.0, 0.0])
+    avg_cost = np.array([30000.0, 40000.0, 0.0])
+    btc_price = np.array([60000.0, 35000.0, 50000.0])
+    mstr_price = np.array([400.0, 300.0, 200.0])
+    market_cap = np.array([1e7, np.nan, 5e6])
+    
+    batch = MetricsCalculator.calculate_batch(holdings, avg_cost, btc_price, mstr_price, market_cap)
+    
+    for i in range(len(holdings)):
+        cap = None if np.isnan(market_cap[i]) else market_cap[i]
+        scalar = MetricsCalculator.calculate(holdings[i], avg_cost[i], btc_price[i], mstr_price[i], cap)
+        assert batch["unrealized_gain_loss"][i] == pytest.approx(scalar.unrealized_gain_loss)
+        assert batch["unrealized_gain_loss_pct"][i] == pytest.approx(scalar.unrealized_gain_loss_pct)
+        if scalar.nav_ratio is None:
+            assert np.isnan(batch["nav_ratio"][i])
+            assert np.isnan(batch["premium_discount"][i])
+        else:
+            assert batch["nav_ratio"][i] == pytest.approx(scalar.nav_ratio)
+            assert batch["premium_discount"][i] == pytest.approx(scalar.premium_discount)
+    
+    from_shares = MetricsCalculator.calculate_batch(
+        holdings, avg_cost, btc_price, mstr_price, mstr_shares_outstanding=np.array([25000.0, 1e4, 0.0])
+    )
+    assert from_shares["mstr_market_cap"][:2] == pytest.approx([1e7, 3e6])
+    assert from_shares["nav_ratio"][1] == pytest.approx(3e6 / (250.0 * 35000.0))
+    assert np.isnan(from_shares["nav_ratio"][2])
 
 
 def test_nav_calculation_with_sample_data(tmp_path):
@@ -104,5 +335,396 @@ def test_nav_calculation_with_sample_data(tmp_path):
     assert callable(compute_nav_metrics)
 
 
+@pytest.fixture
+def memory_session():
+    """Session bound to a throwaway in-memory database."""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from src.database.models import Base
+    
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+
+@pytest.fixture
+def memory_ops(memory_session):
+    """DatabaseOperations working on the memory_session database."""
+    from src.database.operations import DatabaseOperations
+    
+    ops = DatabaseOperations()
+    ops.session.close()
+    ops.session = memory_session
+    return ops
+
+
+def test_nav_metrics_from_sample_data(memory_session):
+    """Test NAV metrics are computed from the latest rows on or before the date."""
+    session = memory_session
+    session.add_all([
+        HoldingsTranche(as_of_date=date(2024, 1, 1), btc_acquired=100.0, usd_spent=4_000_000.0,
+                        source_type="cash", implied_btc_price=40000.0),
+        HoldingsTranche(as_of_date=date(2024, 1, 5), btc_acquired=50.0, usd_spent=2_250_000.0,
+                        source_type="atm", implied_btc_price=45000.0),
+        HoldingsTranche(as_of_date=date(2024, 2, 1), btc_acquired=25.0, usd_spent=1_250_000.0,
+                        source_type="atm", implied_btc_price=50000.0),
+        MarketPrice(as_of_date=date(2024, 1, 9), asset="BTC", close_price=44000.0),
+        MarketPrice(as_of_date=date(2024, 1, 10), asset="BTC", close_price=46000.0),
+        MarketPrice(as_of_date=date(2024, 1, 10), asset="MSTR", close_price=500.0),
+        CompanyStats(as_of_date=date(2024, 1, 1), shares_outstanding=20_000.0,
+                     cash_usd=1_000_000.0, debt_usd_market=2_000_000.0),
+    ])
+    session.commit()
+    
+    assert nav.get_total_btc(session, date(2024, 1, 10)) == 150.0
+    
+    metrics = nav.compute_nav_metrics(session, date(2024, 1, 10))
+    assert metrics is not None
+    assert metrics.total_btc == 150.0
+    assert metrics.btc_spot_price == 46000.0
+    assert metrics.mstr_share_price == 500.0
+    assert metrics.btc_nav_usd == 150.0 * 46000.0
+    assert metrics.bs_nav_usd == 150.0 * 46000.0 + 1_000_000.0 - 2_000_000.0
+    assert metrics.market_cap_usd == 20_000.0 * 500.0
+    assert metrics.btc_per_share == pytest.approx(150.0 / 20_000.0)
+    
+    # No MSTR price on or before this date
+    assert nav.compute_nav_metrics(session, date(2024, 1, 9)) is None
+    
+    # The BTC price fetched for the NAV is reused, and dropped on new prices
+    assert nav.get_latest_btc_price(session, date(2024, 1, 10)) == 46000.0
+    assert nav.get_latest_btc_price(session, date(2024, 1, 12)) == 46000.0
+    session.add(MarketPrice(as_of_date=date(2024, 1, 11), asset="BTC", close_price=47000.0))
+    session.commit()
+    assert nav.get_latest_btc_price(session, date(2024, 1, 12)) == 47000.0
+    
+    # Writing a new tranche invalidates the cached metrics
+    session.add(HoldingsTranche(as_of_date=date(2024, 1, 10), btc_acquired=10.0, usd_spent=460_000.0,
+                                source_type="cash", implied_btc_price=46000.0))
+    session.commit()
+    assert nav.compute_nav_metrics(session, date(2024, 1, 10)).total_btc == 160.0
+
+
+def test_nav_metrics_read_from_daily_snapshot(memory_session):
+    """Test a same-day DailySnapshot is used and recomputed when inputs change."""
+    from src.database.models import DailySnapshot
+    
+    session = memory_session
+    day = date(2024, 3, 1)
+    tranche = HoldingsTranche(as_of_date=date(2024, 2, 1), btc_acquired=10.0, usd_spent=400_000.0,
+                              source_type="cash", implied_btc_price=40000.0)
+    session.add_all([
+        tranche,
+        MarketPrice(as_of_date=day, asset="BTC", close_price=60000.0),
+        MarketPrice(as_of_date=day, asset="MSTR", close_price=1000.0),
+    ])
+    session.commit()
+    
+    fresh = nav.compute_nav_metrics(session, day, use_snapshot=False)
+    session.add(DailySnapshot(
+        as_of_date=day, total_btc=999.0, btc_spot_price=fresh.btc_spot_price,
+        mstr_share_price=fresh.mstr_share_price, market_cap_usd=fresh.market_cap_usd,
+        btc_nav_usd=fresh.btc_nav_usd
+    ))
+    session.commit()
+    
+    assert nav.compute_nav_metrics(session, day).total_btc == 999.0
+    
+    # A new tranche dated before the snapshot recomputes it in place
+    session.add(HoldingsTranche(as_of_date=date(2024, 2, 15), btc_acquired=5.0, usd_spent=250_000.0,
+                                source_type="cash", implied_btc_price=50000.0))
+    session.commit()
+    snap = session.query(DailySnapshot).one()
+    assert snap.total_btc == 15.0
+    assert snap.btc_nav_usd == 15.0 * 60000.0
+    assert nav.compute_nav_metrics(session, day).total_btc == 15.0
+    
+    # Columns the snapshot is not computed from leave it untouched
+    session.query(DailySnapshot).update({"total_btc": 999.0})
+    session.commit()
+    tranche.notes = "first purchase"
+    session.commit()
+    assert session.query(DailySnapshot).one().total_btc == 999.0
+    
+    # Changing a tranche amount recomputes it again
+    tranche.btc_acquired = 20.0
+    session.commit()
+    assert session.query(DailySnapshot).one().total_btc == 25.0
+
+
+def test_snapshot_history_kept_on_earlier_input(memory_session, memory_ops):
+    """Test an input dated before every snapshot refreshes rather than drops them."""
+    from src.database.models import DailySnapshot
+    
+    session = memory_session
+    session.add_all([
+        HoldingsTranche(as_of_date=date(2023, 12, 1), btc_acquired=10.0, usd_spent=400_000.0,
+                        source_type="cash", implied_btc_price=40000.0),
+        MarketPrice(as_of_date=date(2024, 1, 1), asset="BTC", close_price=40000.0),
+        MarketPrice(as_of_date=date(2024, 1, 1), asset="MSTR", close_price=500.0),
+    ])
+    session.commit()
+    assert nav.rebuild_daily_snapshots(session, date(2024, 1, 1), date(2024, 1, 10)) == 10
+    session.commit()
+    
+    session.add(MarketPrice(as_of_date=date(2023, 12, 31), asset="BTC", close_price=39000.0))
+    session.commit()
+    assert session.query(DailySnapshot).count() == 10
+    
+    # Core inserts refresh the snapshots and the cached metrics too
+    assert nav.compute_nav_metrics(session, date(2024, 1, 5)).btc_spot_price == 40000.0
+    assert memory_ops.add_market_prices("BTC", [(date(2024, 1, 3), 41000.0)]) == 1
+    prices = dict(session.query(DailySnapshot.as_of_date, DailySnapshot.btc_spot_price))
+    assert prices[date(2024, 1, 2)] == 40000.0
+    assert prices[date(2024, 1, 3)] == prices[date(2024, 1, 10)] == 41000.0
+    assert nav.compute_nav_metrics(session, date(2024, 1, 5)).btc_spot_price == 41000.0
+
+
+def test_rebuild_daily_snapshots_matches_computed_nav(memory_session):
+    """Test the set-based snapshot rebuild stores what compute_nav_metrics gives."""
+    from dataclasses import asdict
+    from datetime import timedelta
+    from src.database.models import DailySnapshot
+    
+    session = memory_session
+    session.add_all([
+        HoldingsTranche(as_of_date=date(2024, 1, 1), btc_acquired=100.0, usd_spent=4_000_000.0,
+                        source_type="cash", implied_btc_price=40000.0),
+        HoldingsTranche(as_of_date=date(2024, 1, 5), btc_acquired=50.0, usd_spent=2_250_000.0,
+                        source_type="atm", implied_btc_price=45000.0),
+        MarketPrice(as_of_date=date(2024, 1, 2), asset="BTC", close_price=44000.0),
+        MarketPrice(as_of_date=date(2024, 1, 3), asset="MSTR", close_price=500.0),
+        MarketPrice(as_of_date=date(2024, 1, 6), asset="BTC", close_price=46000.0),
+        CompanyStats(as_of_date=date(2024, 1, 4), shares_outstanding=20_000.0,
+                     cash_usd=1_000_000.0, debt_usd_market=2_000_000.0),
+    ])
+    session.commit()
+    
+    # Jan 1-2 have no MSTR price, so only Jan 3-8 get snapshots
+    assert nav.rebuild_daily_snapshots(session, date(2024, 1, 1), date(2024, 1, 8)) == 6
+    session.commit()
+    
+    day = date(2024, 1, 1)
+    while day <= date(2024, 1, 8):
+        expected = nav.compute_nav_metrics(session, day, use_snapshot=False)
+        snap = session.query(DailySnapshot).filter(DailySnapshot.as_of_date == day).first()
+        if expected is None:
+            assert snap is None
+        else:
+            for field, value in asdict(expected).items():
+                assert getattr(snap, field) == pytest.approx(value), (day, field)
+        day += timedelta(days=1)
+
+
+def test_bulk_record_inserts_read_back(memory_ops):
+    """Test the Core insert paths store rows and return detached records."""
+    from sqlalchemy import inspect
+    from src.database.models import HoldingsRecord, SimulationRecord
+    
+    ops = memory_ops
+    assert ops.add_holdings_records_bulk([
+        {"btc_holdings": 100.0, "avg_cost_basis": 30000.0, "total_cost": 3e6},
+        {"btc_holdings": 150.0, "avg_cost_basis": 32000.0, "total_cost": 4.8e6, "source": "8-K"},
+    ]) == 2
+    assert ops.add_price_records_bulk([
+        {"btc_price_usd": 60000.0, "mstr_price_usd": 400.0},
+    ]) == 1
+    assert ops.add_simulation_records_bulk([
+        dict(simulation_type="gbm", scenarios=10, days=30, initial_btc_price=60000.0,
+             mean_price=61000.0, median_price=60500.0, std_price=5000.0, min_price=50000.0,
+             max_price=70000.0, percentile_5=52000.0, percentile_95=69000.0),
+    ]) == 1
+    
+    holdings = ops.session.query(HoldingsRecord).order_by(HoldingsRecord.id).all()
+    assert [h.btc_holdings for h in holdings] == [100.0, 150.0]
+    assert [h.source for h in holdings] == [None, "8-K"]
+    assert all(h.timestamp is not None for h in holdings)
+    assert ops.get_latest_price().mstr_price_usd == 400.0
+    assert ops.session.query(SimulationRecord).one().results_json is None
+    
+    record = ops.add_holdings_record(200.0, 35000.0, 7e6, notes="single")
+    assert inspect(record).detached
+    assert record.id == 3
+    # Adding the returned record back attaches it instead of inserting again
+    ops.session.add(record)
+    ops.session.commit()
+    assert ops.session.query(HoldingsRecord).count() == 3
+
+
+def test_cumulative_holdings_totals(memory_ops):
+    """Test SQL holdings totals sum same-day tranches and respect the cutoff."""
+    ops = memory_ops
+    ops.bulk_add_holdings([
+        {"as_of_date": date(2024, 1, 1), "btc_acquired": 10.0, "usd_spent": 400_000.0,
+         "source_type": "cash"},
+        {"as_of_date": date(2024, 1, 1), "btc_acquired": 5.0, "usd_spent": 250_000.0,
+         "source_type": "atm"},
+        {"as_of_date": date(2024, 2, 1), "btc_acquired": 20.0, "usd_spent": 1_000_000.0,
+         "source_type": "cash"},
+    ])
+    
+    assert ops.get_cumulative_holdings(date(2023, 12, 31)) == (0.0, 0.0, None)
+    total_btc, total_cost, avg_cost = ops.get_cumulative_holdings(date(2024, 1, 31))
+    assert (total_btc, total_cost) == (15.0, 650_000.0)
+    assert avg_cost == pytest.approx(650_000.0 / 15.0)
+    
+    assert ops.get_cumulative_holdings_by_date() == [
+        (date(2024, 1, 1), 15.0, 650_000.0),
+        (date(2024, 2, 1), 35.0, 1_650_000.0),
+    ]
+    assert ops.get_cumulative_holdings_by_date(date(2024, 1, 31)) == [
+        (date(2024, 1, 1), 15.0, 650_000.0),
+    ]
+
+
+def test_history_dataframes(memory_ops):
+    """Test history DataFrames parse timestamps and apply limit and days."""
+    from datetime import datetime, timedelta
+    
+    ops = memory_ops
+    now = datetime.utcnow()
+    ops.add_holdings_records_bulk([
+        {"btc_holdings": 100.0 + i, "avg_cost_basis": 30000.0, "total_cost": 3e6,
+         "timestamp": now - timedelta(days=10 * i)}
+        for i in range(3)
+    ])
+    ops.add_price_records_bulk([
+        {"btc_price_usd": 60000.0 + i, "mstr_price_usd": 400.0,
+         "timestamp": now - timedelta(days=10 * i)}
+        for i in range(3)
+    ])
+    
+    holdings = ops.get_holdings_dataframe()
+    assert str(holdings["timestamp"].dtype) == "datetime64[ns]"
+    assert holdings["btc_holdings"].tolist() == [100.0, 101.0, 102.0]
+    assert ops.get_holdings_dataframe(limit=2)["btc_holdings"].tolist() == [100.0, 101.0]
+    
+    prices = ops.get_price_dataframe(days=15, columns=["timestamp", "btc_price_usd"])
+    assert list(prices.columns) == ["timestamp", "btc_price_usd"]
+    assert str(prices["timestamp"].dtype) == "datetime64[ns]"
+    assert prices["btc_price_usd"].tolist() == [60000.0, 60001.0]
+
+
+def test_simulation_run_values_read_in_sql(memory_ops):
+    """Test single fields of stored risk summaries come back via json_extract."""
+    import json
+    from src.database.models import SimulationRun
+    
+    ops = memory_ops
+    summary = {"btc": {"mean_return": 0.12, "percentiles": {"5": -0.4, "95": 0.9}}}
+    run = SimulationRun(horizon_days=30, num_paths=100, input_snapshot_date=date(2024, 1, 1),
+                        results_summary_json=summary)
+    ops.session.add(run)
+    ops.session.commit()
+    
+    assert ops.get_simulation_run_value(run.id, "$.btc.mean_return") == 0.12
+    assert json.loads(ops.get_simulation_run_value(run.id, "$.btc.percentiles")) == \
+        summary["btc"]["percentiles"]
+    assert ops.get_simulation_run_value(run.id, "$.mstr.var_95") is None
+    assert ops.get_simulation_run_value(run.id + 1, "$.btc.mean_return") is None
+    assert ops.get_simulation_run_values("$.btc.mean_return") == [(run.id, run.created_at, 0.12)]
+
+
+def test_beta_vs_btc_recovers_known_beta(memory_session):
+    """Test beta regression on an asset whose returns are exactly 2x BTC's."""
+    import numpy as np
+    from datetime import timedelta
+    from src.analytics import performance
+    
+    session = memory_session
+    rng = np.random.default_rng(7)
+    btc_returns = rng.normal(0, 0.02, 60)
+    start = date(2024, 1, 1)
+    btc_price, mstr_price = 40000.0, 400.0
+    for i, r in enumerate(np.r_[0.0, btc_returns]):
+        btc_price *= 1 + r
+        mstr_price *= 1 + 2 * r
+        day = start + timedelta(days=i)
+        session.add(MarketPrice(as_of_date=day, asset="BTC", close_price=btc_price))
+        session.add(MarketPrice(as_of_date=day, asset="MSTR", close_price=mstr_price))
+    session.commit()
+    
+    metrics = performance.compute_beta_vs_btc(session, "MSTR", start, start + timedelta(days=60))
+    assert metrics is not None
+    assert metrics.beta == pytest.approx(2.0)
+    assert metrics.correlation == pytest.approx(1.0)
+    assert metrics.r_squared == pytest.approx(1.0)
+    assert metrics.alpha == pytest.approx(0.0, abs=1e-9)
+    assert metrics.rolling_beta_30d.dropna().values == pytest.approx(2.0)
+
+
+def test_simulation_inputs_include_active_position(memory_session):
+    """Test NAV and active position metrics come back from one combined query."""
+    from src.database.models import UserPosition
+    
+    session = memory_session
+    session.add_all([
+        HoldingsTranche(as_of_date=date(2024, 1, 1), btc_acquired=100.0, usd_spent=4_000_000.0,
+                        source_type="cash", implied_btc_price=40000.0),
+        MarketPrice(as_of_date=date(2024, 1, 10), asset="BTC", close_price=46000.0),
+        MarketPrice(as_of_date=date(2024, 1, 10), asset="MSTR", close_price=500.0),
+        CompanyStats(as_of_date=date(2024, 1, 1), shares_outstanding=20_000.0),
+    ])
+    session.commit()
+    
+    nav_metrics, pos_metrics = position.fetch_simulation_inputs(session, date(2024, 1, 10))
+    assert nav_metrics.total_btc == 100.0
+    assert pos_metrics is None
+    
+    session.add_all([
+        UserPosition(label="old", shares=1.0, avg_entry_price=100.0, is_active=False),
+        UserPosition(label="main", shares=10.0, avg_entry_price=400.0, is_active=True),
+    ])
+    session.commit()
+    
+    nav_metrics, pos_metrics = position.fetch_simulation_inputs(session, date(2024, 1, 10))
+    assert pos_metrics.label == "main"
+    assert pos_metrics.current_value == 10.0 * 500.0
+    assert pos_metrics.unrealized_pnl == 10.0 * (500.0 - 400.0)
+    assert pos_metrics.implied_btc_exposure == pytest.approx(10.0 * 100.0 / 20_000.0)
+    assert position.compute_position_metrics(session, as_of_date=date(2024, 1, 10)) == pos_metrics
+
+
+def test_status_queries_do_not_grow_with_tranches(memory_session):
+    """Test the status page inputs load in a fixed number of statements."""
+    from sqlalchemy import event
+    from src.database.models import UserPosition
+    
+    session = memory_session
+    session.add_all([
+        HoldingsTranche(as_of_date=date(2024, 1, day), btc_acquired=10.0, usd_spent=400_000.0,
+                        source_type="cash", implied_btc_price=40000.0)
+        for day in range(1, 9)
+    ] + [
+        MarketPrice(as_of_date=date(2024, 1, 10), asset="BTC", close_price=46000.0),
+        MarketPrice(as_of_date=date(2024, 1, 10), asset="MSTR", close_price=500.0),
+        CompanyStats(as_of_date=date(2024, 1, 1), shares_outstanding=20_000.0),
+        UserPosition(label="main", shares=10.0, avg_entry_price=400.0, is_active=True),
+    ])
+    session.commit()
+    
+    statements = []
+    engine = session.get_bind()
+    
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    
+    event.listen(engine, "before_cursor_execute", count_statement)
+    try:
+        nav_metrics, pos_metrics = position.fetch_simulation_inputs(session, date(2024, 1, 10))
+        analysis = tranches.get_tranche_summary(session, date(2024, 1, 10))
+    finally:
+        event.remove(engine, "before_cursor_execute", count_statement)
+    
+    assert nav_metrics.total_btc == 80.0
+    assert pos_metrics.label == "main"
+    assert len(analysis.tranches) == 8
+    assert len(statements) == 2
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])